@@ -0,0 +1,111 @@
+"""Micro-benchmark: line-number lookup in the SQL scanners, over the real `Base de donnée DLL et API`
+corpus (or the .sql paths given on the command line).
+
+Compares, per file, counting newlines from the start of the text for every match (the old
+`_line_for`) against one LineIndex + bisect, for the offsets the reference extractor actually
+looks up, and the old line-by-line `_definitions` walk against the finditer + LineIndex one.
+
+    python tools/db-graph/bench_line_lookup.py [--repeat N] [file.sql ...]
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dbgraph.corpus import LineIndex, SqlCorpus  # noqa: E402
+from dbgraph.docs import _definitions, _entry_signature, _source_path  # noqa: E402
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+_MATCH = re.compile(r"\binsert\s+into\s+|\bas\s*\(\s*values\b", re.I)
+_FN_LINE = re.compile(r"create\s+(?:or\s+replace\s+)?function\s+([a-z_][\w]*)\.([a-z_][\w]*)", re.I)
+
+
+def _count_lines(text, offsets):
+    return [text.count("\n", 0, o) + 1 for o in offsets]
+
+
+def _bisect_lines(text, offsets):
+    line_for = LineIndex(text).line_for
+    return [line_for(o) for o in offsets]
+
+
+def _definitions_by_line(sql_text, path):
+    """The previous per-line scan, kept here as the baseline."""
+    out = []
+    raw_lines = sql_text.splitlines(True)
+    lines = [line.rstrip("\r\n") for line in raw_lines]
+    offset = 0
+    for i, line in enumerate(lines):
+        m = _FN_LINE.search(line)
+        if not m:
+            offset += len(raw_lines[i])
+            continue
+        block = []
+        j = i - 1
+        while j >= 0 and lines[j].lstrip().startswith("--"):
+            block.append(lines[j].lstrip()[2:].strip())
+            j -= 1
+        name = m.group(2).lower()
+        out.append({"schema": m.group(1).lower(), "name": name,
+                    "doc": "\n".join(reversed(block)) if block else None,
+                    "source": {"path": _source_path(path), "line": i + 1},
+                    "signature": _entry_signature(sql_text, offset + m.end(), name)})
+        offset += len(raw_lines[i])
+    return out
+
+
+def _best_of(repeat, fn, *args):
+    best, result = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("paths", nargs="*")
+    args = parser.parse_args(argv)
+    paths = args.paths or sorted(glob.glob(os.path.join(ROOT, "Base de donnée DLL et API", "*.sql")))
+    corpus = SqlCorpus()
+    files = [corpus.get(p) for p in paths]
+    offsets = [[m.start() for m in _MATCH.finditer(f.text)] for f in files]
+    size = sum(len(f.text) for f in files)
+    print("%d files, %.1f MB, %d lookups" % (len(files), size / 1e6, sum(map(len, offsets))))
+
+    rows = []
+    t_count = t_bisect = 0.0
+    for f, offs in zip(files, offsets):
+        a, expected = _best_of(args.repeat, _count_lines, f.text, offs)
+        b, got = _best_of(args.repeat, _bisect_lines, f.text, offs)
+        assert got == expected, f.path
+        t_count += a
+        t_bisect += b
+        rows.append((a / b if b else 0.0, a, b, len(offs), os.path.basename(f.path)))
+    print("line lookup   count-from-start %8.1f ms   LineIndex+bisect %8.1f ms   x%.1f"
+          % (t_count * 1e3, t_bisect * 1e3, t_count / t_bisect if t_bisect else 0.0))
+
+    t_old = t_new = 0.0
+    for f in files:
+        a, expected = _best_of(args.repeat, _definitions_by_line, f.text, f.path)
+        b, got = _best_of(args.repeat, _definitions, f.text, f.path)
+        assert got == expected, f.path
+        t_old += a
+        t_new += b
+    print("definitions   per-line walk    %8.1f ms   finditer+LineIndex %6.1f ms   x%.1f"
+          % (t_old * 1e3, t_new * 1e3, t_old / t_new if t_new else 0.0))
+
+    print("largest line-lookup gains:")
+    for speedup, a, b, n, name in sorted(rows, reverse=True)[:5]:
+        print("  x%-7.1f %7.2f ms -> %6.2f ms  %5d lookups  %s" % (speedup, a * 1e3, b * 1e3, n, name))
+
+
+if __name__ == "__main__":
+    main()
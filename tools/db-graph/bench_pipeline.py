@@ -0,0 +1,266 @@
+"""Benchmark the db-graph pipeline on synthetic catalogs scaled from the real schema's shape.
+
+The committed graph has 370 tables / 13 views / 374 functions / 537 policies / 565 triggers /
+747 FKs. `synthetic_catalog(scale)` generates tbls + catalog_extra payloads (and .sql files carrying
+function headers and ref_* seeds) with those counts times `scale`, deterministically, so a run at
+5x or 20x shows how each stage scales before the schema gets there.
+
+    python tools/db-graph/bench_pipeline.py [--scales 1,5,20] [--repeat 3] [--memory] [--json out.json]
+
+Each stage is timed on its own (best of --repeat); --memory adds the tracemalloc peak of one
+extra run per stage (slower, so off by default).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dbgraph.build import build_graph  # noqa: E402
+from dbgraph.docs import attach_sql_docs  # noqa: E402
+from dbgraph.index import GraphIndex, IndexedGraph  # noqa: E402
+from dbgraph.infer import infer_rpc_table_edges  # noqa: E402
+from dbgraph.load import load_extra, load_tbls_schema  # noqa: E402
+from dbgraph.reference_extract import extract_reference_values  # noqa: E402
+from dbgraph.render import (render_api_db_reference_html, write_functions_md, write_index_md,  # noqa: E402
+                            write_policies_md, write_types_md)
+from dbgraph.typemap import (write_function_access_md, write_object_types_md,  # noqa: E402
+                             write_surface_coverage_md)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASE = {"tables": 370, "views": 13, "functions": 374, "policies": 537, "triggers": 565, "fks": 747,
+        "enums": 9, "columns_per_table": 13}
+_STEMS = ("object", "object_fma", "object_price", "object_media", "opening", "actor", "org", "user",
+          "ref", "ref_code", "media", "ui", "crm_contact", "object_sustainability", "staging_import")
+_SCHEMAS = (("public", 0.55), ("staging", 0.3), ("auth", 0.06), ("audit", 0.03), ("crm", 0.06))
+_TYPES = ("text", "uuid", "integer", "boolean", "timestamp with time zone", "jsonb", "numeric")
+_OBJECT_TYPES = ["RES", "PCU", "PNA", "ORG", "ITI", "VIL", "HPA", "ASC", "COM", "HOT", "HLO", "LOI",
+                 "FMA", "CAMP", "PSV", "RVA", "ACT"]
+
+
+def _count(key, scale):
+    return max(1, int(round(BASE[key] * scale)))
+
+
+def _pick_schema(rnd):
+    x, acc = rnd.random(), 0.0
+    for schema, share in _SCHEMAS:
+        acc += share
+        if x < acc:
+            return schema
+    return _SCHEMAS[0][0]
+
+
+def synthetic_catalog(scale=1.0, seed=0):
+    """-> (tbls, extra, sql_files) where sql_files maps a file name to its text."""
+    rnd = random.Random(seed)
+    tables = []
+    ids = []
+    for i in range(_count("tables", scale) + _count("views", scale)):
+        schema = "public" if i == 0 else _pick_schema(rnd)
+        name = "object" if i == 0 else "%s_%d" % (rnd.choice(_STEMS), i)
+        kind = "VIEW" if i >= _count("tables", scale) else "TABLE"
+        cols = [{"name": "id", "type": "text", "nullable": False, "comment": "PK"}]
+        if i == 0:
+            cols.append({"name": "object_type", "type": "object_type", "nullable": False, "comment": ""})
+        for c in range(rnd.randint(3, 2 * BASE["columns_per_table"] - 3)):
+            cols.append({"name": "col_%d" % c, "type": rnd.choice(_TYPES), "nullable": rnd.random() < 0.6,
+                         "comment": "" if rnd.random() < 0.7 else "column %d" % c})
+        tables.append({"name": "%s.%s" % (schema, name), "type": kind,
+                       "comment": "" if rnd.random() < 0.5 else "Synthetic table %d" % i,
+                       "columns": cols, "constraints": [{"name": name + "_pkey", "type": "PRIMARY KEY", "columns": ["id"]}],
+                       "triggers": []})
+        ids.append((schema, name))
+
+    functions = []
+    for i in range(_count("functions", scale)):
+        schema = "api" if rnd.random() < 0.8 else "internal"
+        name = "rpc_%s_%d" % (rnd.choice(("get", "list", "upsert", "delete", "refresh")), i)
+        parts = []
+        for _ in range(rnd.randint(1, 5)):
+            s, t = rnd.choice(ids)
+            ref = t if s == "public" and rnd.random() < 0.5 else "%s.%s" % (s, t)
+            verb = rnd.random()
+            if verb < 0.6:
+                parts.append("SELECT count(*) INTO v_n FROM %s x WHERE x.id = p_id;" % ref)
+            elif verb < 0.8:
+                parts.append("INSERT INTO %s (id) VALUES (p_id) ON CONFLICT DO NOTHING;" % ref)
+            elif verb < 0.95:
+                parts.append("UPDATE %s SET col_0 = col_0 WHERE id = p_id;" % ref)
+            else:
+                parts.append("EXECUTE format('SELECT 1 FROM %%I', '%s');" % t)
+        body = "DECLARE v_n bigint; BEGIN -- touch %d tables\n%s\nRETURN; END" % (len(parts), "\n".join(parts))
+        functions.append({"schema": schema, "name": name, "args": "p_id text", "returns": "void",
+                          "security_definer": rnd.random() < 0.4, "volatility": rnd.choice("vsi"),
+                          "comment": None, "body": body})
+
+    for i in range(_count("triggers", scale)):
+        t = rnd.choice(tables[:_count("tables", scale)])
+        f = rnd.choice(functions)
+        tname = "trg_%d" % i
+        t["triggers"].append({"name": tname, "comment": "",
+                              "def": "CREATE TRIGGER %s BEFORE UPDATE ON %s FOR EACH ROW EXECUTE FUNCTION %s.%s()"
+                                     % (tname, t["name"].split(".")[-1], f["schema"], f["name"])})
+
+    relations = []
+    for _ in range(_count("fks", scale)):
+        child, parent = rnd.choice(tables), rnd.choice(tables)
+        relations.append({"table": {"name": child["name"]}, "columns": [{"name": "col_0"}],
+                          "parent_table": {"name": parent["name"]}, "parent_columns": [{"name": "id"}]})
+
+    policies = []
+    for i in range(_count("policies", scale)):
+        schema, name = rnd.choice(ids)
+        cmd = rnd.choice(("SELECT", "INSERT", "UPDATE", "DELETE", "ALL"))
+        pred = "api.%s(id)" % rnd.choice(functions)["name"]
+        policies.append({"schema": schema, "table": name, "name": "pol_%d" % i, "cmd": cmd,
+                         "roles": ["authenticated"], "qual": pred if cmd != "INSERT" else None,
+                         "with_check": pred if cmd in ("INSERT", "UPDATE", "ALL") else None})
+
+    enums = [{"schema": "public", "name": "object_type", "values": _OBJECT_TYPES, "used_by": ["public.object.object_type"]}]
+    for i in range(1, _count("enums", scale)):
+        enums.append({"schema": "public", "name": "enum_%d" % i, "values": ["a", "b", "c"], "used_by": []})
+    facets = [n for s, n in ids if n.startswith("object_fma")][:len(_OBJECT_TYPES)]
+    applicability = [{"object_type": ot, "facet_table": ft} for ot, ft in zip(_OBJECT_TYPES, facets)]
+
+    tbls = {"name": "synthetic", "tables": tables, "relations": relations}
+    extra = {"functions": functions, "policies": policies, "enums": enums, "applicability": applicability}
+
+    sql_files = {}
+    per_file = 25
+    for start in range(0, len(functions), per_file):
+        chunk = functions[start:start + per_file]
+        sql_files["functions_%03d.sql" % (start // per_file)] = "\n".join(
+            "-- %s: synthetic RPC %d\n-- second header line\nCREATE OR REPLACE FUNCTION %s.%s(%s)\n"
+            "RETURNS %s LANGUAGE plpgsql AS $$\n%s\n$$;\n" % (f["name"], start + j, f["schema"], f["name"],
+                                                               f["args"], f["returns"], f["body"])
+            for j, f in enumerate(chunk))
+    refs = [n for s, n in ids if s == "public" and n.startswith("ref")] or ["ref_code"]
+    for k in range(max(1, len(refs) // 10)):
+        stmts = []
+        for name in refs[k::max(1, len(refs) // 10)]:
+            rows = ",\n  ".join("('d%d', 'code_%d', 'Label %d')" % (r % 7, r, r) for r in range(rnd.randint(5, 40)))
+            stmts.append("INSERT INTO %s (domain, code, name) VALUES\n  %s\nON CONFLICT DO NOTHING;" % (name, rows))
+        sql_files["seed_%03d.sql" % k] = "\n\n".join(stmts) + "\n"
+    return tbls, extra, sql_files
+
+
+def _load_meta():
+    with open(os.path.join(HERE, "object_type_meta.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _fresh_indexed(g):
+    """A copy of g with its index prebuilt but no derived values, so writers are timed cold."""
+    ig = IndexedGraph(g)
+    ig.index = GraphIndex(ig)
+    return ig
+
+
+def _measure(fn, setup, repeat, memory):
+    best = None
+    for _ in range(repeat):
+        args = setup()
+        t0 = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    out = {"seconds": best}
+    if memory:
+        args = setup()
+        tracemalloc.start()
+        try:
+            fn(*args)
+            out["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return out
+
+
+def run_scale(scale, repeat=3, memory=False, seed=0):
+    """Time every stage at one scale -> {"scale", "counts", "stages": {name: {"seconds"[, "peak_bytes"]}}}."""
+    tbls, extra, sql_files = synthetic_catalog(scale, seed)
+    meta = _load_meta()
+    with tempfile.TemporaryDirectory() as tmp:
+        sql_paths = []
+        for name, text in sorted(sql_files.items()):
+            path = os.path.join(tmp, name)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            sql_paths.append(path)
+        seed_paths = [p for p in sql_paths if os.path.basename(p).startswith("seed_")]
+
+        g = build_graph(json.loads(json.dumps(tbls)), json.loads(json.dumps(extra)), sql_paths)
+        refs = extract_reference_values(seed_paths)
+        table_ids = {n["id"] for n in g["nodes"] if n["kind"] in ("table", "view", "matview")}
+        fn_nodes = [n for n in g["nodes"] if n["kind"] == "function"]
+
+        def copies(*values):
+            return lambda: tuple(json.loads(json.dumps(v)) for v in values)
+
+        stages = [
+            ("load_tbls_schema", load_tbls_schema, copies(tbls)),
+            ("load_extra", load_extra, copies(extra)),
+            ("infer_rpc_table_edges", infer_rpc_table_edges, lambda: (extra["functions"], table_ids)),
+            ("attach_sql_docs", attach_sql_docs, lambda: (json.loads(json.dumps(fn_nodes)), sql_paths)),
+            ("extract_reference_values", extract_reference_values, lambda: (seed_paths,)),
+            ("build_graph", build_graph, lambda: copies(tbls, extra)() + (sql_paths,)),
+            ("graph_index", GraphIndex, lambda: (g,)),
+        ]
+        for name, fn in (("write_functions_md", write_functions_md), ("write_policies_md", write_policies_md),
+                         ("write_types_md", write_types_md), ("write_index_md", write_index_md)):
+            stages.append((name, fn, lambda: (_fresh_indexed(g),)))
+        for name, fn in (("write_object_types_md", write_object_types_md),
+                         ("write_function_access_md", write_function_access_md),
+                         ("write_surface_coverage_md", write_surface_coverage_md)):
+            stages.append((name, fn, lambda: (_fresh_indexed(g), meta)))
+        stages.append(("render_api_db_reference_html", render_api_db_reference_html,
+                       lambda: (_fresh_indexed(g), refs)))
+
+        results = {name: _measure(fn, setup, repeat, memory) for name, fn, setup in stages}
+    counts = {"tables": len(tbls["tables"]), "functions": len(extra["functions"]),
+              "policies": len(extra["policies"]), "nodes": len(g["nodes"]), "edges": len(g["edges"]),
+              "reference_rows": len(refs["rows"])}
+    return {"scale": scale, "counts": counts, "stages": results}
+
+
+def _report(runs, memory):
+    names = list(runs[0]["stages"])
+    head = "%-30s" % "stage" + "".join("%20s" % ("%gx" % r["scale"]) for r in runs)
+    print(head)
+    print("%-30s" % "  (tables/functions/policies)" + "".join(
+        "%20s" % ("%d/%d/%d" % (r["counts"]["tables"], r["counts"]["functions"], r["counts"]["policies"])) for r in runs))
+    for name in names:
+        line = "%-30s" % name
+        for r in runs:
+            st = r["stages"][name]
+            cell = "%.1f ms" % (st["seconds"] * 1e3)
+            if memory:
+                cell += " %.1fM" % (st["peak_bytes"] / 1e6)
+            line += "%20s" % cell
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="1,5,20", help="comma-separated multiples of the current schema size")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--memory", action="store_true", help="also record tracemalloc peak per stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="write the raw results here")
+    args = parser.parse_args(argv)
+    runs = [run_scale(float(s), args.repeat, args.memory, args.seed) for s in args.scales.split(",") if s.strip()]
+    _report(runs, args.memory)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(runs, f, indent=1)
+    return runs
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,43 @@
 """CLI: read db-graph-out/{schema_tbls.json, catalog_extra.json} + the .sql files, build the unified
 graph, and emit graph.json + graph.html + FUNCTIONS/POLICIES/TYPES/DB_AGENT_INDEX markdown.
-Strips function bodies from everything it writes."""
+Strips function bodies from everything it writes.
+
+`--incremental` keeps a content-hash manifest + stage cache in db-graph-out/.cache/: unchanged
+inputs reuse their parsed/scanned results and artifacts whose render inputs did not change are
+not re-rendered (the pre-commit path)."""
+import argparse
 import glob
 import json
 import os
 import sys
+import time
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from dbgraph.build import build_graph  # noqa: E402
-from dbgraph.reference_extract import (extract_live_reference_values, extract_reference_values,  # noqa: E402
-                                       load_mcp_reference_values, merge_reference_extracts)
-from dbgraph.render import (render_api_db_reference_html, render_html, write_functions_md,  # noqa: E402
+from dbgraph.cache import BuildCache, bytes_digest, file_digest, json_digest  # noqa: E402
+from dbgraph.canvas import render_canvas_html  # noqa: E402
+from dbgraph.chunks import CHUNK_DIR, chunk_files  # noqa: E402
+from dbgraph.compact import dumps_graph, load_graph  # noqa: E402
+from dbgraph.corpus import SqlCorpus  # noqa: E402
+from dbgraph.layout import compute_layout  # noqa: E402
+from dbgraph.profile import Profiler, stage  # noqa: E402
+from dbgraph.reference_extract import (extract_reference_values, load_mcp_reference_values,  # noqa: E402
+                                       merge_reference_extracts, write_live_reference_values)
+from dbgraph.render import (REFERENCE_CHUNK_DIR, render_api_db_reference_html,  # noqa: E402
+                            render_api_db_reference_split, render_html, write_functions_md,
                             write_index_md, write_policies_md, write_types_md)
+from dbgraph.search import build_search_index, dumps_search_index  # noqa: E402
+from dbgraph.sqlite_export import write_sqlite  # noqa: E402
 from dbgraph.typemap import (write_function_access_md, write_object_types_md,  # noqa: E402
                              write_surface_coverage_md)
+from dbgraph.watch import watch  # noqa: E402
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 OUT = os.path.join(ROOT, "db-graph-out")
 DOCS = os.path.join(ROOT, "docs")
+CACHE = os.path.join(OUT, ".cache")
+PROFILE = os.path.join(OUT, "graph.profile.json")
+SQLITE = os.path.join(OUT, "graph.sqlite")
 
 
 def _load_object_type_meta():
@@ -31,6 +51,117 @@ def _read(name):
         return json.load(f)
 
 
+def _code_digest():
+    """Digest of the pipeline's own source — a parser/renderer edit must invalidate the cache."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths = [os.path.abspath(__file__), os.path.join(here, "object_type_meta.json")]
+    paths += sorted(glob.glob(os.path.join(here, "dbgraph", "*.py")))
+    return json_digest([file_digest(p) for p in paths])
+
+
+def _write(path, text):
+    """Write through a temp file in the same directory + os.replace: readers never see a half file.
+
+    Returns False — and leaves the file, and so its mtime, alone — when it already holds exactly
+    these bytes (same size, then same sha256)."""
+    data = text.encode("utf-8")
+    if os.linesep != "\n":
+        data = data.replace(b"\n", os.linesep.encode("ascii"))  # what text mode wrote before
+    try:
+        if os.path.getsize(path) == len(data) and file_digest(path) == bytes_digest(data):
+            return False
+    except OSError:
+        pass
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return True
+
+
+# artifact name -> render(state); state carries the graph and whatever else the renderer reads.
+# Looked up by name so a process-pool worker only receives the name.
+_RENDERERS = {
+    "graph.json": lambda st: st["graph_text"],
+    "graph.html": lambda st: (render_canvas_html if st["viewer"] == "canvas" else render_html)(
+        st["g"], compact=st["compact"], search=st["search"], split=st["split"]),
+    "search_index.json": lambda st: dumps_search_index(st["search"]),
+    "FUNCTIONS.md": lambda st: write_functions_md(st["g"]),
+    "POLICIES.md": lambda st: write_policies_md(st["g"]),
+    "TYPES.md": lambda st: write_types_md(st["g"]),
+    "DB_AGENT_INDEX.md": lambda st: write_index_md(st["g"]),
+    # object-type-centric views (computed from the graph + the type/archetype metadata)
+    "OBJECT_TYPES.md": lambda st: write_object_types_md(st["g"], st["type_meta"]),
+    "FUNCTION_ACCESS.md": lambda st: write_function_access_md(st["g"], st["type_meta"]),
+    "SURFACE_COVERAGE.md": lambda st: write_surface_coverage_md(st["g"], st["type_meta"]),
+    "api-db-reference.html": lambda st: render_api_db_reference_html(st["g"], st["refs"], live_note=st["live_note"]),
+}
+_WORKER_STATE = {}
+
+
+def _init_writer(state):
+    _WORKER_STATE.update(state)
+
+
+def _emit(state, name, path):
+    """Render one artifact and write it if it changed -> (name, changed, wall seconds, cpu seconds)."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    changed = _write(path, _RENDERERS[name](state))
+    return name, changed, time.perf_counter() - wall, time.process_time() - cpu
+
+
+def _emit_in_worker(name, path):
+    return _emit(_WORKER_STATE, name, path)
+
+
+def _emit_all(state, jobs, workers, profiler=None):
+    """Render + write (name, path) jobs, on a process pool when workers > 1 (each worker gets one
+    copy of the state; every artifact is a pure function of it, so the bytes do not depend on
+    scheduling). Returns [(name, changed)] in job order; profiler stages are recorded likewise."""
+    if workers <= 1 or len(jobs) <= 1:
+        timings = [_emit(state, name, path) for name, path in jobs]
+    else:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        if "fork" in multiprocessing.get_all_start_methods():
+            # forked workers inherit the state (graph index included) without pickling it
+            ctx, initargs = multiprocessing.get_context("fork"), ()
+            _WORKER_STATE.clear()
+            _WORKER_STATE.update(state)
+        else:
+            # spawned workers get one pickled copy; the index holds lambdas, so ship the plain dict
+            ctx, initargs = None, (dict(state, g=dict(state["g"])),)
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=ctx,
+                                     initializer=_init_writer if initargs else None, initargs=initargs) as pool:
+                futures = [pool.submit(_emit_in_worker, name, path) for name, path in jobs]
+                timings = [f.result() for f in futures]
+        finally:
+            _WORKER_STATE.clear()
+    if profiler is not None:
+        for name, _changed, wall, cpu in timings:
+            profiler.record("write:" + name, wall, cpu)
+    return [(name, changed) for name, changed, _wall, _cpu in timings]
+
+
+def _write_chunk_files(files, directory):
+    """Write {file name: chunk script} into `directory` (the --split / --split-reference chunks) and
+    drop the chunks that are gone; returns True when any file changed."""
+    os.makedirs(directory, exist_ok=True)
+    changed = False
+    for name, text in sorted(files.items()):
+        changed = _write(os.path.join(directory, name), text) or changed
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".js") and name not in files:
+            os.remove(os.path.join(directory, name))
+            changed = True
+    return changed
+
+
 def _make_sources_relative(refs):
     prefix = ROOT.replace("\\", "/").rstrip("/") + "/"
     for bucket in ("rows", "derived_sources"):
@@ -58,46 +189,229 @@ def _load_live_reference_extract(g, extra):
     if os.path.exists(mcp_path):
         return load_mcp_reference_values(mcp_path), "Supabase MCP JSON=%s" % os.path.relpath(mcp_path, ROOT).replace("\\", "/")
     if os.environ.get("TBLS_DSN") and os.environ.get("DB_GRAPH_ALLOW_DIRECT_LIVE") == "1":
-        return extract_live_reference_values(os.environ["TBLS_DSN"], g, extra), "direct TBLS_DSN opt-in"
+        # streamed to disk as it is read, then loaded back: the extraction itself stays flat in memory;
+        # tables whose fingerprint did not change since the last extract keep its rows
+        path = os.path.join(OUT, "reference_live_direct.ndjson")
+        previous = load_mcp_reference_values(path) if os.path.exists(path) else None
+        write_live_reference_values(os.environ["TBLS_DSN"], g, path, extra,
+                                    connections=int(os.environ.get("DB_GRAPH_LIVE_CONNECTIONS") or 4),
+                                    previous=previous)
+        return load_mcp_reference_values(path), "direct TBLS_DSN opt-in"
     return {"live": {"status": "not_queried", "tables": [], "errors": [], "truncated": []}}, "Supabase MCP JSON=missing"
 
 
-def main():
-    if not (os.path.exists(os.path.join(OUT, "schema_tbls.json")) and
-            os.path.exists(os.path.join(OUT, "catalog_extra.json"))):
-        sys.exit("Missing db-graph-out/schema_tbls.json or catalog_extra.json — run tbls + the gap extract first (see tools/db-graph/README.md).")
-    tbls = _read("schema_tbls.json")
-    extra = _read("catalog_extra.json")
+def _load_inputs(warm):
+    """Parse schema_tbls.json + catalog_extra.json -> (tbls, extra, {name: digest}). `warm` (watch
+    mode) keeps the parsed JSON per file digest, so an unchanged file is hashed but not re-parsed."""
+    parsed, digests = [], {}
+    for name in ("schema_tbls.json", "catalog_extra.json"):
+        digest = digests[name] = file_digest(os.path.join(OUT, name))
+        if warm is None:
+            value = _read(name)
+        elif warm.get(name, (None,))[0] == digest:
+            value = warm[name][1]
+        else:
+            value = _read(name)
+            warm[name] = digest, value
+        parsed.append(value)
+    return parsed[0], parsed[1], digests
+
+
+def _previous_layout(warm):
+    """The layout of the last build (watch mode: kept in memory; else read back from graph.json), or
+    None when there is none to reuse."""
+    if warm is not None and "layout" in warm:
+        return warm["layout"]
+    try:
+        return load_graph(os.path.join(OUT, "graph.json"), lazy=True).get("layout")
+    except (OSError, ValueError):
+        return None
+
+
+def _build(args, cache, corpus, warm=None):
+    """One build + write; returns the names of the artifacts whose bytes changed."""
+    profiler = Profiler(memory=args.profile == "full") if args.profile else None
+    with stage(profiler, "load_json"):
+        tbls, extra, input_digests = _load_inputs(warm)
     sql_paths = glob.glob(os.path.join(ROOT, "Base de donnée DLL et API", "*.sql"))
     reference_paths = _reference_sql_paths(sql_paths)
-    g = build_graph(tbls, extra, sql_paths)
-    seed_refs = _make_sources_relative(extract_reference_values(reference_paths))
-    live_refs, live_note = _load_live_reference_extract(g, extra)
-    refs = merge_reference_extracts(seed_refs, live_refs)
-    refs = _make_sources_relative(refs)
+    if cache is not None:
+        with stage(profiler, "track_inputs"):
+            for name, digest in input_digests.items():
+                cache.track_input(os.path.relpath(os.path.join(OUT, name), ROOT).replace("\\", "/"), digest)
+            for path in sorted(sql_paths):
+                cache.track_input(os.path.relpath(path, ROOT).replace("\\", "/"), corpus.get(path).digest)
+    with stage(profiler, "build_graph"):
+        g = build_graph(tbls, extra, sql_paths, cache=cache, workers=args.workers, corpus=corpus, profiler=profiler)
+    with stage(profiler, "layout"):
+        g["layout"] = compute_layout(g, previous=None if args.relayout else _previous_layout(warm))
+    if warm is not None:
+        warm["layout"] = g["layout"]
+    with stage(profiler, "extract_reference_values"):
+        seed_refs = _make_sources_relative(extract_reference_values(reference_paths, cache=cache, corpus=corpus))
+    with stage(profiler, "load_live_reference"):
+        live_refs, live_note = _load_live_reference_extract(g, extra)
+    with stage(profiler, "merge_references"):
+        refs = merge_reference_extracts(seed_refs, live_refs)
+        refs = _make_sources_relative(refs)
     os.makedirs(OUT, exist_ok=True)
     os.makedirs(DOCS, exist_ok=True)
-    with open(os.path.join(OUT, "graph.json"), "w", encoding="utf-8") as f:
-        json.dump(g, f, ensure_ascii=False, indent=1)
-    with open(os.path.join(OUT, "graph.html"), "w", encoding="utf-8") as f:
-        f.write(render_html(g))
-    for name, fn in (("FUNCTIONS.md", write_functions_md), ("POLICIES.md", write_policies_md),
-                     ("TYPES.md", write_types_md), ("DB_AGENT_INDEX.md", write_index_md)):
-        with open(os.path.join(OUT, name), "w", encoding="utf-8") as f:
-            f.write(fn(g))
-    # object-type-centric views (computed from the graph + the type/archetype metadata)
+    with stage(profiler, "serialise_graph"):
+        graph_text = dumps_graph(g, compact=args.compact)
+    graph_key = bytes_digest(graph_text.encode("utf-8"))
     type_meta = _load_object_type_meta()
-    for name, fn in (("OBJECT_TYPES.md", write_object_types_md),
-                     ("FUNCTION_ACCESS.md", write_function_access_md),
-                     ("SURFACE_COVERAGE.md", write_surface_coverage_md)):
-        with open(os.path.join(OUT, name), "w", encoding="utf-8") as f:
-            f.write(fn(g, type_meta))
-    with open(os.path.join(DOCS, "api-db-reference.html"), "w", encoding="utf-8") as f:
-        f.write(render_api_db_reference_html(g, refs, live_note=live_note))
+    type_key = json_digest([graph_key, type_meta])
+    artifacts = [("graph.json", os.path.join(OUT, "graph.json"), graph_key),
+                 ("graph.html", os.path.join(OUT, "graph.html"), json_digest([graph_key, args.viewer, args.split])),
+                 ("search_index.json", os.path.join(OUT, "search_index.json"), graph_key)]
+    for name in ("FUNCTIONS.md", "POLICIES.md", "TYPES.md", "DB_AGENT_INDEX.md"):
+        artifacts.append((name, os.path.join(OUT, name), graph_key))
+    for name in ("OBJECT_TYPES.md", "FUNCTION_ACCESS.md", "SURFACE_COVERAGE.md"):
+        artifacts.append((name, os.path.join(OUT, name), type_key))
+    reference_key = json_digest([graph_key, refs, live_note])
+    artifacts.append(("api-db-reference.html", os.path.join(DOCS, "api-db-reference.html"), reference_key))
+    if args.split_reference:
+        # unpublished: the docs site serves the static page, which must not depend on files it lacks
+        artifacts.append((REFERENCE_CHUNK_DIR, os.path.join(OUT, REFERENCE_CHUNK_DIR), reference_key))
+    if args.split:
+        artifacts.append((CHUNK_DIR, os.path.join(OUT, CHUNK_DIR), json_digest([graph_key, "chunks"])))
+    if args.sqlite:
+        artifacts.append(("graph.sqlite", SQLITE, json_digest([graph_key, refs.get("rows", [])])))
+    jobs = [(name, path) for name, path, key in artifacts
+            if cache is None or not cache.output_fresh(name, path, key)]
+    text_jobs = [(name, path) for name, path in jobs if name not in ("graph.sqlite", CHUNK_DIR, REFERENCE_CHUNK_DIR)]
+    search = None
+    if {"graph.html", "search_index.json", CHUNK_DIR} & {name for name, _ in jobs}:
+        with stage(profiler, "build_search_index"):
+            search = build_search_index(g)
+    state = {"g": g, "graph_text": graph_text, "compact": args.compact, "type_meta": type_meta,
+             "refs": refs, "live_note": live_note, "search": search, "viewer": args.viewer,
+             "split": args.split}
+    with stage(profiler, "write_artifacts"):
+        written = _emit_all(state, text_jobs, args.workers, profiler)
+    if (CHUNK_DIR, os.path.join(OUT, CHUNK_DIR)) in jobs:
+        with stage(profiler, "write_chunks"):
+            written.append((CHUNK_DIR, _write_chunk_files(chunk_files(g, search), os.path.join(OUT, CHUNK_DIR))))
+    if (REFERENCE_CHUNK_DIR, os.path.join(OUT, REFERENCE_CHUNK_DIR)) in jobs:
+        with stage(profiler, "write_reference_chunks"):
+            html, files = render_api_db_reference_split(g, refs, live_note=live_note)
+            changed = _write(os.path.join(OUT, "api-db-reference.html"), html)
+            changed = _write_chunk_files(files, os.path.join(OUT, REFERENCE_CHUNK_DIR)) or changed
+        written.append((REFERENCE_CHUNK_DIR, changed))
+    if ("graph.sqlite", SQLITE) in jobs:
+        with stage(profiler, "write_sqlite"):
+            write_sqlite(g, refs, SQLITE)
+        written.append(("graph.sqlite", True))
+    rendered = len(written)
+    changed_artifacts = [name for name, changed in written if changed]
+    if cache is not None:
+        changed = cache.changed_inputs()
+        print("db-graph: incremental — %d changed input(s), stage cache %d hit(s) / %d miss(es), %d/%d artifact(s) re-rendered" % (
+            len(changed), cache.hits, cache.misses, rendered, len(artifacts)))
+        cache.save()
     live = refs.get("live", {})
     print("db-graph: wrote %d nodes / %d edges and %d reference rows (%s, %d SQL seed rows from %d files) to %s and docs/api-db-reference.html" % (
         len(g["nodes"]), len(g["edges"]), len(refs.get("rows", [])),
         live.get("status", "unknown"), refs.get("seed", {}).get("rows", 0), len(reference_paths), OUT))
+    print("db-graph: %d/%d artifact(s) changed%s" % (
+        len(changed_artifacts), len(artifacts), (": " + ", ".join(changed_artifacts)) if changed_artifacts else ""))
+    if profiler is not None:
+        profiler.write(PROFILE, nodes=len(g["nodes"]), edges=len(g["edges"]), sql_files=len(sql_paths),
+                       reference_rows=len(refs.get("rows", [])), workers=args.workers,
+                       incremental=args.incremental, compact=args.compact, viewer=args.viewer, split=args.split,
+                       split_reference=args.split_reference,
+                       profile=args.profile,
+                       artifacts_rendered=rendered, artifacts_changed=changed_artifacts)
+        profiler.close()
+        print("db-graph: profile written to %s; slowest stages:\n%s" % (PROFILE, profiler.summary()))
+    return changed_artifacts
+
+
+def _watch(args, interval, debounce):
+    """Rebuild on every debounced burst of saves, in this process: the parsed JSON inputs, the SQL
+    corpus, the stage memo and the artifact digests stay warm between builds."""
+    cache = BuildCache(CACHE if args.incremental else None, salt=_code_digest())
+    corpus = SqlCorpus()
+    warm = {}
+    sql_dir = os.path.join(ROOT, "Base de donnée DLL et API")
+    migrations = os.path.join(ROOT, "supabase", "migrations")
+    patterns = [os.path.join(sql_dir, "*.sql"), os.path.join(migrations, "*.sql"), os.path.join(OUT, "*.json")]
+    # outputs of the build itself
+    ignore = [os.path.join(OUT, "graph.json"), os.path.join(OUT, "search_index.json"), PROFILE]
+
+    def rebuild(paths):
+        names = [os.path.relpath(p, ROOT).replace("\\", "/") for p in paths]
+        print("db-graph: watch — %d file(s) changed: %s" % (len(names), ", ".join(names)))
+        if all(os.path.dirname(os.path.abspath(p)) == os.path.abspath(migrations) for p in paths):
+            print("db-graph: watch — only supabase/migrations changed; re-run tbls + the gap extract "
+                  "to refresh db-graph-out/*.json (the build reads those, not the migrations)")
+            return
+        corpus.refresh()
+        t0 = time.perf_counter()
+        try:
+            _build(args, cache, corpus, warm)
+        except (OSError, ValueError) as exc:   # e.g. a JSON input caught half-written
+            print("db-graph: watch — build failed: %s" % exc)
+            return
+        print("db-graph: watch — rebuilt in %.2f s" % (time.perf_counter() - t0))
+
+    _build(args, cache, corpus, warm)
+    print("db-graph: watching %s, supabase/migrations and db-graph-out/*.json (Ctrl+C to stop)"
+          % os.path.relpath(sql_dir, ROOT))
+    try:
+        watch(patterns, rebuild, ignore=ignore, interval=interval, debounce=debounce)
+    except KeyboardInterrupt:
+        print("db-graph: watch stopped")
+
+
+def main(argv=None):
+    """Build + write everything; returns the names of the artifacts whose bytes changed."""
+    parser = argparse.ArgumentParser(description="Build the unified DB graph and its artifacts.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reuse db-graph-out/.cache/ for unchanged inputs and skip re-rendering "
+                             "artifacts whose inputs did not change")
+    parser.add_argument("--compact", action="store_true",
+                        help="write graph.json (and the graph.html payload) in the compact columnar "
+                             "format; read it back with dbgraph.load_graph()")
+    parser.add_argument("--viewer", choices=("d3", "canvas"), default="d3",
+                        help="graph.html renderer: `d3` (SVG, fine up to a few hundred nodes) or `canvas` "
+                             "(level of detail; for the full graph). Both start from graph.json's layout")
+    parser.add_argument("--split", action="store_true",
+                        help="graph.html inlines only a skeleton (ids, kinds, domains, edges, layout); "
+                             "docs/props per domain and the search index load from db-graph-out/"
+                             "graph-chunks/ on demand")
+    parser.add_argument("--split-reference", action="store_true",
+                        help="also write db-graph-out/api-db-reference.html, which loads its sections, "
+                             "reference values and search index from db-graph-out/api-db-reference/ as they "
+                             "are needed (long lists are virtually scrolled); docs/ keeps the static page")
+    parser.add_argument("--relayout", action="store_true",
+                        help="lay the graph out from scratch instead of keeping the positions of the "
+                             "nodes graph.json already places")
+    parser.add_argument("--workers", type=int, default=1, metavar="N",
+                        help="infer function-body edges and render the artifacts on N processes "
+                             "(output is identical to N=1)")
+    parser.add_argument("--profile", nargs="?", const="full", choices=("full", "time"),
+                        default={"1": "full", "time": "time"}.get(os.environ.get("DB_GRAPH_PROFILE", "")),
+                        help="record wall/CPU time and (unless `time`) tracemalloc peak per stage into "
+                             "db-graph-out/graph.profile.json; also DB_GRAPH_PROFILE=1|time")
+    parser.add_argument("--sqlite", action="store_true",
+                        help="also write db-graph-out/graph.sqlite (normalised, indexed tables + FTS "
+                             "over docs, signatures and policy predicates)")
+    parser.add_argument("--watch", action="store_true",
+                        help="stay running and rebuild, re-running only the affected stages, whenever "
+                             "the .sql files, supabase/migrations or db-graph-out/*.json change")
+    parser.add_argument("--watch-interval", type=float, default=0.5, metavar="S",
+                        help="--watch polling interval in seconds (default 0.5)")
+    parser.add_argument("--watch-debounce", type=float, default=0.3, metavar="S",
+                        help="--watch: rebuild once the files have been quiet this long (default 0.3)")
+    args = parser.parse_args(argv)
+    if not (os.path.exists(os.path.join(OUT, "schema_tbls.json")) and
+            os.path.exists(os.path.join(OUT, "catalog_extra.json"))):
+        sys.exit("Missing db-graph-out/schema_tbls.json or catalog_extra.json — run tbls + the gap extract first (see tools/db-graph/README.md).")
+    if args.watch:
+        return _watch(args, args.watch_interval, args.watch_debounce)
+    cache = BuildCache(CACHE, salt=_code_digest()) if args.incremental else None
+    return _build(args, cache, SqlCorpus())  # each .sql file is read once, shared by the scanners
 
 
 if __name__ == "__main__":
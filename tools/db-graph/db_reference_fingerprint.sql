@@ -0,0 +1,48 @@
+-- db_reference_fingerprint.sql
+-- Read-only per-table fingerprints for Supabase MCP `execute_sql`, for the delta refresh.
+--
+-- One small row per reference table: its row count and an md5 of the sorted
+-- per-row md5s, which changes with any inserted, updated or deleted row. It is
+-- the same value `dbgraph.reference_extract` computes on the direct TBLS_DSN path.
+-- Save the returned JSON to `db-graph-out/reference_live_fingerprints.json`
+-- BEFORE running `export_reference_live_rest.py --refresh`. The export then
+-- re-pulls only the tables whose fingerprint differs from the one recorded in
+-- `reference_live.json`, and keeps the other tables' rows.
+
+SELECT jsonb_build_object(
+  'queried_at', now(),
+  'reference_fingerprints', (
+    SELECT jsonb_object_agg(table_name, jsonb_build_object('rows', row_count, 'hash', row_hash))
+    FROM (
+      SELECT 'public.ref_actor_role' AS table_name, count(*) AS row_count, md5(coalesce(string_agg(h, '' ORDER BY h), '')) AS row_hash FROM (SELECT md5(t::text) AS h FROM public.ref_actor_role t) s
+      UNION ALL SELECT 'public.ref_amenity', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_amenity t) s
+      UNION ALL SELECT 'public.ref_capacity_applicability', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_capacity_applicability t) s
+      UNION ALL SELECT 'public.ref_capacity_metric', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_capacity_metric t) s
+      UNION ALL SELECT 'public.ref_classification_equivalent_action', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_classification_equivalent_action t) s
+      UNION ALL SELECT 'public.ref_classification_equivalent_group', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_classification_equivalent_group t) s
+      UNION ALL SELECT 'public.ref_classification_scheme', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_classification_scheme t) s
+      UNION ALL SELECT 'public.ref_classification_value', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_classification_value t) s
+      UNION ALL SELECT 'public.ref_code', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_code t) s
+      UNION ALL SELECT 'public.ref_code_domain_registry', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_code_domain_registry t) s
+      UNION ALL SELECT 'public.ref_code_taxonomy_closure', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_code_taxonomy_closure t) s
+      UNION ALL SELECT 'public.ref_commune', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_commune t) s
+      UNION ALL SELECT 'public.ref_contact_role', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_contact_role t) s
+      UNION ALL SELECT 'public.ref_document', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_document t) s
+      UNION ALL SELECT 'public.ref_facet_applicability', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_facet_applicability t) s
+      UNION ALL SELECT 'public.ref_facet_registry', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_facet_registry t) s
+      UNION ALL SELECT 'public.ref_iti_assoc_role', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_iti_assoc_role t) s
+      UNION ALL SELECT 'public.ref_language', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_language t) s
+      UNION ALL SELECT 'public.ref_legal_type', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_legal_type t) s
+      UNION ALL SELECT 'public.ref_object_relation_type', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_object_relation_type t) s
+      UNION ALL SELECT 'public.ref_org_admin_role', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_org_admin_role t) s
+      UNION ALL SELECT 'public.ref_org_business_role', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_org_business_role t) s
+      UNION ALL SELECT 'public.ref_org_role', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_org_role t) s
+      UNION ALL SELECT 'public.ref_permission', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_permission t) s
+      UNION ALL SELECT 'public.ref_review_source', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_review_source t) s
+      UNION ALL SELECT 'public.ref_sustainability_action', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_sustainability_action t) s
+      UNION ALL SELECT 'public.ref_sustainability_action_category', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_sustainability_action_category t) s
+      UNION ALL SELECT 'public.ref_sustainability_action_group', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_sustainability_action_group t) s
+      UNION ALL SELECT 'public.ref_tag', count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) FROM (SELECT md5(t::text) AS h FROM public.ref_tag t) s
+    ) f
+  )
+) AS mcp_reference_fingerprints;
@@ -0,0 +1 @@
+from .compact import load_graph  # noqa: F401
@@ -0,0 +1,128 @@
+"""Content-hash memo for incremental db-graph builds.
+
+Stage results (load_tbls_schema, load_extra, infer_rpc_table_edges, the per-file SQL doc index,
+the per-file reference seed rows) are stored as JSON under `<root>/<stage>/<key>.json`, keyed on the sha256 of exactly
+the inputs the stage reads — so editing one migration re-runs that file's scanners and nothing
+else. `manifest.json` records the input digests of the last build and, per output artifact, the
+digest of what it was rendered from; an artifact whose render inputs did not move is not
+re-rendered. Values round-trip through JSON on every hit, so callers may mutate what they get.
+"""
+import hashlib
+import json
+import os
+
+_MANIFEST = "manifest.json"
+_VERSION = 1
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def bytes_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def json_digest(value):
+    """Digest of a JSON-able value, independent of dict insertion order."""
+    text = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class BuildCache:
+    """Two-level (memory, then disk) memo keyed by (stage, digest).
+
+    `root=None` keeps everything in memory, which is what a warm long-lived process wants; with a
+    root, entries survive across runs and `save()` prunes the ones this build did not touch.
+    `salt` (e.g. a digest of the pipeline's own source) is folded into every key, so editing a
+    parser or renderer invalidates what it produced.
+    """
+
+    def __init__(self, root=None, salt=""):
+        self.root = root
+        self.salt = salt
+        self.hits = 0
+        self.misses = 0
+        self._memory = {}
+        self._used = set()
+        self.manifest = {"version": _VERSION, "salt": salt, "inputs": {}, "outputs": {}}
+        if root and os.path.exists(os.path.join(root, _MANIFEST)):
+            try:
+                with open(os.path.join(root, _MANIFEST), encoding="utf-8") as f:
+                    loaded = json.load(f)
+                if loaded.get("version") == _VERSION and loaded.get("salt") == salt:
+                    self.manifest = loaded
+            except (OSError, ValueError):
+                pass
+        self._inputs = {}
+        self._outputs = {}
+
+    def _path(self, stage, key):
+        return os.path.join(self.root, stage, key + ".json")
+
+    def memo(self, stage, key, compute):
+        """Return compute()'s value for (stage, key), computing it at most once per key."""
+        if self.salt:
+            key = hashlib.sha256((self.salt + key).encode("utf-8")).hexdigest()
+        self._used.add((stage, key))
+        text = self._memory.get((stage, key))
+        if text is None and self.root:
+            try:
+                with open(self._path(stage, key), encoding="utf-8") as f:
+                    text = f.read()
+            except OSError:
+                text = None
+            if text is not None:
+                self._memory[(stage, key)] = text
+        if text is not None:
+            self.hits += 1
+            return json.loads(text)
+        self.misses += 1
+        text = json.dumps(compute(), ensure_ascii=False, separators=(",", ":"))
+        self._memory[(stage, key)] = text
+        if self.root:
+            path = self._path(stage, key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return json.loads(text)
+
+    def track_input(self, name, digest):
+        """Record an input's digest for this build; returns True when it changed since the last one."""
+        self._inputs[name] = digest
+        return self.manifest["inputs"].get(name) != digest
+
+    def changed_inputs(self):
+        previous = self.manifest["inputs"]
+        names = set(previous) | set(self._inputs)
+        return sorted(n for n in names if previous.get(n) != self._inputs.get(n))
+
+    def output_fresh(self, name, path, digest):
+        """True when `path` exists and was last rendered from inputs with this digest."""
+        self._outputs[name] = digest
+        return self.manifest["outputs"].get(name) == digest and os.path.exists(path)
+
+    def save(self):
+        self.manifest = {"version": _VERSION, "salt": self.salt, "inputs": dict(sorted(self._inputs.items())),
+                         "outputs": dict(sorted(self._outputs.items()))}
+        self._inputs, self._outputs = {}, {}
+        self.hits = self.misses = 0
+        self._memory = {k: v for k, v in self._memory.items() if k in self._used}
+        if not self.root:
+            self._used = set()
+            return
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, _MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=1)
+        for stage in os.listdir(self.root):
+            stage_dir = os.path.join(self.root, stage)
+            if not os.path.isdir(stage_dir):
+                continue
+            for name in os.listdir(stage_dir):
+                if name.endswith(".json") and (stage, name[:-5]) not in self._used:
+                    os.remove(os.path.join(stage_dir, name))
+        self._used = set()
@@ -0,0 +1,183 @@
+"""Canvas viewer for large graphs (`db_graph.py --viewer canvas`): the same graph.html, drawn on a
+2D canvas from the positions graph.json carries (`layout`, see dbgraph/layout.py) instead of a live
+d3 simulation.
+
+Nothing runs on load but one JSON parse and one draw, and no script is fetched from a CDN. Edges
+are stroked as a few batched paths; only nodes inside the viewport are drawn. Level of detail:
+below `SAT_ZOOM` each table's policies and triggers are collapsed into it (a ring with the count),
+and their edges are drawn from the table; zooming in fans them out on their precomputed ring.
+Labels appear by kind as the zoom passes each threshold. `--split` works here too (dbgraph/chunks.py).
+"""
+from .chunks import CHUNK_JS
+from .compact import EXPAND_JS
+from .render import inline_payloads
+from .search import SEARCH_JS
+
+_HTML = r"""<!doctype html><html><head><meta charset="utf-8"><title>DB graph</title>
+<style>
+:root{--bg:#0d1117;--panel:rgba(22,27,34,.94);--fg:#d7dde5;--muted:#8b949e;--border:#30363d;--chip:#21262d;--code:#161b22}
+html,body{margin:0;height:100%;background:var(--bg);color:var(--fg);font:13px/1.45 system-ui,"Segoe UI",sans-serif;overflow:hidden}
+#cv{position:fixed;left:0;top:0;cursor:grab}
+#cv.drag{cursor:grabbing}
+#bar{position:fixed;left:0;top:0;right:320px;z-index:2;padding:8px 10px;background:var(--panel);border-bottom:1px solid var(--border)}
+#bar input{background:var(--chip);border:1px solid var(--border);color:var(--fg);border-radius:6px;padding:3px 8px;width:260px;outline:none}
+#meta{color:var(--muted);margin-left:8px}
+#fit{float:right;cursor:pointer;background:var(--chip);border:1px solid var(--border);color:var(--fg);border-radius:6px;padding:3px 10px}
+.row{margin-top:6px;display:flex;align-items:baseline;gap:6px;flex-wrap:wrap}
+.rowlab{color:var(--muted);font-size:11px;text-transform:uppercase;width:64px;flex:none}
+.chip{cursor:pointer;border:1px solid var(--border);background:var(--chip);border-radius:12px;padding:1px 9px;
+  user-select:none;display:inline-flex;align-items:center;gap:5px;font-size:12px}
+.chip.off{opacity:.4}
+.chip .ct{color:var(--muted);font-size:10px}
+.dot{width:8px;height:8px;border-radius:50%;display:inline-block;flex:none}
+#side{position:fixed;right:0;top:0;width:320px;height:100%;overflow:auto;border-left:1px solid var(--border);
+  padding:10px;background:var(--panel);box-sizing:border-box;z-index:2}
+#side h3{margin:4px 0 2px}
+#side h4{margin:10px 0 2px;color:var(--muted);font-size:11px;text-transform:uppercase}
+#side pre{white-space:pre-wrap;background:var(--code);border:1px solid var(--border);padding:6px;border-radius:6px;font-size:11px}
+#side code{background:var(--code);padding:0 3px;border-radius:3px}
+#side ul{margin:4px 0;padding-left:18px}
+.muted{color:var(--muted)}
+.conn{cursor:pointer;padding:2px 4px;border-radius:4px;display:flex;gap:6px;align-items:center}
+.conn:hover{background:var(--chip)}
+</style></head><body>
+<canvas id="cv"></canvas>
+<div id="bar">
+  <button id="fit">Fit</button>
+  <input id="q" placeholder="search… (names, docs, signatures, predicates)"><span id="meta"></span>
+  <div class="row"><span class="rowlab">Kinds</span><span id="kinds"></span></div>
+  <div class="row"><span class="rowlab">Domains</span><span id="doms"></span></div>
+</div>
+<div id="side"></div>
+<script>
+""" + EXPAND_JS + CHUNK_JS + r"""const G = expandSkeleton(expandGraph(__GRAPH__));
+const L = G.layout||{};
+let S = __SEARCH__;
+""" + SEARCH_JS + r"""const KCOLOR={table:"#2ea043",view:"#56d4a0",matview:"#56d4a0",enum:"#a78bfa",function:"#f0883e",policy:"#539bf5",trigger:"#d4a72c"};
+const TABLELIKE=new Set(["table","view","matview"]),SAT=new Set(["policy","trigger"]);
+const SAT_ZOOM=1.6,SIDEW=320,LABEL_ZOOM={table:.7,view:.7,matview:.7,enum:.9,function:1.6,policy:2.6,trigger:2.6};
+const esc=s=>String(s).replace(/&/g,"&amp;").replace(/</g,"&lt;").replace(/>/g,"&gt;").replace(/"/g,"&quot;").replace(/'/g,"&#39;");
+const byId={};
+G.nodes.forEach(n=>{byId[n.id]=n;const p=L[n.id]||[0,0];n.x=p[0];n.y=p[1];});
+G.edges.forEach(e=>{e.s=byId[e.source];e.t=byId[e.target];});
+const owner=n=>SAT.has(n.kind)&&n.props.table&&byId[n.props.table]?byId[n.props.table]:null;
+const satCount={};G.nodes.forEach(n=>{const o=owner(n);if(o)satCount[o.id]=(satCount[o.id]||0)+1;});
+const adj=new Map();
+G.edges.forEach(e=>{[[e.source,e.target],[e.target,e.source]].forEach(([a,b])=>{if(!adj.has(a))adj.set(a,new Set());adj.get(a).add(b);});});
+const radius=n=>n.kind==="table"?6:TABLELIKE.has(n.kind)?5:n.kind==="enum"?4.5:n.kind==="function"?3.5:2.5;
+document.getElementById("meta").textContent=G.meta.table_count+" tables · "+G.meta.function_count+" fns · "+
+  G.meta.policy_count+" policies · "+G.meta.edge_count+" edges";
+// filters
+const kinds=[...new Set(G.nodes.map(n=>n.kind))].sort(),doms=[...new Set(G.nodes.map(n=>n.domain||"unclassified"))].sort();
+const kindOn=Object.fromEntries(kinds.map(x=>[x,true])),domOn=Object.fromEntries(doms.map(x=>[x,true]));
+function chips(el,names,on,color){const ct={};
+  G.nodes.forEach(n=>{const v=el==="kinds"?n.kind:n.domain||"unclassified";ct[v]=(ct[v]||0)+1;});
+  names.forEach(x=>{const c=document.createElement("span");c.className="chip";
+    c.innerHTML=(color?"<span class=dot style='background:"+(KCOLOR[x]||"#888")+"'></span>":"")+esc(x)+" <span class=ct>"+ct[x]+"</span>";
+    c.onclick=()=>{on[x]=!on[x];c.classList.toggle("off",!on[x]);redraw();
+      if(el==="doms"&&on[x])loadDomain(x).catch(()=>{});};
+    document.getElementById(el).appendChild(c);});}
+chips("kinds",kinds,kindOn,true);chips("doms",doms,domOn,false);
+const visible=n=>kindOn[n.kind]&&domOn[n.domain||"unclassified"];
+let k=1,tx=0,ty=0,sel=null,q="",hits=new Set(),pending=false;
+// a satellite is drawn itself once zoomed in, else it stands in at its table (if that is shown)
+const shown=n=>visible(n)&&(k>=SAT_ZOOM||!owner(n));
+const at=n=>shown(n)?n:(owner(n)&&visible(owner(n))?owner(n):null);
+const matches=n=>hits.has(n.id)||n.id.toLowerCase().includes(q);
+// canvas
+const cv=document.getElementById("cv"),ctx=cv.getContext("2d");
+let W=0,H=0,DPR=1;
+function resize(){DPR=devicePixelRatio||1;W=innerWidth-SIDEW;H=innerHeight;
+  cv.width=W*DPR;cv.height=H*DPR;cv.style.width=W+"px";cv.style.height=H+"px";redraw();}
+function redraw(){if(!pending){pending=true;requestAnimationFrame(draw);}}
+function draw(){
+  pending=false;
+  ctx.setTransform(DPR,0,0,DPR,0,0);ctx.clearRect(0,0,W,H);
+  ctx.setTransform(DPR*k,0,0,DPR*k,DPR*tx,DPR*ty);
+  const pad=40/k,x0=-tx/k-pad,y0=-ty/k-pad,x1=(W-tx)/k+pad,y1=(H-ty)/k+pad;
+  const inView=n=>n.x>=x0&&n.x<=x1&&n.y>=y0&&n.y<=y1;
+  const focus=sel?new Set([sel.id,...(adj.get(sel.id)||[])]):null;
+  const lit=n=>focus?focus.has(n.id):q?matches(n):true;
+  const dim=new Path2D(),hot=new Path2D();
+  for(const e of G.edges){const a=at(e.s),b=at(e.t);
+    if(!a||!b||a===b||!(inView(a)||inView(b)))continue;
+    const p=sel&&(e.s===sel||e.t===sel)||(!sel&&q&&matches(e.s)&&matches(e.t))?hot:dim;
+    p.moveTo(a.x,a.y);p.lineTo(b.x,b.y);}
+  ctx.lineWidth=1/k;
+  ctx.strokeStyle=sel||q?"rgba(70,80,96,.12)":"rgba(70,80,96,.45)";ctx.stroke(dim);
+  ctx.strokeStyle="#ffb454";ctx.lineWidth=1.6/k;ctx.stroke(hot);
+  const labels=[];
+  for(const n of G.nodes){if(!shown(n)||!inView(n))continue;
+    const on=lit(n),r=radius(n);
+    ctx.globalAlpha=on?1:.12;ctx.fillStyle=KCOLOR[n.kind]||"#888";
+    ctx.beginPath();ctx.arc(n.x,n.y,r,0,6.2832);ctx.fill();
+    if(k<SAT_ZOOM&&satCount[n.id]){ctx.strokeStyle="#539bf5";ctx.lineWidth=Math.min(3,1+satCount[n.id]/6)/k*1.5;
+      ctx.beginPath();ctx.arc(n.x,n.y,r+2.5/k+1,0,6.2832);ctx.stroke();}
+    if(n===sel){ctx.strokeStyle="#ffb454";ctx.lineWidth=2.5/k;ctx.beginPath();ctx.arc(n.x,n.y,r+1.5,0,6.2832);ctx.stroke();}
+    if(on&&(k>=(LABEL_ZOOM[n.kind]||2)||focus||(q&&matches(n))))labels.push(n);}
+  ctx.globalAlpha=1;ctx.setTransform(DPR,0,0,DPR,0,0);
+  ctx.font="10px system-ui,sans-serif";ctx.lineWidth=3;ctx.strokeStyle="#0d1117";ctx.fillStyle="#d7dde5";
+  for(const n of labels.slice(0,600)){const sx=n.x*k+tx+radius(n)*k+3,sy=n.y*k+ty+3;
+    const t=n.label+(k<SAT_ZOOM&&satCount[n.id]?" +"+satCount[n.id]:"");
+    ctx.strokeText(t,sx,sy);ctx.fillText(t,sx,sy);}
+}
+function zoomTo(nk,cx,cy){nk=Math.max(.05,Math.min(12,nk));tx=cx-(cx-tx)*nk/k;ty=cy-(cy-ty)*nk/k;k=nk;redraw();}
+function centerOn(n,nk){k=nk;tx=W/2-n.x*k;ty=H/2-n.y*k;redraw();}
+function fit(){const ns=G.nodes.filter(n=>visible(n)&&!owner(n));if(!ns.length)return;
+  const xs=ns.map(n=>n.x),ys=ns.map(n=>n.y),minX=Math.min(...xs),maxX=Math.max(...xs),minY=Math.min(...ys),maxY=Math.max(...ys);
+  k=Math.max(.05,Math.min(4,.9*Math.min(W/(maxX-minX+80),(H-90)/(maxY-minY+80))));
+  tx=W/2-k*(minX+maxX)/2;ty=90+(H-90)/2-k*(minY+maxY)/2;redraw();}
+// pointer: wheel zooms about the cursor, drag pans, a click picks the nearest drawn node
+cv.addEventListener("wheel",e=>{e.preventDefault();zoomTo(k*Math.exp(-e.deltaY*.0015),e.offsetX,e.offsetY);},{passive:false});
+let down=null;
+cv.addEventListener("mousedown",e=>{down={x:e.offsetX,y:e.offsetY,tx,ty,moved:false};cv.classList.add("drag");});
+addEventListener("mousemove",e=>{if(!down)return;const dx=e.clientX-down.x,dy=e.clientY-down.y;
+  if(Math.abs(dx)+Math.abs(dy)>3)down.moved=true;if(down.moved){tx=down.tx+dx;ty=down.ty+dy;redraw();}});
+addEventListener("mouseup",e=>{if(!down)return;const click=!down.moved;down=null;cv.classList.remove("drag");
+  if(click&&e.target===cv)pick(e.offsetX,e.offsetY);});
+function pick(sx,sy){const wx=(sx-tx)/k,wy=(sy-ty)/k;let best=null,bd=Infinity;
+  for(const n of G.nodes){if(!shown(n))continue;const d=(n.x-wx)**2+(n.y-wy)**2,r=radius(n)+4/k;
+    if(d<r*r&&d<bd){best=n;bd=d;}}
+  if(best)select(best);else if(sel){sel=null;redraw();side();}}
+function select(n){sel=n;if(owner(n)&&k<SAT_ZOOM)centerOn(n,SAT_ZOOM);redraw();detail(n);}
+function selectById(id){const n=byId[id];if(!n)return;sel=n;centerOn(n,Math.max(k,owner(n)?SAT_ZOOM:1.4));detail(n);}
+// side panel
+function row(id){const n=byId[id];return "<div class=conn data-id='"+esc(id)+"'><span class=dot style='background:"+
+  (n?KCOLOR[n.kind]||"#888":"#888")+"'></span>"+esc(n?n.label:id)+(n?" <span class=muted>("+esc(n.kind)+")</span>":"")+"</div>";}
+function wire(s){s.querySelectorAll(".conn").forEach(el=>el.onclick=()=>selectById(el.dataset.id));}
+function detail(d){
+  let h="<h3>"+esc(d.label)+"</h3><p class=muted>"+esc(d.kind)+" · "+esc(d.schema)+" · "+esc(d.domain)+"</p>";
+  if(d.lazy){document.getElementById("side").innerHTML=h+"<p class=muted>loading details…</p>";
+    nodeDetail(d).then(()=>{if(sel===d)detail(d);},err=>{if(sel===d)document.getElementById("side").innerHTML=h+
+      "<p class=muted>"+esc(err.message)+"</p>";});return;}
+  if(d.doc)h+="<pre>"+esc(d.doc)+"</pre>";
+  if(d.props.columns)h+="<ul>"+d.props.columns.map(c=>"<li><code>"+esc(c.name)+"</code> : "+esc(c.type)+(c.pk?" 🔑":"")+"</li>").join("")+"</ul>";
+  if(d.props.signature)h+="<p><code>"+esc(d.props.signature)+" → "+esc(d.props.returns)+"</code></p>";
+  if(d.props.values)h+="<p>"+d.props.values.map(esc).join(", ")+"</p>";
+  if(d.props.predicate)h+="<pre>"+esc(d.props.predicate)+"</pre>";
+  const out={},inn={};
+  G.edges.forEach(e=>{if(e.source===d.id)(out[e.kind]=out[e.kind]||[]).push(e.target);
+    else if(e.target===d.id)(inn[e.kind]=inn[e.kind]||[]).push(e.source);});
+  const grp=(o,arrow)=>Object.keys(o).sort().map(kk=>"<h4>"+esc(kk)+" "+arrow+" ("+o[kk].length+")</h4>"+o[kk].sort().map(row).join("")).join("");
+  const conn=grp(out,"→")+grp(inn,"←");
+  if(conn)h+="<h4>Connections</h4>"+conn;
+  const s=document.getElementById("side");s.innerHTML=h;s.scrollTop=0;wire(s);}
+function side(ranked){const s=document.getElementById("side");
+  if(ranked){s.innerHTML="<h3>Search</h3><p class=muted>"+ranked.length+" ranked match(es)</p>"+
+    ranked.slice(0,30).map(([id,sc])=>row(id).replace("</div>"," <span class=muted>"+sc.toFixed(1)+"</span></div>")).join("");wire(s);return;}
+  s.innerHTML="<h3>DB graph</h3><p class=muted>Precomputed layout on a canvas. Scroll to zoom, drag to pan, click a node "+
+    "to inspect it. Policies and triggers are folded into their table (ring, +N) until you zoom past "+SAT_ZOOM+"×.</p>";}
+document.getElementById("q").addEventListener("input",function onInput(e){if(!withSearch(()=>onInput(e)))return;
+  q=e.target.value.trim().toLowerCase();
+  const ranked=q?searchRank(e.target.value):[];hits=new Set(ranked.map(r=>r[0]));redraw();
+  if(!sel)side(q?ranked:null);});
+document.getElementById("fit").onclick=fit;
+addEventListener("resize",resize);
+resize();fit();side();
+</script></body></html>"""
+
+
+def render_canvas_html(g, compact=False, search=None, split=False):
+    """graph.html for the canvas viewer (arguments as render_html); nodes without a `layout`
+    position are drawn at the origin."""
+    return inline_payloads(_HTML, g, compact, search, split)
@@ -0,0 +1,119 @@
+"""Split graph.html (`db_graph.py --split`): the page inlines only a skeleton of the graph and loads
+the rest from db-graph-out/graph-chunks/ when it is first needed.
+
+The skeleton has what drawing, filtering and the connection lists need: node ids, kinds, labels,
+schemas, domains, the edges (without props) and the layout. Each domain's docs and props (columns,
+signatures, predicates, ...) go into its own chunk, which is loaded when one of its nodes is selected
+or its domain chip is switched on; the search index is a chunk loaded on the first keystroke.
+
+A chunk is a script, `dbgraphChunk("<file>", {...});`, injected as a <script> tag rather than
+fetched: the page is opened from disk, and browsers refuse fetch() of file:// URLs but not scripts.
+"""
+import json
+import re
+
+FORMAT = "dbgraph-skeleton/1"
+CHUNK_DIR = "graph-chunks"
+SEARCH_CHUNK = "_search.js"
+_SKELETON_KEYS = ("id", "kind", "label", "schema", "domain")
+
+
+def _domain_key(n):
+    return n.get("domain") or "unclassified"
+
+
+def chunk_names(g):
+    """{domain key: chunk file name}; names are slugs, made unique in domain order."""
+    out, taken = {}, {SEARCH_CHUNK}
+    for domain in sorted({_domain_key(n) for n in g["nodes"]}):
+        slug = re.sub(r"[^a-z0-9_-]+", "_", domain.lower()).strip("_") or "domain"
+        name, i = slug + ".js", 1
+        while name in taken:
+            i += 1
+            name = "%s_%d.js" % (slug, i)
+        taken.add(name)
+        out[domain] = name
+    return out
+
+
+def skeleton(g):
+    kinds, schemas, domains, position = [], [], [], {}
+
+    def intern(values, value):
+        if value is None:
+            return None
+        if value not in values:
+            values.append(value)
+        return values.index(value)
+
+    nodes = []
+    for n in g["nodes"]:
+        position.setdefault(n["id"], len(nodes))
+        nodes.append([n["id"], intern(kinds, n.get("kind")), n.get("label"), intern(schemas, n.get("schema")),
+                      intern(domains, n.get("domain"))])
+    dangling = []
+
+    def ids(node_id):
+        if node_id not in position:
+            position[node_id] = len(nodes) + len(dangling)
+            dangling.append(node_id)
+        return position[node_id]
+
+    edges = [[ids(e["source"]), ids(e["target"]), intern(kinds, e["kind"])] for e in g["edges"]]
+    return {"format": FORMAT, "top": {k: v for k, v in g.items() if k not in ("nodes", "edges")},
+            "chunk_dir": CHUNK_DIR, "chunks": chunk_names(g), "search_chunk": SEARCH_CHUNK,
+            "kinds": kinds, "schemas": schemas, "domains": domains, "ids": dangling,
+            "nodes": nodes, "edges": edges}
+
+
+def chunk_script(name, data):
+    """A chunk file: a script that hands `data` to the page's dbgraphChunk()."""
+    return "dbgraphChunk(%s,%s);\n" % (json.dumps(name), json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+
+
+def chunk_files(g, search):
+    """{file name: script text}: one detail chunk per domain, plus the search index."""
+    names = chunk_names(g)
+    details = {name: {} for name in names.values()}
+    for n in g["nodes"]:
+        details[names[_domain_key(n)]][n["id"]] = {k: v for k, v in n.items() if k not in _SKELETON_KEYS}
+    files = {name: chunk_script(name, {"nodes": nodes}) for name, nodes in details.items()}
+    files[SEARCH_CHUNK] = chunk_script(SEARCH_CHUNK, search)
+    return files
+
+
+# Page side, any page: loadChunk(name, dir) -> Promise of the chunk's data, one <script> per chunk.
+LOADER_JS = r"""const CHUNKS={},CHUNK_WAIT={};
+function dbgraphChunk(name,data){CHUNKS[name]=data;(CHUNK_WAIT[name]||[]).forEach(w=>w[0](data));delete CHUNK_WAIT[name];}
+function loadChunk(name,dir=G.chunk_dir){
+  if(name in CHUNKS)return Promise.resolve(CHUNKS[name]);
+  return new Promise((ok,ko)=>{
+    if(CHUNK_WAIT[name]){CHUNK_WAIT[name].push([ok,ko]);return;}
+    CHUNK_WAIT[name]=[[ok,ko]];
+    const el=document.createElement("script");el.src=dir+"/"+name;
+    el.onerror=()=>{const w=CHUNK_WAIT[name]||[];delete CHUNK_WAIT[name];el.remove();
+      w.forEach(x=>x[1](new Error("could not load "+el.src)));};
+    document.head.appendChild(el);});}
+"""
+
+# The graph viewers: expandSkeleton(payload) (anything else passes through), the loader, and the
+# per-domain merge; skeleton nodes carry `lazy: true` until their chunk is in.
+CHUNK_JS = LOADER_JS + r"""function expandSkeleton(c){
+  if(c.format!=="dbgraph-skeleton/1")return c;
+  const ids=c.nodes.map(r=>r[0]).concat(c.ids),pick=(t,i)=>i==null?null:t[i];
+  const nodes=c.nodes.map(r=>({id:r[0],kind:c.kinds[r[1]],label:r[2],schema:pick(c.schemas,r[3]),
+    domain:pick(c.domains,r[4]),doc:null,props:{},lazy:true}));
+  const edges=c.edges.map(r=>({source:ids[r[0]],target:ids[r[1]],kind:c.kinds[r[2]],props:{}}));
+  return Object.assign({},c.top,{nodes,edges,chunk_dir:c.chunk_dir,chunks:c.chunks,search_chunk:c.search_chunk});
+}
+const MERGED=new Set();
+// -> Promise; fills in doc/props of every node in the domain (once)
+function loadDomain(dom){const name=G.chunks&&G.chunks[dom];
+  if(!name||MERGED.has(name))return Promise.resolve();
+  return loadChunk(name).then(d=>{if(MERGED.has(name))return;MERGED.add(name);
+    G.nodes.forEach(n=>{const x=d.nodes[n.id];if(x){Object.assign(n,x);delete n.lazy;}});});}
+const nodeDetail=n=>n.lazy?loadDomain(n.domain||"unclassified"):Promise.resolve();
+// true when the search index is in; otherwise starts loading it and calls `then` once it is
+function withSearch(then){if(S||!G.search_chunk)return true;
+  loadChunk(G.search_chunk).then(d=>{if(!S)S=d;then();},()=>{});return false;}
+"""
@@ -0,0 +1,222 @@
+"""Compact columnar serialisation of the unified graph, and the reader for both formats.
+
+graph.json is normally the dict model dumped with indent=1. The compact form interns the strings
+that repeat on every node/edge — ids (edges point at node positions), kinds, schemas, domains —
+stores node fields as columns, table columns as `[name, type, nullable, pk]` rows with interned
+types, edges as `[source, target, kind]` integer rows (props appended unless exactly `{}`), and is
+written without indentation. `from_compact(to_compact(g)) == g`, key order
+included; a node or edge that does not have the standard key set is carried verbatim.
+"""
+import json
+from collections.abc import Mapping, Sequence
+
+FORMAT = "dbgraph-compact/1"
+_NODE_KEYS = ("id", "kind", "label", "schema", "domain", "doc", "props")
+_EDGE_KEYS = ("source", "target", "kind", "props")
+_COLUMN_KEYS = ("name", "type", "nullable", "pk")
+
+
+class _Interner:
+    def __init__(self):
+        self.values = []
+        self._pos = {}
+
+    def __call__(self, value):
+        if value is None:
+            return None
+        if value not in self._pos:
+            self._pos[value] = len(self.values)
+            self.values.append(value)
+        return self._pos[value]
+
+
+def _column_rows(columns, types):
+    """Table columns as rows, or None when any entry is not the standard column shape."""
+    if not isinstance(columns, list) or not all(isinstance(c, dict) and tuple(c) == _COLUMN_KEYS for c in columns):
+        return None
+    return [[c["name"], types(c["type"]), c["nullable"], c["pk"]] for c in columns]
+
+
+def to_compact(g):
+    kinds, schemas, domains, types = _Interner(), _Interner(), _Interner(), _Interner()
+    cols = {"id": [], "kind": [], "label": [], "schema": [], "domain": [], "doc": [], "props": [], "columns": []}
+    verbatim_nodes = {}
+    for i, n in enumerate(g["nodes"]):
+        cols["id"].append(n.get("id"))
+        if tuple(n) != _NODE_KEYS:
+            verbatim_nodes[str(i)] = n
+            n = {k: None for k in _NODE_KEYS}
+        cols["kind"].append(kinds(n["kind"]))
+        cols["label"].append(n["label"])
+        cols["schema"].append(schemas(n["schema"]))
+        cols["domain"].append(domains(n["domain"]))
+        cols["doc"].append(n["doc"])
+        props, rows = n["props"], None
+        if isinstance(props, dict) and "columns" in props:
+            rows = _column_rows(props["columns"], types)
+            if rows is not None:
+                # keep the key (and so the props key order) with a placeholder; rows live in their own column
+                props = dict(props, columns=None)
+        cols["props"].append(props)
+        cols["columns"].append(rows)
+    # edge endpoints are node positions; an id that is not a node (dangling) is interned after them
+    position = {}
+    for i, node_id in enumerate(cols["id"]):
+        position.setdefault(node_id, i)
+    dangling = _Interner()
+
+    def ids(node_id):
+        if node_id in position:
+            return position[node_id]
+        return len(cols["id"]) + dangling(node_id)
+
+    edges = []
+    for e in g["edges"]:
+        if tuple(e) != _EDGE_KEYS:
+            edges.append(e)
+            continue
+        row = [ids(e["source"]), ids(e["target"]), kinds(e["kind"])]
+        if e["props"] != {} or not isinstance(e["props"], dict):   # None, [] ... are kept as they are
+            row.append(e["props"])
+        edges.append(row)
+    out = {"format": FORMAT, "keys": list(g),
+           "ids": dangling.values, "kinds": kinds.values,
+           "schemas": schemas.values, "domains": domains.values, "types": types.values,
+           "nodes": cols, "edges": edges}
+    if verbatim_nodes:
+        out["verbatim_nodes"] = verbatim_nodes
+    for key, value in g.items():
+        if key not in ("nodes", "edges"):
+            out.setdefault("top", {})[key] = value
+    return out
+
+
+def _pick(table, i):
+    return None if i is None else table[i]
+
+
+class LazyNode(Mapping):
+    """A read-only node view over the compact columns; props are only expanded when asked for."""
+    __slots__ = ("_c", "_i")
+
+    def __init__(self, compact, i):
+        self._c = compact
+        self._i = i
+
+    def __getitem__(self, key):
+        c, i = self._c, self._i
+        verbatim = c.get("verbatim_nodes")
+        if verbatim and str(i) in verbatim:
+            return verbatim[str(i)][key]
+        cols = c["nodes"]
+        if key == "kind":
+            return c["kinds"][cols["kind"][i]]
+        if key == "schema":
+            return _pick(c["schemas"], cols["schema"][i])
+        if key == "domain":
+            return _pick(c["domains"], cols["domain"][i])
+        if key == "props":
+            rows = cols["columns"][i]
+            if rows is None:
+                return cols["props"][i]
+            types = c["types"]
+            columns = [{"name": r[0], "type": types[r[1]], "nullable": r[2], "pk": r[3]} for r in rows]
+            return dict(cols["props"][i], columns=columns)
+        if key in _NODE_KEYS:
+            return cols[key][i]
+        raise KeyError(key)
+
+    def __iter__(self):
+        verbatim = self._c.get("verbatim_nodes")
+        if verbatim and str(self._i) in verbatim:
+            return iter(verbatim[str(self._i)])
+        return iter(_NODE_KEYS)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def expand(self):
+        return {k: self[k] for k in self}
+
+
+class LazyNodes(Sequence):
+    def __init__(self, compact):
+        self._c = compact
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return LazyNode(self._c, i)
+
+    def __len__(self):
+        return len(self._c["nodes"]["kind"])
+
+
+def _edges(c):
+    ids = c["nodes"]["id"] + c["ids"]
+    out = []
+    for row in c["edges"]:
+        if isinstance(row, dict):
+            out.append(row)
+            continue
+        out.append({"source": ids[row[0]], "target": ids[row[1]], "kind": c["kinds"][row[2]],
+                    "props": row[3] if len(row) > 3 else {}})
+    return out
+
+
+def from_compact(c, lazy=False):
+    """Expand a compact payload back into the dict model (nodes as LazyNode views when lazy)."""
+    if c.get("format") != FORMAT:
+        raise ValueError("Unsupported compact graph format: %r" % c.get("format"))
+    nodes = LazyNodes(c)
+    if not lazy:
+        nodes = [n.expand() for n in nodes]
+    top = c.get("top", {})
+    out = {}
+    for key in c["keys"]:
+        if key == "nodes":
+            out[key] = nodes
+        elif key == "edges":
+            out[key] = _edges(c)
+        else:
+            out[key] = top[key]
+    return out
+
+
+def dumps_graph(g, compact=False):
+    """The graph.json text: indent=1 dict model, or the compact form without whitespace."""
+    if compact:
+        return json.dumps(to_compact(g), ensure_ascii=False, separators=(",", ":"))
+    return json.dumps(g, ensure_ascii=False, indent=1)
+
+
+def load_graph(path, lazy=False):
+    """Read graph.json in either format and return the dict model.
+
+    With `lazy=True` a compact file's nodes stay as read-only `LazyNode` views over the columns
+    (nothing per-node is built until accessed); call `.expand()` on one for a plain dict.
+    """
+    with open(path, encoding="utf-8") as f:
+        payload = json.load(f)
+    if isinstance(payload, dict) and payload.get("format") == FORMAT:
+        return from_compact(payload, lazy=lazy)
+    return payload
+
+
+# The page-side expandGraph(payload): either format -> the dict model, for the viewers that inline graph.json.
+EXPAND_JS = r"""function expandGraph(c){
+  if(c.format!=="dbgraph-compact/1")return c;
+  const N=c.nodes,ids=N.id.concat(c.ids),vb=c.verbatim_nodes||{},pick=(t,i)=>i==null?null:t[i];
+  const nodes=N.id.map((id,i)=>{if(vb[i])return vb[i];
+    let props=N.props[i];const rows=N.columns[i];
+    if(rows)props=Object.assign({},props,{columns:rows.map(r=>({name:r[0],type:c.types[r[1]],nullable:r[2],pk:r[3]}))});
+    return {id,kind:c.kinds[N.kind[i]],label:N.label[i],schema:pick(c.schemas,N.schema[i]),
+      domain:pick(c.domains,N.domain[i]),doc:N.doc[i],props};});
+  const edges=c.edges.map(r=>Array.isArray(r)?{source:ids[r[0]],target:ids[r[1]],kind:c.kinds[r[2]],props:r.length>3?r[3]:{}}:r);
+  return Object.assign({},c.top||{},{nodes,edges});
+}
+"""
@@ -0,0 +1,89 @@
+"""Read-once view of the SQL files a build scans.
+
+`attach_sql_docs` and `extract_reference_values` walk the same `Base de donnée DLL et API/*.sql`
+files. A `SqlCorpus` shared between them reads (and digests) each file once and keeps, per file,
+the newline-normalised text and its line-offset table (built on first use). The doc scanner matches
+over a file's whole text, so that text is held for as long as the corpus lives;
+`extract_reference_values` streams the files the corpus does not hold instead.
+"""
+import hashlib
+import os
+from bisect import bisect_left
+
+
+class LineIndex:
+    """Newline offsets of a text; `line_for(offset)` is a bisect instead of counting from the start."""
+
+    def __init__(self, text):
+        newlines = []
+        pos = text.find("\n")
+        while pos != -1:
+            newlines.append(pos)
+            pos = text.find("\n", pos + 1)
+        self._newlines = newlines
+
+    def line_for(self, offset):
+        """1-based line of `offset` (== text.count("\\n", 0, offset) + 1)."""
+        return bisect_left(self._newlines, offset) + 1
+
+
+class SqlFile:
+    def __init__(self, path, text, digest):
+        self.path = path
+        self.text = text
+        self.digest = digest  # sha256 of the raw bytes, as cache.file_digest
+        self._lines = None
+
+    @property
+    def lines(self):
+        if self._lines is None:
+            self._lines = LineIndex(self.text)
+        return self._lines
+
+
+def _signature(st):
+    return st.st_mtime_ns, st.st_size
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        data = f.read()
+    return _signature(st), hashlib.sha256(data).hexdigest(), data.decode("utf-8")
+
+
+class SqlCorpus:
+    """Per-path SqlFile cache. `get` raises OSError / UnicodeDecodeError like open().read().decode().
+
+    A long-lived corpus (watch mode) calls `refresh()` before each build to drop the files whose
+    mtime/size moved since they were read."""
+
+    def __init__(self):
+        self.reads = 0
+        self._files = {}   # normalised path -> (mtime_ns, size), SqlFile
+
+    def get(self, path):
+        key = os.path.normcase(os.path.abspath(path))
+        entry = self._files.get(key)
+        if entry is None:
+            sig, digest, text = _read(path)
+            self.reads += 1
+            entry = sig, SqlFile(path, text.replace("\r\n", "\n").replace("\r", "\n"), digest)
+            self._files[key] = entry
+        return entry[1]
+
+    def refresh(self):
+        """Forget files that changed or disappeared on disk; returns their paths."""
+        stale = []
+        for key, (sig, sql_file) in list(self._files.items()):
+            try:
+                fresh = _signature(os.stat(key)) == sig
+            except OSError:
+                fresh = False
+            if not fresh:
+                del self._files[key]
+                stale.append(sql_file.path)
+        return sorted(stale)
+
+    def __contains__(self, path):
+        return os.path.normcase(os.path.abspath(path)) in self._files
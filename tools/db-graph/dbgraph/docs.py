@@ -5,6 +5,9 @@ defined and not the inline `--` header blocks that often document RPC behavior.
 """
 import re
 
+from .cache import bytes_digest
+from .corpus import LineIndex, SqlCorpus
+
 
 def _source_path(path):
     cleaned = path.replace("\\", "/")
@@ -54,37 +57,70 @@ def _entry_signature(sql_text, start_offset, name):
     return _normalise_signature(name, sql_text[pos + 1:end])
 
 
-def _index_definitions(sql_text, path):
-    """Return indexed CREATE FUNCTION entries with docs, sources and signatures."""
-    by_name = {}
-    by_signature = {}
-    raw_lines = sql_text.splitlines(True)
-    lines = [line.rstrip("\r\n") for line in raw_lines]
-    fn_re = re.compile(r"create\s+(?:or\s+replace\s+)?function\s+([a-z_][\w]*)\.([a-z_][\w]*)", re.I)
-    offset = 0
-    for i, line in enumerate(lines):
-        m = fn_re.search(line)
-        if not m:
-            offset += len(raw_lines[i])
+_FN_RE = re.compile(r"create[^\S\n]+(?:or[^\S\n]+replace[^\S\n]+)?function[^\S\n]+([a-z_][\w]*)\.([a-z_][\w]*)", re.I)
+
+
+def _comment_block(sql_text, line_start):
+    """The `--` lines directly above the line starting at `line_start`, top to bottom."""
+    block = []
+    end = line_start - 1
+    while end >= 0:
+        start = sql_text.rfind("\n", 0, end) + 1
+        line = sql_text[start:end].rstrip("\r").lstrip()
+        if not line.startswith("--"):
+            break
+        block.append(line[2:].strip())
+        end = start - 1
+    return "\n".join(reversed(block)) if block else None
+
+
+def _definitions(sql_text, path, lines=None):
+    """Return the CREATE FUNCTION entries of one file (JSON-able, so the build cache can keep them).
+
+    One finditer over the whole text; the pattern cannot cross a newline and only the first match
+    on a line is taken. `lines` is the text's LineIndex (built here when not given).
+    """
+    out = []
+    lines = lines or LineIndex(sql_text)
+    last_line = 0
+    for m in _FN_RE.finditer(sql_text):
+        line_no = lines.line_for(m.start())
+        if line_no == last_line:
             continue
-        block = []
-        j = i - 1
-        while j >= 0 and lines[j].lstrip().startswith("--"):
-            block.append(lines[j].lstrip()[2:].strip())
-            j -= 1
-        doc = "\n".join(reversed(block)) if block else None
-        schema = m.group(1).lower()
+        last_line = line_no
         name = m.group(2).lower()
-        source = {"path": _source_path(path), "line": i + 1}
-        signature = _entry_signature(sql_text, offset + m.end(), name)
-        entry = {"doc": doc, "source": source, "signature": signature}
-        by_name.setdefault(("function", schema, name), []).append(entry)
-        if signature:
-            by_signature.setdefault(("function", schema, signature), []).append(entry)
-        offset += len(raw_lines[i])
+        out.append({"schema": m.group(1).lower(), "name": name,
+                    "doc": _comment_block(sql_text, sql_text.rfind("\n", 0, m.start()) + 1),
+                    "source": {"path": _source_path(path), "line": line_no},
+                    "signature": _entry_signature(sql_text, m.end(), name)})
+    return out
+
+
+def _index_entries(definitions):
+    by_name = {}
+    by_signature = {}
+    for d in definitions:
+        entry = {"doc": d["doc"], "source": d["source"], "signature": d["signature"]}
+        by_name.setdefault(("function", d["schema"], d["name"]), []).append(entry)
+        if d["signature"]:
+            by_signature.setdefault(("function", d["schema"], d["signature"]), []).append(entry)
     return {"by_name": by_name, "by_signature": by_signature}
 
 
+def _index_definitions(sql_text, path):
+    """Return indexed CREATE FUNCTION entries with docs, sources and signatures."""
+    return _index_entries(_definitions(sql_text, path))
+
+
+def _file_definitions(path, cache=None, corpus=None):
+    sql_file = (corpus or SqlCorpus()).get(path)
+    if cache is None:
+        return _definitions(sql_file.text, path, sql_file.lines)
+    # the source path is baked into the entries, so it is part of the key
+    key = bytes_digest((sql_file.digest + "\0" + _source_path(path)).encode("utf-8"))
+    return cache.memo("sql_docs", key, lambda: _definitions(sql_file.text, path, sql_file.lines))
+
+
 def _merge_index(into, indexed):
     for bucket in ("by_name", "by_signature"):
         for key, entries in indexed.get(bucket, {}).items():
@@ -114,12 +150,13 @@ def _best_doc(entries):
     return (non_stub or docs)[-1]
 
 
-def attach_sql_docs(nodes, sql_paths):
+def attach_sql_docs(nodes, sql_paths, cache=None, corpus=None):
+    """`cache` (a BuildCache) reuses the per-file definition index of unchanged SQL files; `corpus`
+    (a SqlCorpus) shares the files already read by another scanner of the same build."""
     idx = {"by_name": {}, "by_signature": {}}
     for path in sql_paths:
         try:
-            with open(path, encoding="utf-8") as f:
-                _merge_index(idx, _index_definitions(f.read(), path))
+            _merge_index(idx, _index_entries(_file_definitions(path, cache, corpus)))
         except (OSError, UnicodeDecodeError):
             continue
     for n in nodes:
@@ -0,0 +1,77 @@
+"""One-pass adjacency index over the unified graph, shared by every renderer.
+
+`build_graph` returns an `IndexedGraph` — the plain graph dict (it serialises exactly like one) that
+also carries its `GraphIndex`: node by id, nodes per kind, and per edge kind the out-/in-edge lists.
+Writers call `graph_index(g)` and answer "FK children of X" or "what does F read" with a dict lookup
+instead of another scan of g["edges"]. A graph loaded back from graph.json is indexed on demand.
+"""
+from collections import defaultdict
+
+
+class GraphIndex:
+    def __init__(self, g):
+        self.graph = g
+        self.nodes = {}
+        self._by_kind = defaultdict(list)
+        self._edges = defaultdict(list)
+        self._out = defaultdict(lambda: defaultdict(list))   # edge kind -> source id -> [edge]
+        self._in = defaultdict(lambda: defaultdict(list))    # edge kind -> target id -> [edge]
+        self._derived = {}
+        for n in g["nodes"]:
+            self.nodes[n["id"]] = n
+            self._by_kind[n["kind"]].append(n)
+        for e in g["edges"]:
+            self._edges[e["kind"]].append(e)
+            self._out[e["kind"]][e["source"]].append(e)
+            self._in[e["kind"]][e["target"]].append(e)
+        self._sizes = (len(g["nodes"]), len(g["edges"]))
+
+    def stale(self):
+        return self._sizes != (len(self.graph["nodes"]), len(self.graph["edges"]))
+
+    def of_kind(self, *kinds):
+        """Nodes of the given kinds, in graph order."""
+        if len(kinds) == 1:
+            return list(self._by_kind.get(kinds[0], ()))
+        wanted = set(kinds)
+        return [n for n in self.graph["nodes"] if n["kind"] in wanted]
+
+    def edge_kinds(self):
+        return sorted(self._edges)
+
+    def edges(self, kind):
+        return self._edges.get(kind, [])
+
+    def out_edges(self, node_id, kind):
+        return self._out[kind].get(node_id, []) if kind in self._out else []
+
+    def in_edges(self, node_id, kind):
+        return self._in[kind].get(node_id, []) if kind in self._in else []
+
+    def targets(self, node_id, kind):
+        return [e["target"] for e in self.out_edges(node_id, kind)]
+
+    def sources(self, node_id, kind):
+        return [e["source"] for e in self.in_edges(node_id, kind)]
+
+    def derived(self, name, compute):
+        """Memoize a value computed from the (immutable) graph, e.g. a traversal several writers share."""
+        if name not in self._derived:
+            self._derived[name] = compute(self)
+        return self._derived[name]
+
+
+class IndexedGraph(dict):
+    """The graph dict plus the GraphIndex built for it."""
+    index = None
+
+
+def graph_index(g):
+    """Return g's GraphIndex, building (and, for an IndexedGraph, keeping) one when needed."""
+    idx = getattr(g, "index", None)
+    if idx is not None and idx.graph is g and not idx.stale():
+        return idx
+    idx = GraphIndex(g)
+    if isinstance(g, IndexedGraph):
+        g.index = idx
+    return idx
@@ -1,21 +1,94 @@
-"""Infer RPC->table reads/writes edges by regex over function bodies. Resolution is against the
-known table set; matches are tagged with confidence; dynamic SQL is flagged, never guessed."""
+"""Infer RPC->table reads/writes edges from function bodies. Resolution is against the known table
+set; matches are tagged with confidence; dynamic SQL is flagged, never guessed.
+
+Each body is tokenized once by a single compiled pattern that knows `--` / `/* */` comments, '...'
+(with '' and E'\\'' escapes), $tag$...$tag$ strings and "quoted" identifiers, so a table name inside
+a comment or a string literal no longer produces an edge. Bare-name resolution goes through an
+index built once per call instead of a scan of every table per match."""
 import re
 
-_READ = re.compile(r"\b(?:from|join)\s+([a-z_][\w]*(?:\.[a-z_][\w]*)?)", re.I)
-_WRITE = re.compile(r"\b(?:insert\s+into|update|delete\s+from)\s+([a-z_][\w]*(?:\.[a-z_][\w]*)?)", re.I)
-_DYNAMIC = re.compile(r"\bexecute\b.*\bformat\s*\(", re.I | re.S)
+_TOKEN = re.compile(r"""
+    (?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>[eE]'(?:[^'\\]|\\.|'')*(?:'|\Z)
+              |'(?:[^']|'')*(?:'|\Z)
+              |(?P<tag>\$(?:[A-Za-z_]\w*)?\$).*?(?:(?P=tag)|\Z))
+  | (?P<qident>"(?:[^"]|"")*(?:"|\Z))
+  | (?P<word>[A-Za-z_]\w*)
+  | (?P<punct>\S)
+""", re.S | re.X)
+
+
+def _tokens(body):
+    """Significant tokens as (kind, lowered text, start, end); comments are dropped like whitespace."""
+    out = []
+    for m in _TOKEN.finditer(body):
+        kind = m.lastgroup
+        if kind == "tag":
+            kind = "string"
+        if kind == "comment":
+            continue
+        text = m.group(0)
+        out.append((kind, text.lower() if kind == "word" else text, m.start(), m.end()))
+    return out
+
+
+def _ident_at(toks, j):
+    """`name` or `schema.name` starting at toks[j] -> (ident, end offset) or (None, None)."""
+    if j >= len(toks) or toks[j][0] != "word":
+        return None, None
+    ident, end = toks[j][1], toks[j][3]
+    if (j + 2 < len(toks) and toks[j + 1][1] == "." and toks[j + 1][2] == end
+            and toks[j + 2][0] == "word" and toks[j + 2][2] == toks[j + 1][3]):
+        ident, end = ident + "." + toks[j + 2][1], toks[j + 2][3]
+    return ident, end
+
+
+def _scan(body):
+    """One pass over a body -> (reads, writes, dynamic); reads/writes are (ident, start, end)."""
+    toks = _tokens(body)
+    reads, writes = [], []
+    dynamic = saw_execute = False
+    n = len(toks)
+    for i, (kind, word, start, _end) in enumerate(toks):
+        if kind != "word":
+            continue
+        nxt = toks[i + 1][1] if i + 1 < n and toks[i + 1][0] == "word" else None
+        if word in ("from", "join"):
+            ident, end = _ident_at(toks, i + 1)
+            if ident:
+                reads.append((ident, start, end))
+        elif word == "update":
+            ident, end = _ident_at(toks, i + 1)
+            if ident:
+                writes.append((ident, start, end))
+        elif (word, nxt) in (("insert", "into"), ("delete", "from")):
+            ident, end = _ident_at(toks, i + 2)
+            if ident:
+                writes.append((ident, start, end))
+        elif word == "execute":
+            saw_execute = True
+        elif word == "format" and saw_execute and i + 1 < n and toks[i + 1][1] == "(":
+            dynamic = True
+    return reads, writes, dynamic
+
 
+def _table_index(tables):
+    """bare table name -> sorted table ids carrying it (sorted => deterministic across runs)."""
+    by_bare = {}
+    for t in sorted(tables):
+        by_bare.setdefault(t.split(".")[-1], []).append(t)
+    return by_bare
 
-def _resolve(ident, tables):
+
+def _resolve(ident, tables, by_bare=None):
     """Return (table_id, confidence) or (None, None). tables = set of 'schema.name'."""
     ident = ident.lower()
     if ident in tables:
         return ident, "high"
     bare = ident.split(".")[-1]
-    cands = sorted(t for t in tables if t.split(".")[-1] == bare)  # sorted => deterministic across runs
     if ("public." + bare) in tables:
         return "public." + bare, "high"
+    cands = (by_bare if by_bare is not None else _table_index(tables)).get(bare, [])
     if len(cands) == 1:
         return cands[0], "medium"
     if len(cands) > 1:
@@ -23,26 +96,62 @@ def _resolve(ident, tables):
     return None, None
 
 
-def infer_rpc_table_edges(functions, tables):
-    edges = []
+_RANK = {"high": 3, "medium": 2, "low": 1}
+
+
+def _merge_best(best, found):
+    """Fold found into best, keeping the higher confidence; an earlier entry wins ties."""
+    for key, (conf, edge) in found.items():
+        if key in best and _RANK[best[key][0]] >= _RANK[conf]:
+            continue
+        best[key] = (conf, edge)
+
+
+def _infer_shard(functions, tables):
+    """-> (best, flags) for one contiguous slice of the function list (a process-pool task)."""
     flags = {}  # (schema, name) -> dynamic_sql bool
-    best = {}   # (fid, table, kind) -> (confidence_rank, edge)
-    rank = {"high": 3, "medium": 2, "low": 1}
+    best = {}   # (fid, table, kind) -> (confidence, edge)
+    by_bare = _table_index(tables)
+    resolved = {}
     for f in functions:
         fid = "%s.%s(%s)" % (f["schema"], f["name"], f.get("args", ""))
         body = f.get("body", "") or ""
-        flags[(f["schema"], f["name"])] = bool(_DYNAMIC.search(body))
-        for kind, rx in (("reads", _READ), ("writes", _WRITE)):
-            for m in rx.finditer(body):
-                tid, conf = _resolve(m.group(1), tables)
+        reads, writes, dynamic = _scan(body)
+        flags[(f["schema"], f["name"])] = dynamic
+        found = {}
+        for kind, matches in (("reads", reads), ("writes", writes)):
+            for ident, start, end in matches:
+                if ident not in resolved:
+                    resolved[ident] = _resolve(ident, tables, by_bare)
+                tid, conf = resolved[ident]
                 if not tid:
                     continue
                 key = (fid, tid, kind)
-                if key in best and rank[best[key][0]] >= rank[conf]:
+                if key in found and _RANK[found[key][0]] >= _RANK[conf]:
                     continue
-                ev = body[max(0, m.start()):m.end()].strip()
-                best[key] = (conf, {"source": fid, "target": tid, "kind": kind,
-                                    "props": {"inference": {"method": "regex", "confidence": conf, "evidence": ev}}})
-    for _conf, edge in best.values():
-        edges.append(edge)
+                ev = body[start:end].strip()
+                found[key] = (conf, {"source": fid, "target": tid, "kind": kind,
+                                     "props": {"inference": {"method": "regex", "confidence": conf, "evidence": ev}}})
+        _merge_best(best, found)
+    return best, flags
+
+
+def infer_rpc_table_edges(functions, tables, workers=1):
+    """`workers > 1` shards the function list across a process pool; shards are contiguous and
+    merged in order with the same confidence ranking, so the result is identical to the serial path."""
+    functions = list(functions)
+    shards = min(max(int(workers or 1), 1), len(functions))
+    if shards <= 1:
+        results = [_infer_shard(functions, tables)]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        size = -(-len(functions) // shards)
+        chunks = [functions[i:i + size] for i in range(0, len(functions), size)]
+        with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+            results = list(pool.map(_infer_shard, chunks, [tables] * len(chunks)))
+    best, flags = {}, {}
+    for shard_best, shard_flags in results:
+        _merge_best(best, shard_best)
+        flags.update(shard_flags)
+    edges = [edge for _conf, edge in best.values()]
     return edges, flags
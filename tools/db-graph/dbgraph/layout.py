@@ -0,0 +1,249 @@
+"""Offline force-directed layout, stored in graph.json as `layout` and used by both viewers.
+
+Only "anchor" nodes — tables, views, enums, functions — take part in the simulation: policies and
+triggers are satellites placed on a ring around the table they belong to, which is also how the
+viewer clusters them until you zoom in. The simulation is Fruchterman-Reingold over the anchor
+edges (FKs, reads/writes, typed_by, ...), with a weak pull towards a per-domain centre so domains
+stay together. Repulsion only looks at the neighbouring cells of a uniform grid (cell = 1.5 ideal
+edge lengths), which keeps each iteration roughly linear in the node count.
+
+Start positions come from a hash of each node id, so the same graph always lays out the same way.
+Given the previous build's layout, nodes that already had a position keep it (the picture does not
+jump after a small schema change); only new nodes are simulated, starting next to their placed
+neighbours, with the old ones as fixed anchors. When NumPy is installed the forces are computed as
+array operations over row blocks (same model, faster on big graphs); otherwise in plain Python.
+Positions snap to a fine grid after every iteration, so both give the same layout.
+`compute_layout(g)` returns {node id: [x, y]} (integer layout units) for every node.
+"""
+import hashlib
+import math
+
+SATELLITE_KINDS = ("policy", "trigger")
+IDEAL = 40.0          # ideal edge length, in layout units (~ screen pixels at zoom 1)
+ITERATIONS = 150
+_DOMAIN_PULL = 0.012
+_RING = 16.0          # satellite ring radius at one satellite; grows with the count
+_REUSE_MIN = 0.5      # below this share of known anchors, lay everything out afresh
+_BLOCK = 512          # rows per NumPy repulsion block (bounds the n x block temporaries)
+_GRID = 1024.0        # positions snap to 1/_GRID after every iteration (see _snap)
+
+
+def seed_position(node_id, radius):
+    """A deterministic point in [-radius, radius]² derived from the node id."""
+    h = hashlib.sha1(node_id.encode("utf-8")).digest()
+    return [(int.from_bytes(h[:4], "big") / 0xFFFFFFFF * 2 - 1) * radius,
+            (int.from_bytes(h[4:8], "big") / 0xFFFFFFFF * 2 - 1) * radius]
+
+
+def _satellite_owner(n):
+    return (n.get("props") or {}).get("table")
+
+
+def _domain_centres(domains, spread):
+    """Domains evenly on a circle (sorted, so stable), or the origin when there is only one."""
+    names = sorted(domains, key=str)
+    if len(names) <= 1:
+        return {d: (0.0, 0.0) for d in names}
+    return {d: (spread * math.cos(2 * math.pi * i / len(names)), spread * math.sin(2 * math.pi * i / len(names)))
+            for i, d in enumerate(names)}
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _snap(x):
+    """Round to the nearest 1/_GRID, half to even: exact in binary and the same as NumPy's rint, so
+    the last-bit differences between the two force sums (different summation orders) are dropped
+    every iteration instead of being amplified into a different picture."""
+    return round(x * _GRID) / _GRID
+
+
+def _step_python(xs, ys, links, pull, moving, iterations, temperature):
+    n = len(xs)
+    k2 = IDEAL * IDEAL
+    cell = 1.5 * IDEAL
+    cutoff = cell * cell
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        fx, fy = [0.0] * n, [0.0] * n
+        grid = {}
+        for i in range(n):
+            grid.setdefault((int(xs[i] // cell), int(ys[i] // cell)), []).append(i)
+        for (cx, cy), members in grid.items():
+            near = [j for dx in (-1, 0, 1) for dy in (-1, 0, 1) for j in grid.get((cx + dx, cy + dy), ())]
+            for i in members:
+                if not moving[i]:
+                    continue
+                xi, yi = xs[i], ys[i]
+                ax = ay = 0.0
+                for j in near:
+                    dx, dy = xi - xs[j], yi - ys[j]
+                    d2 = dx * dx + dy * dy
+                    if d2 > cutoff or j == i:
+                        continue
+                    if d2 < 0.01:   # coincident: push apart along x, by index
+                        dx, d2 = (0.1 if i > j else -0.1), 0.01
+                    f = k2 / d2          # k²/d along the unit vector = k²·d⃗/d²
+                    ax += dx * f
+                    ay += dy * f
+                fx[i] += ax
+                fy[i] += ay
+        for i, j in links:
+            dx, dy = xs[i] - xs[j], ys[i] - ys[j]
+            f = math.sqrt(dx * dx + dy * dy) / IDEAL   # d²/k along the unit vector
+            fx[i] -= dx * f
+            fy[i] -= dy * f
+            fx[j] += dx * f
+            fy[j] += dy * f
+        for i in range(n):
+            if not moving[i]:
+                continue
+            dx = fx[i] + (pull[i][0] - xs[i]) * _DOMAIN_PULL * IDEAL
+            dy = fy[i] + (pull[i][1] - ys[i]) * _DOMAIN_PULL * IDEAL
+            d = math.sqrt(dx * dx + dy * dy)
+            if d > 0:
+                step = min(d, temperature) / d
+                xs[i] = _snap(xs[i] + dx * step)
+                ys[i] = _snap(ys[i] + dy * step)
+        temperature -= cooling
+    return xs, ys
+
+
+def _step_numpy(np, xs, ys, links, pull, moving, iterations, temperature):
+    """_step_python as array operations: repulsion over all pairs within the cutoff, one block of
+    rows at a time, instead of walking grid cells. Same forces, same coincident-node rule, same
+    snapping, so both give the same layout."""
+    xs, ys = np.array(xs, dtype=float), np.array(ys, dtype=float)
+    px, py = np.array([p[0] for p in pull]), np.array([p[1] for p in pull])
+    move = np.flatnonzero(np.array(moving, dtype=bool))
+    li = np.array([a for a, _ in links], dtype=np.intp)
+    lj = np.array([b for _, b in links], dtype=np.intp)
+    n = len(xs)
+    k2 = IDEAL * IDEAL
+    cutoff = (1.5 * IDEAL) ** 2
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        fx, fy = np.zeros(n), np.zeros(n)
+        for lo in range(0, len(move), _BLOCK):
+            rows = move[lo:lo + _BLOCK]
+            dx = xs[rows, None] - xs[None, :]
+            dy = ys[rows, None] - ys[None, :]
+            d2 = dx * dx + dy * dy
+            d2[np.arange(len(rows)), rows] = np.inf        # no self-force
+            close = d2 < 0.01   # coincident: push apart along x, by index
+            dx = np.where(close, np.where(rows[:, None] > np.arange(n)[None, :], 0.1, -0.1), dx)
+            d2[close] = 0.01
+            f = np.where(d2 <= cutoff, k2 / d2, 0.0)
+            fx[rows] += (dx * f).sum(axis=1)
+            fy[rows] += (dy * f).sum(axis=1)
+        if len(li):
+            dx, dy = xs[li] - xs[lj], ys[li] - ys[lj]
+            f = np.sqrt(dx * dx + dy * dy) / IDEAL
+            np.subtract.at(fx, li, dx * f)
+            np.subtract.at(fy, li, dy * f)
+            np.add.at(fx, lj, dx * f)
+            np.add.at(fy, lj, dy * f)
+        dx = fx[move] + (px[move] - xs[move]) * _DOMAIN_PULL * IDEAL
+        dy = fy[move] + (py[move] - ys[move]) * _DOMAIN_PULL * IDEAL
+        d = np.sqrt(dx * dx + dy * dy)
+        step = np.where(d > 0, np.minimum(d, temperature) / np.where(d > 0, d, 1.0), 0.0)
+        xs[move] = np.rint((xs[move] + dx * step) * _GRID) / _GRID
+        ys[move] = np.rint((ys[move] + dy * step) * _GRID) / _GRID
+        temperature -= cooling
+    return xs.tolist(), ys.tolist()
+
+
+def force_layout(ids, edges, groups=None, iterations=ITERATIONS, start=None, fixed=(), use_numpy=None):
+    """Lay out `ids` joined by (a, b) `edges` -> {id: [x, y]}. `groups` maps an id to a cluster key
+    pulled towards its own centre; `start` gives initial positions (else seeded from the id); ids in
+    `fixed` keep their start position and only push/pull the others. `use_numpy`: None = when
+    installed."""
+    n = len(ids)
+    if n == 0:
+        return {}
+    pos_index = {node_id: i for i, node_id in enumerate(ids)}
+    radius = IDEAL * math.sqrt(n) / 2
+    seeded = [(start or {}).get(node_id) or seed_position(node_id, radius) for node_id in ids]
+    xs, ys = [float(p[0]) for p in seeded], [float(p[1]) for p in seeded]
+    links = sorted({(min(pos_index[a], pos_index[b]), max(pos_index[a], pos_index[b]))
+                    for a, b in edges if a in pos_index and b in pos_index and a != b})
+    groups = groups or {}
+    centres = _domain_centres({groups.get(i) for i in ids}, radius * 0.9)
+    pull = [centres[groups.get(node_id)] for node_id in ids]
+    fixed = set(fixed)
+    moving = [node_id not in fixed for node_id in ids]
+    if any(moving):
+        # new nodes among placed ones start next to their neighbours: a local settle, not a new picture
+        temperature = IDEAL * 2 if fixed else radius / 4
+        np = _numpy() if use_numpy is not False else None
+        if use_numpy and np is None:
+            raise ImportError("force_layout(use_numpy=True) needs numpy")
+        if np is not None:
+            xs, ys = _step_numpy(np, xs, ys, links, pull, moving, iterations, temperature)
+        else:
+            xs, ys = _step_python(xs, ys, links, pull, moving, iterations, temperature)
+    return {node_id: [xs[i], ys[i]] for i, node_id in enumerate(ids)}
+
+
+def _near_neighbours(ids, edges, known):
+    """Start positions for the ids not in `known`: the centroid of their known neighbours, offset a
+    little by their own hash (so siblings do not coincide)."""
+    neighbours = {}
+    for a, b in edges:
+        neighbours.setdefault(a, []).append(b)
+        neighbours.setdefault(b, []).append(a)
+    start = {}
+    for node_id in ids:
+        if node_id in known:
+            continue
+        placed = [known[m] for m in neighbours.get(node_id, ()) if m in known]
+        if placed:
+            jitter = seed_position(node_id, IDEAL / 2)
+            start[node_id] = [sum(p[0] for p in placed) / len(placed) + jitter[0],
+                              sum(p[1] for p in placed) / len(placed) + jitter[1]]
+    return start
+
+
+def place_satellites(owners, anchor_pos):
+    """{satellite id: owner id} -> {satellite id: [x, y]} on a ring around each owner, in id order.
+    A satellite whose owner has no position is placed from its own id hash."""
+    by_owner = {}
+    for sat, owner in sorted(owners.items()):
+        by_owner.setdefault(owner, []).append(sat)
+    out = {}
+    for owner, sats in by_owner.items():
+        if owner not in anchor_pos:
+            for sat in sats:
+                out[sat] = seed_position(sat, IDEAL * 4)
+            continue
+        ox, oy = anchor_pos[owner]
+        r = _RING + 2.5 * len(sats)
+        for i, sat in enumerate(sats):
+            a = 2 * math.pi * i / len(sats)
+            out[sat] = [ox + r * math.cos(a), oy + r * math.sin(a)]
+    return out
+
+
+def compute_layout(g, iterations=ITERATIONS, previous=None, use_numpy=None):
+    """{node id: [x, y]} for every node of `g`. With `previous` (an earlier compute_layout result),
+    anchors it already placed keep their position, unless too few of today's anchors are known."""
+    anchors = [n for n in g["nodes"] if n["kind"] not in SATELLITE_KINDS]
+    ids = [n["id"] for n in anchors]
+    anchor_set = set(ids)
+    edges = [(e["source"], e["target"]) for e in g["edges"]
+             if e["source"] in anchor_set and e["target"] in anchor_set]
+    known = {i: previous[i] for i in ids if i in (previous or {})}
+    if ids and len(known) < _REUSE_MIN * len(ids):
+        known = {}
+    start = dict(known, **_near_neighbours(ids, edges, known)) if known else None
+    pos = force_layout(ids, edges, {n["id"]: n.get("domain") for n in anchors}, iterations,
+                       start=start, fixed=known, use_numpy=use_numpy)
+    pos = {node_id: [round(x), round(y)] for node_id, (x, y) in pos.items()}
+    owners = {n["id"]: _satellite_owner(n) for n in g["nodes"] if n["kind"] in SATELLITE_KINDS}
+    pos.update(place_satellites(owners, pos))
+    return {node_id: [round(x), round(y)] for node_id, (x, y) in pos.items()}
@@ -0,0 +1,96 @@
+"""Opt-in per-stage timing and memory for a db-graph build (`db_graph.py --profile`).
+
+`Profiler.stage(name)` records wall time, CPU time (this process — work done in `--workers` child
+processes shows up as wall time only) and, with `memory=True`, `peak_bytes`: how far the tracemalloc
+high-water mark rose above what was already allocated when the stage began. Stages nest: a sub-step
+is reported as `parent/child`, and a parent's peak includes its children's. tracemalloc slows
+allocation-heavy stages several-fold, so compare memory runs with memory runs.
+
+Code that takes an optional profiler uses `stage(profiler, name)`, a no-op context when it is None.
+"""
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+REPORT_VERSION = 1
+
+
+class Profiler:
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.stages = []
+        self._stack = []   # [name, absolute peak seen so far] per open stage
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        self._peak = 0
+        self._owns_tracing = False
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+
+    @contextmanager
+    def stage(self, name):
+        full = "/".join([s[0] for s in self._stack] + [name])
+        if self.memory:
+            # fold the peak reached so far into the enclosing stage before resetting it for this one
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0] if self.memory else 0
+        self._stack.append([name, start])
+        entry = {"name": full, "depth": len(self._stack) - 1}
+        self.stages.append(entry)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield entry
+        finally:
+            entry["wall_s"] = round(time.perf_counter() - wall, 6)
+            entry["cpu_s"] = round(time.process_time() - cpu, 6)
+            _, peak = self._stack.pop()
+            if self.memory:
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                entry["peak_bytes"] = peak - start
+                self._peak = max(self._peak, peak)
+                if self._stack:
+                    self._stack[-1][1] = max(self._stack[-1][1], peak)
+
+    def record(self, name, wall_s, cpu_s):
+        """Add a stage measured elsewhere (e.g. in a pool worker) under the currently open stage."""
+        full = "/".join([s[0] for s in self._stack] + [name])
+        self.stages.append({"name": full, "depth": len(self._stack), "wall_s": round(wall_s, 6),
+                            "cpu_s": round(cpu_s, 6)})
+
+    def report(self, **meta):
+        out = {"version": REPORT_VERSION, "meta": meta,
+               "total": {"wall_s": round(time.perf_counter() - self._started, 6),
+                         "cpu_s": round(time.process_time() - self._cpu_started, 6)},
+               "stages": self.stages}
+        if self.memory:
+            out["total"]["peak_bytes"] = self._peak
+        return out
+
+    def write(self, path, **meta):
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            json.dump(self.report(**meta), f, ensure_ascii=False, indent=1)
+            f.write("\n")
+
+    def close(self):
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+    def summary(self, limit=8):
+        """The slowest top-level and nested stages, one line each, for the console."""
+        rows = sorted(self.stages, key=lambda s: s.get("wall_s", 0), reverse=True)[:limit]
+        lines = []
+        for s in rows:
+            line = "  %-44s %8.1f ms wall %8.1f ms cpu" % (s["name"], s["wall_s"] * 1e3, s["cpu_s"] * 1e3)
+            if "peak_bytes" in s:
+                line += " %7.1f MB peak" % (s["peak_bytes"] / 1e6)
+            lines.append(line)
+        return "\n".join(lines)
+
+
+def stage(profiler, name):
+    return profiler.stage(name) if profiler is not None else nullcontext()
@@ -0,0 +1,165 @@
+"""Queries over the unified graph: k-hop neighbourhood, shortest FK path, reverse write impact,
+gating policies, kind/domain/schema filters and ranked full-text search (dbgraph/search.py).
+
+`GraphQuery(g)` (or `GraphQuery.load(path)`, which reads either graph.json format) indexes the graph
+once — the shared `GraphIndex` plus an undirected FK adjacency — so each query is a breadth-first
+walk over dicts, not a scan of the edge list. Node names resolve leniently: a full id, `schema.name`
+for a function (its id carries the argument list) or a bare name (tried in `public`, then
+everywhere). An unknown or ambiguous name raises KeyError listing the candidates.
+
+Reverse impact follows how a write propagates: a function that writes table T — directly, or by
+writing a table whose trigger executes a function that (transitively) writes T.
+"""
+import json
+import os
+from collections import deque
+
+from .compact import load_graph
+from .index import graph_index
+from .search import SearchIndex, build_search_index
+
+_TABLE_KINDS = ("table", "view", "matview")
+
+
+class GraphQuery:
+    def __init__(self, g, search_index=None):
+        self.graph = g
+        self.index = graph_index(g)
+        self._search = SearchIndex(search_index) if search_index is not None else None
+        self._by_name = {}   # "schema.label" and "label" -> [id]
+        for n in g["nodes"]:
+            self._by_name.setdefault("%s.%s" % (n["schema"], n["label"]), []).append(n["id"])
+            self._by_name.setdefault(n["label"], []).append(n["id"])
+        self._fk = {}        # table id -> [(neighbour id, edge)], both directions
+        for e in self.index.edges("fk"):
+            self._fk.setdefault(e["source"], []).append((e["target"], e))
+            self._fk.setdefault(e["target"], []).append((e["source"], e))
+
+    @classmethod
+    def load(cls, path):
+        """Load graph.json, plus the search_index.json the same build wrote next to it, if any."""
+        search_path = os.path.join(os.path.dirname(os.path.abspath(path)), "search_index.json")
+        search = None
+        if os.path.exists(search_path):
+            with open(search_path, encoding="utf-8") as f:
+                search = json.load(f)
+        return cls(load_graph(path), search)
+
+    def node(self, name):
+        return self.index.nodes[self.resolve(name)]
+
+    def resolve(self, name):
+        """The node id `name` refers to; KeyError when there is no match or more than one."""
+        if name in self.index.nodes:
+            return name
+        for key in (name, "public." + name) if "." not in name else (name,):
+            ids = self._by_name.get(key, [])
+            if len(ids) == 1:
+                return ids[0]
+            if len(ids) > 1:
+                # a table and its same-named function/enum: prefer the relation
+                tables = [i for i in ids if self.index.nodes[i]["kind"] in _TABLE_KINDS]
+                if len(tables) == 1:
+                    return tables[0]
+                raise KeyError("%r is ambiguous: %s" % (name, ", ".join(sorted(ids))))
+        raise KeyError("no node named %r" % name)
+
+    def neighbourhood(self, name, hops=1, edge_kinds=None, direction="both"):
+        """{node id: distance} for every node within `hops` edges of `name`, in BFS order.
+        `edge_kinds` restricts the edges followed; `direction` is "out", "in" or "both"."""
+        start = self.resolve(name)
+        kinds = list(edge_kinds) if edge_kinds else self.index.edge_kinds()
+        seen = {start: 0}
+        frontier = [start]
+        for depth in range(1, hops + 1):
+            nxt = []
+            for node_id in frontier:
+                for kind in kinds:
+                    around = []
+                    if direction in ("out", "both"):
+                        around += self.index.targets(node_id, kind)
+                    if direction in ("in", "both"):
+                        around += self.index.sources(node_id, kind)
+                    for other in around:
+                        if other not in seen:
+                            seen[other] = depth
+                            nxt.append(other)
+            frontier = nxt
+        return seen
+
+    def subgraph(self, ids, edge_kinds=None):
+        """The edges with both ends in `ids` (optionally of the given kinds), in graph order."""
+        wanted = set(ids)
+        kinds = set(edge_kinds) if edge_kinds else None
+        return [e for e in self.graph["edges"] if e["source"] in wanted and e["target"] in wanted
+                and (kinds is None or e["kind"] in kinds)]
+
+    def fk_path(self, a, b):
+        """Shortest chain of FK edges (either direction) between two tables -> [edge], or None."""
+        start, goal = self.resolve(a), self.resolve(b)
+        if start == goal:
+            return []
+        came = {start: None}
+        queue = deque([start])
+        while queue:
+            node_id = queue.popleft()
+            for other, edge in self._fk.get(node_id, ()):
+                if other in came:
+                    continue
+                came[other] = (node_id, edge)
+                if other == goal:
+                    path = []
+                    while came[other] is not None:
+                        other, edge = came[other]
+                        path.append(edge)
+                    return path[::-1]
+                queue.append(other)
+        return None
+
+    def impact(self, name, max_depth=None):
+        """Functions that write `name`, directly or through triggers, nearest first ->
+        [{"id", "depth", "chain"}]; chain runs from the function to the table, through every
+        table and trigger the write passes on the way. depth 1 = a direct write."""
+        target = self.resolve(name)
+        out = []
+        seen_fn, seen_table = set(), {target}
+        frontier = [(target, [target])]
+        depth = 0
+        while frontier and (max_depth is None or depth < max_depth):
+            depth += 1
+            nxt = []
+            for table_id, chain in frontier:
+                for fn in sorted(self.index.sources(table_id, "writes")):
+                    if fn in seen_fn:
+                        continue
+                    seen_fn.add(fn)
+                    fn_chain = [fn] + chain
+                    out.append({"id": fn, "depth": depth, "chain": fn_chain})
+                    # triggers that run this function, and the tables they fire on
+                    for trigger in sorted(self.index.sources(fn, "executes")):
+                        for table in self.index.targets(trigger, "trigger_on"):
+                            if table not in seen_table:
+                                seen_table.add(table)
+                                nxt.append((table, [table, trigger] + fn_chain))
+            frontier = nxt
+        return out
+
+    def gating_policies(self, table_ids):
+        """Policy ids gating any of `table_ids`, sorted."""
+        return sorted({p for t in table_ids for p in self.index.sources(self.resolve(t), "gates")})
+
+    def search(self, text, limit=20, kinds=None):
+        """BM25-ranked [(node id, score)] over names, docs, signatures and policy predicates."""
+        if self._search is None:
+            self._search = SearchIndex(build_search_index(self.graph))
+        return self._search.search(text, limit, kinds)
+
+    def find(self, kind=None, domain=None, schema=None, text=None):
+        """Nodes matching every given filter, in graph order; `text` is a case-insensitive substring
+        of the id or the doc."""
+        nodes = self.index.of_kind(kind) if kind else self.graph["nodes"]
+        needle = text.lower() if text else None
+        return [n for n in nodes
+                if (domain is None or n.get("domain") == domain)
+                and (schema is None or n.get("schema") == schema)
+                and (needle is None or needle in n["id"].lower() or needle in (n.get("doc") or "").lower())]
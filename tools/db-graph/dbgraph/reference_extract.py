@@ -7,14 +7,20 @@ codes, tags, roles, permissions, and similar vocabularies without touching the
 live database.
 """
 import os
+import queue
 import re
 import ssl
 import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, time
 from decimal import Decimal
 from urllib.parse import parse_qs, unquote, urlparse
 from uuid import UUID
 
+from .cache import bytes_digest, file_digest
+from .statements import iter_statements, walk_statements
+
 
 _INSERT_VALUES = re.compile(
     r"\binsert\s+into\s+([a-z_][\w]*(?:\.[a-z_][\w]*)?)\s*\(([^)]*)\)\s*values\s*",
@@ -28,31 +34,8 @@ _NEXT_REF_INSERT = re.compile(
     r"\binsert\s+into\s+([a-z_][\w]*(?:\.[a-z_][\w]*)?)\s*\(([^)]*)\)",
     re.I,
 )
-
-
-def _strip_line_comments(sql):
-    out = []
-    i = 0
-    in_quote = False
-    while i < len(sql):
-        ch = sql[i]
-        nxt = sql[i + 1] if i + 1 < len(sql) else ""
-        if ch == "'":
-            out.append(ch)
-            if in_quote and nxt == "'":
-                out.append(nxt)
-                i += 2
-                continue
-            in_quote = not in_quote
-            i += 1
-            continue
-        if not in_quote and ch == "-" and nxt == "-":
-            while i < len(sql) and sql[i] not in "\r\n":
-                i += 1
-            continue
-        out.append(ch)
-        i += 1
-    return "".join(out)
+_INSERT_COLUMNS = re.compile(r"\binsert\s+into\s+([a-z_][\w]*(?:\.[a-z_][\w]*)?)\s*\(", re.I)
+_VALUES_KEYWORD = re.compile(r"\s*values\b", re.I)
 
 
 def _split_columns(text):
@@ -159,10 +142,6 @@ def _clean_value(value):
     return raw
 
 
-def _line_for(text, offset):
-    return text.count("\n", 0, offset) + 1
-
-
 def _qualify(table):
     return table if "." in table else "public." + table
 
@@ -197,64 +176,96 @@ def _rows_from_tuples(table, columns, tuples, path, line, source_kind):
     return rows
 
 
-def extract_reference_values(sql_paths):
-    """Return reference rows extracted from committed SQL files.
+def _extract_file(path, source):
+    """Scan one file statement by statement (function/DO bodies included, see walk_statements).
 
-    The extractor intentionally focuses on explicit VALUES tuples. Derived
-    INSERT...SELECT statements are tracked as sources, but not guessed as row
-    values because the values depend on previous data.
+    `source` is the file's text or an open text file, which iter_statements reads a chunk at a
+    time: only the statement being scanned is then held in memory. A CTE's VALUES belong to the
+    INSERT that follows it in the same statement, and an INSERT is a derived source when its column
+    list is not followed by VALUES; rows keep file order per kind.
     """
-    rows = []
-    derived_sources = []
-    seen = set()
-    for path in sql_paths:
-        if not os.path.exists(path):
-            continue
-        with open(path, encoding="utf-8") as f:
-            original = f.read()
-        sql = _strip_line_comments(original)
-
+    inserts, ctes, derived = [], [], []
+    for st in walk_statements(iter_statements(source)):
+        sql = st.text
         for match in _INSERT_VALUES.finditer(sql):
             table = _qualify(match.group(1))
             if not _is_reference_target(table):
                 continue
             columns = _split_columns(match.group(2))
             tuples, _ = _read_value_tuples(sql, match.end())
-            rows.extend(_rows_from_tuples(table, columns, tuples, path, _line_for(sql, match.start()), "insert_values"))
+            inserts.append((st.offset + match.start(), _rows_from_tuples(
+                table, columns, tuples, path, st.line_for(match.start()), "insert_values")))
 
         for match in _CTE_VALUES.finditer(sql):
             columns = _split_columns(match.group(2))
             tuples, end_pos = _read_value_tuples(sql, match.end())
-            following = sql[end_pos:end_pos + 2400]
-            insert = _NEXT_REF_INSERT.search(following)
+            insert = _NEXT_REF_INSERT.search(sql, end_pos)
             if not insert:
                 continue
             table = _qualify(insert.group(1))
             if not _is_reference_target(table):
                 continue
-            key = (path, match.start(), table)
-            if key in seen:
-                continue
-            seen.add(key)
-            rows.extend(_rows_from_tuples(table, columns, tuples, path, _line_for(sql, match.start()), "cte_values"))
+            ctes.append((st.offset + match.start(), _rows_from_tuples(
+                table, columns, tuples, path, st.line_for(match.start()), "cte_values")))
 
-        for match in re.finditer(r"\binsert\s+into\s+([a-z_][\w]*(?:\.[a-z_][\w]*)?)\s*\(", sql, re.I):
+        for match in _INSERT_COLUMNS.finditer(sql):
             table = _qualify(match.group(1))
             if not _is_reference_target(table):
                 continue
-            after = sql[match.end():match.end() + 500]
-            if re.search(r"\)\s*values\s*", after, re.I):
+            close = sql.find(")", match.end())
+            if close != -1 and _VALUES_KEYWORD.match(sql, close + 1):
                 continue
-            derived_sources.append({
+            derived.append((st.offset + match.start(), [{
                 "table": table,
-                "source": "%s:%d" % (path.replace("\\", "/"), _line_for(sql, match.start())),
+                "source": "%s:%d" % (path.replace("\\", "/"), st.line_for(match.start())),
                 "note": "INSERT derives values through SELECT/CTE; row values are not guessed.",
-            })
+            }]))
+    return {"rows": [row for _, found in sorted(inserts) + sorted(ctes) for row in found],
+            "derived_sources": [item for _, found in sorted(derived) for item in found]}
+
+
+def _extract_streamed(path):
+    # newline=None folds \r\n and \r like SqlCorpus does, so source lines match either way
+    with open(path, encoding="utf-8", newline=None) as f:
+        return _extract_file(path, f)
+
+
+def extract_reference_values(sql_paths, cache=None, corpus=None):
+    """Return reference rows extracted from committed SQL files.
+
+    The extractor intentionally focuses on explicit VALUES tuples. Derived
+    INSERT...SELECT statements are tracked as sources, but not guessed as row
+    values because the values depend on previous data. `cache` (a BuildCache)
+    reuses the per-file result of every file whose bytes did not change.
+
+    A file that `corpus` (a SqlCorpus) already holds — the build's doc scanner
+    read it first — is scanned from that text. Any other file is streamed from
+    disk statement by statement and never held whole, nor added to the corpus.
+    """
+    rows = []
+    derived_sources = []
+    for path in sql_paths:
+        if not os.path.exists(path):
+            continue
+        if corpus is not None and path in corpus:
+            sql_file = corpus.get(path)
+            digest, scan = sql_file.digest, (lambda: _extract_file(path, sql_file.text))
+        else:
+            digest, scan = file_digest(path), (lambda: _extract_streamed(path))
+        if cache is None:
+            found = scan()
+        else:
+            # row sources embed the path, so it is part of the key
+            key = bytes_digest((digest + "\0" + path).encode("utf-8"))
+            found = cache.memo("reference_seeds", key, scan)
+        rows.extend(found["rows"])
+        derived_sources.extend(found["derived_sources"])
     return {"rows": rows, "derived_sources": derived_sources}
 
 
 def live_reference_tables(graph, extra=None):
-    """Return canonical public reference tables to read from a live DB.
+    """Return canonical public reference tables to read from a live DB:
+    [{"table", "columns", "key": primary-key columns}].
 
     `ref_code_*` partition children are skipped because reading the parent
     `public.ref_code` already returns every domain/code row.
@@ -277,9 +288,10 @@ def live_reference_tables(graph, extra=None):
             continue
         if not label.startswith("ref_"):
             continue
-        columns = [c.get("name") for c in node.get("props", {}).get("columns", []) if c.get("name")]
-        if columns:
-            out.append({"table": table, "columns": columns})
+        cols = [c for c in node.get("props", {}).get("columns", []) if c.get("name")]
+        if cols:
+            out.append({"table": table, "columns": [c["name"] for c in cols],
+                        "key": [c["name"] for c in cols if c.get("pk")]})
             seen.add(table)
     return sorted(out, key=lambda item: item["table"])
 
@@ -327,78 +339,336 @@ def _order_columns(columns):
     return [col for col in preferred if col in columns]
 
 
-def extract_live_reference_values(dsn, graph, extra=None, max_rows_per_table=10000):
-    """Read canonical reference rows from a live Postgres database.
+_FETCH_BATCH = 1000
 
-    Returns the same shape as `extract_reference_values`, with a `live` metadata
-    block recording queried tables, per-table errors, and truncation.
+
+def _live_select_sql(target, limit):
+    schema, name = _split_qualname(target["table"])
+    order_cols = _order_columns(target["columns"])
+    order_sql = ""
+    if order_cols:
+        order_sql = " ORDER BY " + ", ".join(_quote_ident(col) + " NULLS LAST" for col in order_cols)
+    return "SELECT %s FROM %s.%s%s LIMIT %s" % (
+        ", ".join(_quote_ident(col) for col in target["columns"]), _quote_ident(schema), _quote_ident(name),
+        order_sql, int(limit) + 1,
+    )
+
+
+def _fingerprint_sql(target):
+    """count(*) + md5 of the sorted per-row md5s: changes with any row, whatever the row order.
+    db_reference_fingerprint.sql computes the same value for the MCP/REST workflow."""
+    schema, name = _split_qualname(target["table"])
+    return ("SELECT count(*), md5(coalesce(string_agg(h, '' ORDER BY h), '')) "
+            "FROM (SELECT md5(t::text) AS h FROM %s.%s t) s" % (_quote_ident(schema), _quote_ident(name)))
+
+
+def reusable_tables(previous_live, fingerprints):
+    """Tables whose rows from a previous export can be kept: read without error then, and with the
+    same fingerprint then and now ({table: {"rows", "hash"}})."""
+    previous_live = previous_live or {}
+    before = previous_live.get("fingerprints") or {}
+    failed = {e.get("table") for e in previous_live.get("errors") or [] if isinstance(e, dict)}
+    return {table for table in previous_live.get("tables") or []
+            if table not in failed and table in fingerprints and before.get(table) == fingerprints[table]}
+
+
+def _live_batches(cur, target, limit):
+    """Batches of row tuples of one table (at most limit + 1 rows in all) from a server-side cursor,
+    `_FETCH_BATCH` at a time; the caller must exhaust the generator.
     """
+    cur.execute("DECLARE ref_rows NO SCROLL CURSOR FOR " + _live_select_sql(target, limit))
+    while True:
+        cur.execute("FETCH FORWARD %d FROM ref_rows" % _FETCH_BATCH)
+        batch = cur.fetchall()
+        if batch:
+            yield batch
+        if len(batch) < _FETCH_BATCH:
+            break
+    cur.execute("CLOSE ref_rows")
+
+
+def _live_rows(target, batches, limit):
+    """Row dicts of one table, serialised batch by batch; sets target["truncated"] past `limit`."""
+    table, columns, count = target["table"], target["columns"], 0
+    for batch in batches:
+        for row in batch:
+            count += 1
+            if count > limit:
+                target["truncated"] = True
+                continue
+            yield {
+                "table": table,
+                "values": {col: _serialise_live_value(row[idx]) for idx, col in enumerate(columns)},
+                "source": "live:%s" % table,
+                "source_kind": "live_table",
+            }
+
+
+def _begin_snapshot(conn, snapshot=None):
+    """Open a read-only REPEATABLE READ transaction on `conn`; with no `snapshot`, export its own and
+    return the id, else adopt `snapshot` (so every connection reads the same database state)."""
+    cur = conn.cursor()
+    cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+    if snapshot is not None:
+        cur.execute("SET TRANSACTION SNAPSHOT '%s'" % snapshot.replace("'", "''"))
+        return snapshot
+    cur.execute("SELECT pg_export_snapshot()")
+    return cur.fetchone()[0]
+
+
+def _close_quietly(conn):
+    for action in (conn.rollback, conn.close):
+        try:
+            action()
+        except Exception:
+            pass
+
+
+def _live_error(message, exc):
+    return {"status": "error", "message": message, "errors": [str(exc)], "tables": []}
+
+
+def _fingerprint(cur, target, reuse):
+    """Fingerprint one table inside its own savepoint and return reuse()'s answer; None (read the
+    rows) when the fingerprint query fails."""
+    cur.execute("SAVEPOINT ref_fingerprint")
     try:
-        import pg8000.dbapi as pgdb
-    except ImportError as exc:
-        return {
-            "rows": [],
-            "derived_sources": [],
-            "live": {"status": "error", "message": "pg8000 is not installed", "errors": [str(exc)], "tables": []},
-        }
+        cur.execute(_fingerprint_sql(target))
+        count, digest = cur.fetchone()
+    except Exception:
+        cur.execute("ROLLBACK TO SAVEPOINT ref_fingerprint")
+        return None
+    cur.execute("RELEASE SAVEPOINT ref_fingerprint")
+    target["fingerprint"] = {"rows": int(count), "hash": digest}
+    return reuse(target, target["fingerprint"])
+
+
+def _read_live_tables(dsn, targets, limit, connections, connect, consume, reuse=None):
+    """Run consume(target, row dicts) for every table over the connection pool.
+
+    With `reuse` (a refresh), each table is first fingerprinted (target["fingerprint"]); when
+    `reuse(target, fingerprint)` returns something other than None, that stands in for consume's
+    result and the rows are not read. A fingerprint that fails (privileges, a type without a text
+    cast) is only rolled back: the rows are read anyway, and the table is re-read next time. A
+    table's work runs inside a savepoint: on error it is rolled back, which keeps the snapshot
+    transaction (and so the connection) usable for the next table.
+
+    Returns ({table: result, or the exception the table raised}, connections used), or
+    (None, live error block) when nothing could be read.
+    """
+    if connect is None:
+        try:
+            import pg8000.dbapi as pgdb
+        except ImportError as exc:
+            return None, _live_error("pg8000 is not installed", exc)
+
+        def connect():
+            return pgdb.connect(**_parse_dsn(dsn), timeout=20, application_name="bertel-db-doc-reference")
 
-    targets = live_reference_tables(graph, extra)
-    live = {"status": "queried", "tables": [], "errors": [], "truncated": []}
-    rows = []
     try:
-        conn = pgdb.connect(**_parse_dsn(dsn), timeout=20, application_name="bertel-db-doc-reference")
+        leader = connect()
     except Exception as exc:
-        return {
-            "rows": [],
-            "derived_sources": [],
-            "live": {"status": "error", "message": "could not connect with TBLS_DSN", "errors": [str(exc)], "tables": []},
-        }
+        return None, _live_error("could not connect with TBLS_DSN", exc)
 
-    try:
+    pending = queue.SimpleQueue()
+    for target in targets:
+        pending.put(target)
+    results = {}
+    used = []
+
+    def drain(conn):
         cur = conn.cursor()
-        for target in targets:
-            table = target["table"]
-            schema, name = _split_qualname(table)
-            columns = target["columns"]
-            select_cols = ", ".join(_quote_ident(col) for col in columns)
-            order_cols = _order_columns(columns)
-            order_sql = ""
-            if order_cols:
-                order_sql = " ORDER BY " + ", ".join(_quote_ident(col) + " NULLS LAST" for col in order_cols)
-            sql = "SELECT %s FROM %s.%s%s LIMIT %s" % (
-                select_cols, _quote_ident(schema), _quote_ident(name), order_sql, int(max_rows_per_table) + 1,
-            )
+        used.append(conn)
+        while True:
+            try:
+                target = pending.get_nowait()
+            except queue.Empty:
+                return
             try:
-                cur.execute(sql)
-                fetched = cur.fetchall()
-                live["tables"].append(table)
+                cur.execute("SAVEPOINT ref_table")
+                result = _fingerprint(cur, target, reuse) if reuse else None
+                if result is None:
+                    result = consume(target, _live_rows(target, _live_batches(cur, target, limit), limit))
+                else:
+                    target["reused"] = True
+                cur.execute("RELEASE SAVEPOINT ref_table")
+                results[target["table"]] = result
             except Exception as exc:
-                live["errors"].append({"table": table, "message": str(exc)})
+                results[target["table"]] = exc
                 try:
-                    conn.rollback()
+                    cur.execute("ROLLBACK TO SAVEPOINT ref_table")
                 except Exception:
-                    pass
-                continue
-            if len(fetched) > max_rows_per_table:
-                live["truncated"].append({"table": table, "limit": max_rows_per_table})
-                fetched = fetched[:max_rows_per_table]
-            for row in fetched:
-                values = {col: _serialise_live_value(row[idx]) for idx, col in enumerate(columns)}
-                rows.append({
-                    "table": table,
-                    "values": values,
-                    "source": "live:%s" % table,
-                    "source_kind": "live_table",
-                })
-    finally:
+                    return   # this connection is gone; the others take the remaining tables
+
+    def follow(snapshot):
         try:
-            conn.close()
+            conn = connect()
+        except Exception:
+            return
+        try:
+            _begin_snapshot(conn, snapshot)
+            drain(conn)
         except Exception:
             pass
+        finally:
+            _close_quietly(conn)
+
+    try:
+        try:
+            snapshot = _begin_snapshot(leader)
+        except Exception:
+            # no exportable snapshot (e.g. a hot standby before PG 10): read on this connection only
+            _close_quietly(leader)
+            leader = connect()
+            snapshot, connections = None, 1
+        followers = min(int(connections), len(targets)) - 1
+        if followers > 0:
+            with ThreadPoolExecutor(max_workers=followers) as pool:
+                for _ in range(followers):
+                    pool.submit(follow, snapshot)
+                drain(leader)
+        else:
+            drain(leader)
+    except Exception as exc:
+        return None, _live_error("could not read with TBLS_DSN", exc)
+    finally:
+        _close_quietly(leader)
+    return results, len(used)
+
+
+def _live_meta(targets, results, used, limit):
+    """The `live` block, in table order: read tables (with their fingerprints; `reused` lists those
+    kept from the previous export), per-table errors and truncation."""
+    live = {"status": "queried", "tables": [], "errors": [], "truncated": [], "connections": used,
+            "fingerprints": {}, "reused": []}
+    for target in targets:
+        table = target["table"]
+        result = results.get(table)
+        if result is None:
+            live["errors"].append({"table": table, "message": "not read: every connection was lost"})
+        elif isinstance(result, Exception):
+            live["errors"].append({"table": table, "message": str(result)})
+        else:
+            live["tables"].append(table)
+            if "fingerprint" in target:
+                live["fingerprints"][table] = target["fingerprint"]
+            if target.get("reused"):
+                live["reused"].append(table)
+            if target.get("truncated"):
+                live["truncated"].append({"table": table, "limit": limit})
+    return live
+
+
+def _reuse_previous(previous):
+    """reuse() for _read_live_tables: a table's rows from `previous` (an earlier extract, as loaded by
+    load_mcp_reference_values) when its fingerprint did not change; None without a previous extract."""
+    if previous is None:
+        return None
+    live = previous.get("live") or {}
+    rows = {}
+    for row in previous.get("rows", []):
+        rows.setdefault(row.get("table"), []).append(row)
+    truncated = {item.get("table") for item in live.get("truncated") or []}
+
+    def reuse(target, fingerprint):
+        table = target["table"]
+        if not reusable_tables(live, {table: fingerprint}):
+            return None
+        if table in truncated:
+            target["truncated"] = True
+        return rows.get(table, [])
+    return reuse
+
+
+def extract_live_reference_values(dsn, graph, extra=None, max_rows_per_table=10000, connections=4, connect=None,
+                                  previous=None):
+    """Read canonical reference rows from a live Postgres database.
+
+    Returns the same shape as `extract_reference_values`, with a `live` metadata
+    block recording queried tables, per-table errors, and truncation.
 
+    Tables are read in parallel over up to `connections` connections that share one
+    exported REPEATABLE READ snapshot, each through a server-side cursor. The result
+    does not depend on how many connections were used. `connect` (no arguments ->
+    DB-API connection) replaces the pg8000 connection built from `dsn`.
+
+    With `previous` (an earlier extract), every table is fingerprinted first and the
+    fingerprints are recorded in `live.fingerprints`; tables whose fingerprint is
+    unchanged since `previous` keep its rows instead of being read again
+    (`live.reused`). Without it, no fingerprint is computed.
+    """
+    targets = live_reference_tables(graph, extra)
+    results, used = _read_live_tables(dsn, targets, max_rows_per_table, connections, connect,
+                                      lambda target, rows: list(rows), _reuse_previous(previous))
+    if results is None:
+        return {"rows": [], "derived_sources": [], "live": used}
+    live = _live_meta(targets, results, used, max_rows_per_table)
+    rows = [row for table in live["tables"] for row in results[table]]
     return {"rows": rows, "derived_sources": [], "live": live}
 
 
+def write_live_reference_values(dsn, graph, path, extra=None, max_rows_per_table=10000, connections=4, connect=None,
+                                previous=None):
+    """`extract_live_reference_values`, streamed to `path` instead of returned; returns the `live` block.
+
+    Each connection serialises its table's rows as they are fetched into a temporary spool, so
+    memory holds one fetch batch per connection whatever the table sizes. The spools are then
+    copied to `path` in table order: a `.ndjson` path gets a header line (`derived_sources`,
+    `live`) and one row per line, anything else the usual {"derived_sources", "live", "rows"}
+    JSON. Both load with `load_mcp_reference_values`. `previous` is as in
+    `extract_live_reference_values`; it may be the extract loaded from `path` itself.
+    """
+    targets = live_reference_tables(graph, extra)
+    reuse_rows = _reuse_previous(previous)
+
+    def spool(target, rows):
+        f = tempfile.TemporaryFile("w+", encoding="utf-8")
+        try:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False, sort_keys=True))
+                f.write("\n")
+        except BaseException:
+            f.close()
+            raise
+        return f
+
+    def reuse(target, fingerprint):
+        rows = reuse_rows(target, fingerprint)
+        return None if rows is None else spool(target, rows)
+
+    results, used = _read_live_tables(dsn, targets, max_rows_per_table, connections, connect, spool,
+                                      reuse if reuse_rows else None)
+    if results is None:
+        live, spools = used, []
+    else:
+        live = _live_meta(targets, results, used, max_rows_per_table)
+        spools = [results[table] for table in live["tables"]]
+    ndjson = path.endswith(".ndjson")
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8", newline="\n") as out:
+            header = json.dumps({"derived_sources": [], "live": live}, ensure_ascii=False, sort_keys=True)
+            out.write(header + "\n" if ndjson else header[:-1] + ', "rows": [')
+            first = True
+            for f in spools:
+                f.seek(0)
+                for line in f:
+                    if not ndjson:
+                        line = ("\n" if first else ",\n") + line[:-1]
+                    first = False
+                    out.write(line)
+            if not ndjson:
+                out.write("\n]}\n")
+        os.replace(tmp, path)
+    finally:
+        for f in results.values() if results else ():
+            if not isinstance(f, Exception):
+                f.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return live
+
+
 def _decode_mcp_payload(value):
     if isinstance(value, str):
         return json.loads(value)
@@ -413,10 +683,15 @@ def load_mcp_reference_values(path):
     intentionally tolerant because MCP clients may serialize JSON columns either
     as nested objects or as strings. It also accepts the local
     `export_reference_live_rest.py` output, which is used when an MCP response
-    would be too large to paste back without truncation.
+    would be too large to paste back without truncation. A `.ndjson` path is the
+    `write_live_reference_values` stream: a header line, then one row per line.
     """
     with open(path, encoding="utf-8") as f:
-        payload = json.load(f)
+        if path.endswith(".ndjson"):
+            payload = json.loads(f.readline())
+            payload["rows"] = [json.loads(line) for line in f if line.strip()]
+        else:
+            payload = json.load(f)
     payload = _decode_mcp_payload(payload)
     if isinstance(payload, dict) and "reference_extract" in payload:
         data = _decode_mcp_payload(payload["reference_extract"])
@@ -6,17 +6,15 @@ import html as _html
 import json
 import re
 
-
-def _by(nodes, kind):
-    return [n for n in nodes if n["kind"] == kind]
+from .chunks import CHUNK_JS, LOADER_JS, chunk_script, skeleton
+from .compact import EXPAND_JS, to_compact
+from .index import graph_index
+from .search import SEARCH_JS, build_index, build_search_index
 
 
 def write_functions_md(g):
-    fns = sorted(_by(g["nodes"], "function"), key=lambda n: (n["schema"], n["label"]))
-    rw = {}
-    for e in g["edges"]:
-        if e["kind"] in ("reads", "writes"):
-            rw.setdefault(e["source"], []).append((e["kind"], e["target"], e["props"]["inference"]["confidence"]))
+    ix = graph_index(g)
+    fns = sorted(ix.of_kind("function"), key=lambda n: (n["schema"], n["label"]))
     out = ["# Functions / RPCs\n", "_Reads/writes are regex-inferred and flagged by confidence._\n"]
     for n in fns:
         out.append("## `%s.%s`" % (n["schema"], n["props"]["signature"]))
@@ -26,7 +24,8 @@ def write_functions_md(g):
         if n["props"]["dynamic_sql"]:
             meta.append("dynamic SQL")
         out.append("- returns: `%s`%s" % (n["props"]["returns"], (" — " + ", ".join(meta)) if meta else ""))
-        touched = rw.get(n["id"], [])
+        touched = [(e["kind"], e["target"], e["props"]["inference"]["confidence"])
+                   for kind in ("reads", "writes") for e in ix.out_edges(n["id"], kind)]
         for kind, target, conf in sorted(touched):
             out.append("- %s `%s` _(%s)_" % (kind, target, conf))
         if n["doc"]:
@@ -36,7 +35,7 @@ def write_functions_md(g):
 
 
 def write_policies_md(g):
-    pol = _by(g["nodes"], "policy")
+    pol = graph_index(g).of_kind("policy")
     by_table = {}
     for p in pol:
         by_table.setdefault(p["props"]["table"], []).append(p)
@@ -52,11 +51,11 @@ def write_policies_md(g):
 
 
 def write_types_md(g):
-    enums = _by(g["nodes"], "enum")
+    ix = graph_index(g)
+    enums = ix.of_kind("enum")
     applies = {}
-    for e in g["edges"]:
-        if e["kind"] == "applies_to":
-            applies.setdefault(e["props"]["object_type"], []).append(e["target"])
+    for e in ix.edges("applies_to"):
+        applies.setdefault(e["props"]["object_type"], []).append(e["target"])
     out = ["# Enums & the object-model rule\n"]
     for en in sorted(enums, key=lambda n: n["label"]):
         out.append("## `%s.%s`" % (en["schema"], en["label"]))
@@ -86,9 +85,8 @@ def write_index_md(g):
            "- `db-graph-out/graph.json` — the unified model · `graph.html` — interactive force graph",
            "\n## Tables by domain"]
     by_dom = {}
-    for n in g["nodes"]:
-        if n["kind"] == "table":
-            by_dom.setdefault(n["domain"], []).append(n["label"])
+    for n in graph_index(g).of_kind("table"):
+        by_dom.setdefault(n["domain"], []).append(n["label"])
     for dom in sorted(by_dom):
         out.append("- **%s**: %s" % (dom, ", ".join("`%s`" % t for t in sorted(by_dom[dom]))))
     return "\n".join(out)
@@ -207,56 +205,43 @@ def _live_error_parts(error):
 
 def render_api_db_reference_html(g, reference_extract=None, live_note="TBLS_DSN not checked"):
     """Render a deterministic HTML reference from graph.json + versioned seed rows."""
+    return _api_db_reference(g, reference_extract, live_note, split=False)[0]
+
+
+def render_api_db_reference_split(g, reference_extract=None, live_note="TBLS_DSN not checked"):
+    """The same reference as a light page + {file name: chunk script} for api-db-reference/: the RPC,
+    table, RLS and reference-table sections load as they scroll into view, each reference-value group
+    when opened (long ones virtually scrolled), and a prebuilt search index on the first keystroke."""
+    return _api_db_reference(g, reference_extract, live_note, split=True)
+
+
+def _api_db_reference(g, reference_extract, live_note, split):
     reference_extract = reference_extract or {"rows": [], "derived_sources": []}
     live_meta = reference_extract.get("live") or {"status": "not_queried", "tables": []}
     seed_meta = reference_extract.get("seed") or {}
     ref_rows = sorted(reference_extract.get("rows", []), key=lambda r: (r["table"], _reference_key(r), r["source"]))
     derived_sources = sorted(reference_extract.get("derived_sources", []), key=lambda r: (r["table"], r["source"]))
-    nodes = {n["id"]: n for n in g["nodes"]}
-
-    function_edges = defaultdict(list)
-    read_by_table = defaultdict(list)
-    write_by_table = defaultdict(list)
-    policies_by_table = defaultdict(list)
-    triggers_by_table = defaultdict(list)
-    trigger_exec_by_function = defaultdict(list)
-    fk_out = defaultdict(list)
-    fk_in = defaultdict(list)
-    applies = defaultdict(list)
+    ix = graph_index(g)
+    nodes = ix.nodes
+
+    def function_edges(fid):
+        return [(e["kind"], e["target"], e.get("props", {}).get("inference", {}).get("confidence", "?"))
+                for kind in ("reads", "writes") for e in ix.out_edges(fid, kind)]
 
-    for edge in g["edges"]:
-        kind = edge["kind"]
-        src = edge["source"]
-        tgt = edge["target"]
-        if kind in ("reads", "writes"):
-            conf = edge.get("props", {}).get("inference", {}).get("confidence", "?")
-            function_edges[src].append((kind, tgt, conf))
-            fn = nodes.get(src)
-            name = _node_title(fn)
-            if kind == "reads":
-                read_by_table[tgt].append(name)
-            else:
-                write_by_table[tgt].append(name)
-        elif kind == "gates":
-            policies_by_table[tgt].append(src)
-        elif kind == "trigger_on":
-            triggers_by_table[tgt].append(src)
-        elif kind == "executes":
-            trigger_exec_by_function[tgt].append(src)
-        elif kind == "fk":
-            fk_out[src].append(tgt)
-            fk_in[tgt].append(src)
-        elif kind == "applies_to":
-            applies[edge.get("props", {}).get("object_type", "?")].append(tgt)
+    def callers_of(tid, kind):
+        return [_node_title(nodes.get(src)) for src in ix.sources(tid, kind)]
+
+    applies = defaultdict(list)
+    for edge in ix.edges("applies_to"):
+        applies[edge.get("props", {}).get("object_type", "?")].append(edge["target"])
 
     functions_by_schema = defaultdict(list)
-    for n in g["nodes"]:
-        if n["kind"] == "function":
-            functions_by_schema[n["schema"]].append(n)
+    for n in ix.of_kind("function"):
+        functions_by_schema[n["schema"]].append(n)
     for schema in functions_by_schema:
         functions_by_schema[schema].sort(key=lambda n: n["props"]["signature"])
 
-    table_like = [n for n in g["nodes"] if n["kind"] in ("table", "view", "matview")]
+    table_like = ix.of_kind("table", "view", "matview")
     table_like.sort(key=lambda n: (n["domain"] or "", n["schema"], n["label"]))
     ref_tables = [n for n in table_like if n["domain"] == "ref-lookups" or n["label"].startswith("ref_")]
 
@@ -274,12 +259,12 @@ def render_api_db_reference_html(g, reference_extract=None, live_note="TBLS_DSN
     for row in rows_without_domain:
         rows_without_domain_by_table[row["table"]].append(row)
 
-    all_functions = sorted(_by(g["nodes"], "function"), key=lambda n: (n["schema"], n["props"]["signature"]))
+    all_functions = sorted(ix.of_kind("function"), key=lambda n: (n["schema"], n["props"]["signature"]))
     functions_without_source = [
         _node_title(n) for n in all_functions
         if not (n.get("props", {}).get("source") or n.get("props", {}).get("sources"))
     ]
-    functions_without_edges = [_node_title(n) for n in all_functions if not function_edges.get(n["id"])]
+    functions_without_edges = [_node_title(n) for n in all_functions if not function_edges(n["id"])]
     dynamic_functions = [_node_title(n) for n in all_functions if n.get("props", {}).get("dynamic_sql")]
     tables_with_rows = {row["table"] for row in ref_rows}
     live_table_set = set(live_meta.get("tables") or [])
@@ -291,6 +276,19 @@ def render_api_db_reference_html(g, reference_extract=None, live_note="TBLS_DSN
         and not (n["label"].startswith("ref_code_") and n["label"] not in ("ref_code_domain_registry", "ref_code_taxonomy_closure"))
     ]
 
+    files, search_docs = {}, []
+
+    def deferred(name, lines, selector):
+        """split: move `lines` to chunk `name` and leave a placeholder; else keep them inline."""
+        if not split or not lines:
+            return lines
+        files[name] = chunk_script(name, {"html": "\n".join(lines), "selector": selector})
+        return ["<div class=\"deferred\" data-chunk=\"%s\"><p class=\"muted\">chargement…</p></div>" % name]
+
+    def searchable(doc_id, kind, label, body, shown=None):
+        if split:
+            search_docs.append((doc_id, kind, label, body, shown or label))
+
     def live_status_html():
         status = live_meta.get("status", "not_queried")
         if status in ("queried", "mcp_queried", "mcp_verified_rest_export"):
@@ -342,7 +340,7 @@ def render_api_db_reference_html(g, reference_extract=None, live_note="TBLS_DSN
         return "\n".join(out)
 
     def function_block(n):
-        touched = sorted(function_edges.get(n["id"], []), key=lambda item: (item[0], item[1]))
+        touched = sorted(function_edges(n["id"]), key=lambda item: (item[0], item[1]))
         meta = []
         if n["props"].get("security_definer"):
             meta.append("SECURITY DEFINER")
@@ -370,7 +368,7 @@ def render_api_db_reference_html(g, reference_extract=None, live_note="TBLS_DSN
             lines.append("</tbody></table>")
         else:
             lines.append("<p class=\"muted\">Aucune lecture/écriture inférée par le graphe. Cas fréquent pour les helpers purs, triggers simples ou SQL dynamique non analysable.</p>")
-        trigger_callers = sorted(trigger_exec_by_function.get(n["id"], []))
+        trigger_callers = sorted(ix.sources(n["id"], "executes"))
         if trigger_callers:
             lines.append("<p><b>Déclenchée par</b><br>%s</p>" % _short_list(trigger_callers, 12))
         lines.append("</details>")
@@ -387,18 +385,18 @@ def render_api_db_reference_html(g, reference_extract=None, live_note="TBLS_DSN
             _esc(n["kind"]),
             _esc(n["domain"] or ""),
             "oui" if n["props"].get("rls_enabled") else "non",
-            _short_list(sorted(set(read_by_table.get(tid, []))), 4) or "<span class=\"muted\">-</span>",
-            _short_list(sorted(set(write_by_table.get(tid, []))), 4) or "<span class=\"muted\">-</span>",
+            _short_list(sorted(set(callers_of(tid, "reads"))), 4) or "<span class=\"muted\">-</span>",
+            _short_list(sorted(set(callers_of(tid, "writes"))), 4) or "<span class=\"muted\">-</span>",
             "%d policies · %d triggers · FK → %d · FK ← %d" % (
-                len(policies_by_table.get(tid, [])),
-                len(triggers_by_table.get(tid, [])),
-                len(fk_out.get(tid, [])),
-                len(fk_in.get(tid, [])),
+                len(ix.in_edges(tid, "gates")),
+                len(ix.in_edges(tid, "trigger_on")),
+                len(ix.out_edges(tid, "fk")),
+                len(ix.in_edges(tid, "fk")),
             ),
         )
 
     def enum_section():
-        enums = sorted(_by(g["nodes"], "enum"), key=lambda n: (n["schema"], n["label"]))
+        enums = sorted(ix.of_kind("enum"), key=lambda n: (n["schema"], n["label"]))
         out = ["<div class=\"grid cards\">"]
         for en in enums:
             out.append("<article class=\"mini-card\"><h3><code>%s.%s</code></h3><p>%s</p></article>" % (
@@ -424,14 +422,34 @@ def render_api_db_reference_html(g, reference_extract=None, live_note="TBLS_DSN
         out.append("</tbody></table>")
         return "\n".join(out)
 
+    def reference_group(title, rows):
+        if not split:
+            return "<details><summary><code>%s</code> (%d valeurs)</summary>%s</details>" % (
+                _esc(title), len(rows), reference_table(rows))
+        name, i = "refs-%s.js" % _slug(title), 1
+        while name in files:
+            i += 1
+            name = "refs-%s-%d.js" % (_slug(title), i)
+        cells = [["" if v is None else str(v) for v in (_reference_key(row), _reference_label(row),
+                                                         _reference_description(row), row.get("source", ""))]
+                 for row in rows]
+        for k, (key, label, description, _source) in enumerate(cells):
+            searchable("%s:%d" % (name, k), "ref", key, [label, description, title],
+                       "%s — %s" % (key, label) if label else key)
+        files[name] = chunk_script(name, {"rows": cells})
+        return ("<details class=\"refgroup\" data-chunk=\"%s\"><summary><code>%s</code> (%d valeurs)</summary>"
+                "<div class=\"vt-host\"><p class=\"muted\">chargement…</p></div></details>" % (name, _esc(title), len(rows)))
+
     def rls_section():
         by_table = defaultdict(list)
-        for node in _by(g["nodes"], "policy"):
+        for node in ix.of_kind("policy"):
             by_table[node["props"].get("table", "")].append(node)
-        out = ["<section id=\"rls\"><h2>3) Policies RLS par table</h2>",
-               "<p>Les predicates longs sont tronqués dans le graphe généré ; la source complète reste <code>db-graph-out/catalog_extra.json</code> ou la vue live <code>pg_policies</code>.</p>"]
-        for table in sorted(by_table):
+        out = []
+        for i, table in enumerate(sorted(by_table)):
             policies = sorted(by_table[table], key=lambda p: (p["props"].get("cmd", ""), p["label"]))
+            for policy in policies:
+                searchable("rls.js:%d:%s" % (i, policy["label"]), "policy", policy["label"],
+                           [table, policy["props"].get("predicate")], "%s · %s" % (policy["label"], table))
             out.append("<details><summary><code>%s</code> (%d policies)</summary>" % (_esc(table), len(policies)))
             out.append("<table><thead><tr><th>Commande</th><th>Policy</th><th>Rôles</th><th>Mode</th><th>Predicate</th></tr></thead><tbody>")
             for policy in policies:
@@ -444,8 +462,9 @@ def render_api_db_reference_html(g, reference_extract=None, live_note="TBLS_DSN
                     _esc(props.get("predicate", "")),
                 ))
             out.append("</tbody></table></details>")
-        out.append("</section>")
-        return "\n".join(out)
+        return "\n".join(["<section id=\"rls\"><h2>3) Policies RLS par table</h2>",
+                          "<p>Les predicates longs sont tronqués dans le graphe généré ; la source complète reste <code>db-graph-out/catalog_extra.json</code> ou la vue live <code>pg_policies</code>.</p>"]
+                         + deferred("rls.js", out, "details") + ["</section>"])
 
     html = [
         "<!doctype html>",
@@ -462,7 +481,9 @@ def render_api_db_reference_html(g, reference_extract=None, live_note="TBLS_DSN
         ".grid{display:grid;grid-template-columns:repeat(auto-fit,minmax(180px,1fr));gap:10px}.mini-card{border:1px solid var(--line);border-radius:8px;padding:12px;background:color-mix(in srgb,var(--card) 92%,var(--brand))}.mini-card h3{margin:0 0 6px;font-size:14px}.metric{font-size:24px;font-weight:800}.muted{color:var(--muted)}.detail-grid{display:grid;grid-template-columns:1fr 1fr;gap:12px}input{width:100%;border:1px solid #ffffff66;border-radius:8px;padding:10px 12px;background:white;color:#111}",
         "@media(max-width:900px){main{grid-template-columns:1fr}.toc{position:static}.detail-grid{grid-template-columns:1fr}header .wrap{display:block}header input{margin-top:12px}}",
         "</style></head><body>",
-        "<header><div class=\"wrap\"><div><h1>Référence API, RPC et base de données</h1><p>Inventaire généré depuis <code>db-graph-out/graph.json</code> et les seeds SQL versionnées.</p></div><div><input id=\"q\" placeholder=\"Filtrer les RPC par nom ou table...\"></div></div></header>",
+        "<header><div class=\"wrap\"><div><h1>Référence API, RPC et base de données</h1><p>Inventaire généré depuis <code>db-graph-out/graph.json</code> et les seeds SQL versionnées.</p></div><div>%s</div></div></header>" % (
+            "<input id=\"q\" placeholder=\"Rechercher RPC, tables, policies, codes...\"><div id=\"hits\" hidden></div>" if split else
+            "<input id=\"q\" placeholder=\"Filtrer les RPC par nom ou table...\">"),
         "<main><nav class=\"toc\"><b>Navigation</b><a href=\"#coverage\">Couverture</a><a href=\"#rpcs\">RPC / fonctions</a><a href=\"#tables\">Connexions tables</a><a href=\"#rls\">RLS policies</a><a href=\"#enums\">Enums & types</a><a href=\"#refs\">CID, tags, refcodes</a><a href=\"#ref-tables\">Tables de référence</a><a href=\"index.html\">Retour doc API</a></nav><div>",
         "<section id=\"coverage\"><h2>0) Couverture et sources</h2>",
         "<div class=\"grid cards\">",
@@ -480,22 +501,33 @@ def render_api_db_reference_html(g, reference_extract=None, live_note="TBLS_DSN
     ]
 
     schema_order = sorted(functions_by_schema, key=lambda s: (s != "api", s))
+    rpc_lines, rpc_count = [], 0
     for schema in schema_order:
-        html.append("<h3>Schéma <code>%s</code> (%d)</h3>" % (_esc(schema), len(functions_by_schema[schema])))
+        rpc_lines.append("<h3>Schéma <code>%s</code> (%d)</h3>" % (_esc(schema), len(functions_by_schema[schema])))
         for fn in functions_by_schema[schema]:
-            html.append(function_block(fn))
+            searchable("rpcs.js:%d" % rpc_count, "rpc", _node_title(fn),
+                       [fn.get("doc"), fn["props"].get("returns")] + [t[1] for t in function_edges(fn["id"])])
+            rpc_lines.append(function_block(fn))
+            rpc_count += 1
+    html.extend(deferred("rpcs.js", rpc_lines, "details.rpc"))
     html.append("</section>")
 
-    html.extend([
-        "<section id=\"tables\"><h2>2) Connexions par table/vue</h2>",
-        "<table><thead><tr><th>Table/vue</th><th>Type</th><th>Domaine</th><th>RLS</th><th>Lue par</th><th>Écrite par</th><th>Autres connexions</th></tr></thead><tbody>",
-    ])
-    for table in table_like:
-        html.append(table_row(table))
-    html.append("</tbody></table></section>")
+    table_lines = ["<table><thead><tr><th>Table/vue</th><th>Type</th><th>Domaine</th><th>RLS</th><th>Lue par</th><th>Écrite par</th><th>Autres connexions</th></tr></thead><tbody>"]
+    for i, table in enumerate(table_like):
+        searchable("tables.js:%d" % i, "table", _node_title(table), [table["domain"], table["kind"]])
+        table_lines.append(table_row(table))
+    table_lines.append("</tbody></table>")
+    html.append("<section id=\"tables\"><h2>2) Connexions par table/vue</h2>")
+    if split:
+        html.extend(deferred("tables.js", table_lines, "tr[id]") + ["</section>"])
+    else:
+        html.extend(table_lines[:-1] + ["</tbody></table></section>"])
 
     html.append(rls_section())
 
+    for en in sorted(ix.of_kind("enum"), key=lambda n: (n["schema"], n["label"])):
+        searchable("#enums:%s.%s" % (en["schema"], en["label"]), "enum", "%s.%s" % (en["schema"], en["label"]),
+                   [str(v) for v in en["props"].get("values", [])])
     html.append("<section id=\"enums\"><h2>4) Types, enums et applicabilité</h2>%s</section>" % enum_section())
 
     html.append("<section id=\"refs\"><h2>5) CID, tags, refcodes et valeurs de référence</h2>")
@@ -503,15 +535,11 @@ def render_api_db_reference_html(g, reference_extract=None, live_note="TBLS_DSN
     if rows_by_domain:
         html.append("<h3>Domaines <code>ref_code</code></h3>")
         for domain in sorted(rows_by_domain):
-            rows = rows_by_domain[domain]
-            html.append("<details><summary><code>%s</code> (%d valeurs)</summary>%s</details>" % (
-                _esc(domain), len(rows), reference_table(rows)))
+            html.append(reference_group(domain, rows_by_domain[domain]))
     if rows_without_domain_by_table:
         html.append("<h3>Autres référentiels versionnés</h3>")
         for table in sorted(rows_without_domain_by_table):
-            rows = rows_without_domain_by_table[table]
-            html.append("<details><summary><code>%s</code> (%d valeurs)</summary>%s</details>" % (
-                _esc(table), len(rows), reference_table(rows)))
+            html.append(reference_group(table, rows_without_domain_by_table[table]))
     if derived_sources:
         html.append("<details><summary>Sources dérivées non listées ligne par ligne (%d)</summary><table><thead><tr><th>Table</th><th>Source</th><th>Note</th></tr></thead><tbody>" % len(derived_sources))
         for source in derived_sources:
@@ -521,23 +549,109 @@ def render_api_db_reference_html(g, reference_extract=None, live_note="TBLS_DSN
     html.append("</section>")
 
     html.append("<section id=\"ref-tables\"><h2>6) Tables de référence du graphe</h2><p>Ces tables portent les référentiels. Les colonnes affichées aident à retrouver les identifiants techniques, codes, libellés et relations.</p>")
-    for table in ref_tables:
+    ref_table_lines = []
+    for i, table in enumerate(ref_tables):
         cols = table["props"].get("columns", [])
-        html.append("<details><summary><code>%s</code> · %s · RLS %s</summary>" % (
+        searchable("ref-tables.js:%d" % i, "columns", _node_title(table), [col.get("name") for col in cols])
+        ref_table_lines.append("<details><summary><code>%s</code> · %s · RLS %s</summary>" % (
             _esc(_node_title(table)), _esc(table.get("domain") or ""), "oui" if table["props"].get("rls_enabled") else "non"))
-        html.append("<table><thead><tr><th>Colonne</th><th>Type</th><th>Nullable</th><th>PK</th></tr></thead><tbody>")
+        ref_table_lines.append("<table><thead><tr><th>Colonne</th><th>Type</th><th>Nullable</th><th>PK</th></tr></thead><tbody>")
         for col in cols:
-            html.append("<tr><td><code>%s</code></td><td>%s</td><td>%s</td><td>%s</td></tr>" % (
+            ref_table_lines.append("<tr><td><code>%s</code></td><td>%s</td><td>%s</td><td>%s</td></tr>" % (
                 _esc(col.get("name")), _esc(col.get("type")), "oui" if col.get("nullable") else "non", "oui" if col.get("pk") else "non"))
-        html.append("</tbody></table></details>")
+        ref_table_lines.append("</tbody></table></details>")
+    html.extend(deferred("ref-tables.js", ref_table_lines, "details"))
     html.append("</section>")
 
+    if split:
+        html.insert(html.index("</style></head><body>"), _REFERENCE_SPLIT_CSS)
+        index = build_index(doc[:4] for doc in search_docs)
+        files["search.js"] = chunk_script("search.js", {"index": index, "labels": [doc[4] for doc in search_docs]})
     html.extend([
         "</div></main>",
+        "<script>%s</script>" % _REFERENCE_SPLIT_JS if split else
         "<script>const q=document.getElementById('q');q.addEventListener('input',()=>{const v=q.value.trim().toLowerCase();document.querySelectorAll('details.rpc').forEach(d=>{d.style.display=!v||d.dataset.search.includes(v)?'block':'none';});});</script>",
         "</body></html>",
     ])
-    return "\n".join(html)
+    return "\n".join(html), files
+
+
+# api-db-reference split mode (render_api_db_reference_split): deferred sections, virtually scrolled
+# reference groups (only the visible rows are in the DOM), and the ranked search over every item.
+_REFERENCE_SPLIT_CSS = (
+    "header .wrap>div:last-child{position:relative;min-width:min(420px,100%)}#hits{position:absolute;right:0;top:calc(100% + 6px);width:min(560px,92vw);max-height:60vh;overflow:auto;background:var(--card);color:var(--text);border:1px solid var(--line);border-radius:8px;box-shadow:0 12px 32px #0003}"
+    "#hits a{display:flex;gap:8px;padding:7px 12px;border-bottom:1px solid var(--line);color:var(--text);cursor:pointer}#hits a:hover{background:color-mix(in srgb,var(--brand) 14%,transparent);text-decoration:none}#hits .k{color:var(--muted);font-size:11px;width:56px;flex:none;text-transform:uppercase}"
+    ".vt{position:relative;max-height:480px;overflow:auto;margin-bottom:14px}.vt-body{position:absolute;left:0;top:0}.vt-head,.vt-body{table-layout:fixed;margin-bottom:0}"
+    ".vt-head th:nth-child(1),.vt-body td:nth-child(1){width:24%}.vt-head th:nth-child(2),.vt-body td:nth-child(2){width:26%}.vt-head th:nth-child(3),.vt-body td:nth-child(3){width:30%}"
+    ".vt-body td{white-space:nowrap;overflow:hidden;text-overflow:ellipsis}.found{outline:2px solid var(--brand);outline-offset:-2px;background:color-mix(in srgb,var(--brand) 16%,transparent)}"
+)
+REFERENCE_CHUNK_DIR = "api-db-reference"
+_REFERENCE_SPLIT_JS = 'const REF_DIR="%s",VT_MIN=200;\n' % REFERENCE_CHUNK_DIR + LOADER_JS + r"""let S=null,LABELS=null,POS=null;
+""" + SEARCH_JS + r"""const esc=s=>String(s).replace(/&/g,"&amp;").replace(/</g,"&lt;").replace(/>/g,"&gt;").replace(/"/g,"&quot;").replace(/'/g,"&#39;");
+const q=document.getElementById("q"),hitsEl=document.getElementById("hits");
+function filterRpcs(){const v=q.value.trim().toLowerCase();
+  document.querySelectorAll("details.rpc").forEach(d=>{d.style.display=!v||d.dataset.search.includes(v)?"block":"none";});}
+function mark(el){document.querySelectorAll(".found").forEach(x=>x.classList.remove("found"));if(el)el.classList.add("found");}
+// a deferred section: its HTML comes from a chunk, loaded once it nears the viewport (or is needed)
+function loadSection(el){if(!el.loading)el.loading=loadChunk(el.dataset.chunk,REF_DIR).then(d=>{
+    el.innerHTML=d.html;el.dataset.selector=d.selector;filterRpcs();return el;},
+    err=>{el.loading=null;el.innerHTML="<p class=muted>"+esc(err.message)+"</p>";throw err;});
+  return el.loading;}
+const io=new IntersectionObserver(es=>es.forEach(e=>{if(e.isIntersecting){io.unobserve(e.target);loadSection(e.target).catch(()=>{});}}),
+  {rootMargin:"800px 0px"});
+document.querySelectorAll(".deferred").forEach(el=>io.observe(el));
+// reference groups: rows load when the group is opened; long groups render only the visible window
+const HEAD="<thead><tr><th>Code/CID</th><th>Libellé</th><th>Description / contexte</th><th>Source</th></tr></thead>";
+const rowHtml=(r,i,hit)=>"<tr data-row="+i+(hit?" class=found":"")+">"+r.map((v,c)=>"<td title='"+esc(v)+"'>"+
+  (c===0||c===3?"<code>"+esc(v)+"</code>":esc(v))+"</td>").join("")+"</tr>";
+function renderRows(host,rows){
+  if(rows.length<VT_MIN){host.innerHTML="<table>"+HEAD+"<tbody>"+rows.map((r,i)=>rowHtml(r,i)).join("")+"</tbody></table>";return;}
+  host.innerHTML="<table class=vt-head>"+HEAD+"</table><div class=vt><div class=vt-pad></div><table class=vt-body><tbody></tbody></table></div>";
+  const box=host.querySelector(".vt"),pad=host.querySelector(".vt-pad"),body=host.querySelector(".vt-body"),tb=body.querySelector("tbody");
+  let rowH=0,first=-1,hit=-1;
+  function paint(force){
+    if(!rowH){tb.innerHTML=rowHtml(rows[0],0);rowH=tb.firstChild.getBoundingClientRect().height||30;
+      pad.style.height=rows.length*rowH+"px";body.style.width=box.clientWidth+"px";}
+    const f=Math.max(0,Math.floor(box.scrollTop/rowH)-10);
+    if(f===first&&!force)return;first=f;
+    const n=Math.ceil((box.clientHeight||480)/rowH)+20;
+    tb.innerHTML=rows.slice(f,f+n).map((r,i)=>rowHtml(r,f+i,f+i===hit)).join("");body.style.top=f*rowH+"px";}
+  box.addEventListener("scroll",()=>paint(false));
+  host.vt={goto(i){hit=i;paint(true);box.scrollTop=Math.max(0,i*rowH-box.clientHeight/3);paint(true);}};
+  paint(true);}
+function openGroup(det){if(!det.loading)det.loading=loadChunk(det.dataset.chunk,REF_DIR).then(d=>{
+    renderRows(det.querySelector(".vt-host"),d.rows);return det;},
+    err=>{det.loading=null;det.querySelector(".vt-host").innerHTML="<p class=muted>"+esc(err.message)+"</p>";throw err;});
+  return det.loading;}
+document.querySelectorAll("details.refgroup").forEach(d=>d.addEventListener("toggle",()=>{if(d.open)openGroup(d).catch(()=>{});}));
+// go to a search hit: "<chunk>:<n>[:...]" is the n-th item of that section or group, "#<id>:..." an anchor
+function go(id){
+  const m=/^(.+?\.js):(\d+)/.exec(id);
+  if(!m){const el=document.getElementById(id.slice(1).split(":")[0]);if(el){mark(el);el.scrollIntoView();}return;}
+  const file=m[1],i=+m[2],group=document.querySelector("details.refgroup[data-chunk='"+file+"']");
+  if(group){group.open=true;openGroup(group).then(()=>{const host=group.querySelector(".vt-host");
+      group.scrollIntoView();
+      if(host.vt){host.vt.goto(i);return;}
+      const tr=host.querySelector("tr[data-row='"+i+"']");if(tr){mark(tr);tr.scrollIntoView({block:"center"});}}).catch(()=>{});
+    return;}
+  const sec=document.querySelector(".deferred[data-chunk='"+file+"']");
+  if(sec)loadSection(sec).then(()=>{const el=sec.querySelectorAll(sec.dataset.selector)[i];if(!el)return;
+    const det=el.closest("details")||el;det.open=true;det.style.display="block";mark(el);el.scrollIntoView({block:"center"});}).catch(()=>{});}
+// links into a section that is not loaded yet (e.g. #table-... from an RPC block)
+document.addEventListener("click",e=>{const a=e.target.closest("a[href^='#']");if(!a)return;
+  const id=decodeURIComponent(a.getAttribute("href").slice(1));if(!id||document.getElementById(id))return;
+  e.preventDefault();
+  Promise.all([...document.querySelectorAll(".deferred")].map(el=>loadSection(el).catch(()=>{}))).then(()=>{
+    const t=document.getElementById(id);if(t){mark(t);t.scrollIntoView({block:"center"});}});});
+q.addEventListener("input",function onInput(){filterRpcs();const v=q.value;
+  if(!v.trim()){hitsEl.hidden=true;hitsEl.innerHTML="";return;}
+  if(!S){loadChunk("search.js",REF_DIR).then(d=>{if(!S){S=d.index;LABELS=d.labels;POS=new Map(S.ids.map((x,i)=>[x,i]));}onInput();},()=>{});return;}
+  const ranked=searchRank(v).slice(0,30);hitsEl.hidden=false;
+  hitsEl.innerHTML=ranked.length?ranked.map(([id])=>{const i=POS.get(id);return "<a data-id='"+esc(id)+"'><span class=k>"+
+    esc(S.kinds[i])+"</span><span>"+esc(LABELS[i])+"</span></a>";}).join(""):"<a><span class=k></span><span class=muted>aucun résultat</span></a>";});
+hitsEl.addEventListener("click",e=>{const a=e.target.closest("a[data-id]");if(!a)return;hitsEl.hidden=true;go(a.dataset.id);});
+document.addEventListener("keydown",e=>{if(e.key==="Escape")hitsEl.hidden=true;});
+"""
 
 
 # Interactive viewer: dark/light theme, kind + domain + schema filters, d3 zoom/pan,
@@ -588,7 +702,7 @@ text{pointer-events:none;font-size:9px;fill:var(--fg);paint-order:stroke;stroke:
 <div id="bar">
   <button id="theme">Light</button>
   <button id="fit">Center tables</button>
-  <input id="q" placeholder="search… (id or name)"><span id="meta"></span>
+  <input id="q" placeholder="search… (names, docs, signatures, predicates)"><span id="meta"></span>
   <div class="row"><span class="rowlab">Kinds</span><span id="kinds" class="chips"></span>
     <span class="mini" data-g="kind" data-v="1">all</span><span class="mini" data-g="kind" data-v="0">none</span></div>
   <div class="row"><span class="rowlab">Domains</span><span id="doms" class="chips"></span>
@@ -600,8 +714,12 @@ text{pointer-events:none;font-size:9px;fill:var(--fg);paint-order:stroke;stroke:
 <svg id="svg"></svg><div id="side"></div>
 <script src="https://cdnjs.cloudflare.com/ajax/libs/d3/7.8.5/d3.min.js"></script>
 <script>
-const G = __GRAPH__;
-const KCOLOR={table:"#2ea043",view:"#56d4a0",matview:"#56d4a0",enum:"#a78bfa",function:"#f0883e",policy:"#539bf5",trigger:"#d4a72c"};
+// graph.json may be the dict model or the compact columnar form (dbgraph/compact.py); expand the latter.
+// With --split the page holds a skeleton instead and loads details on demand (dbgraph/chunks.py).
+""" + EXPAND_JS + CHUNK_JS + """const G = expandSkeleton(expandGraph(__GRAPH__));
+// prebuilt BM25F index (dbgraph/search.py); the tokenizer and scoring mirror search.py
+let S = __SEARCH__;
+""" + SEARCH_JS + """const KCOLOR={table:"#2ea043",view:"#56d4a0",matview:"#56d4a0",enum:"#a78bfa",function:"#f0883e",policy:"#539bf5",trigger:"#d4a72c"};
 const TABLELIKE=new Set(["table","view","matview"]);
 const SIDEW=320;
 document.getElementById("meta").textContent=G.meta.table_count+" tables · "+G.meta.function_count+" fns · "+G.meta.policy_count+" policies · "+G.meta.edge_count+" edges";
@@ -626,7 +744,7 @@ const schemaCount={};G.nodes.forEach(n=>{const s=n.schema||"unknown";schemaCount
 const kindOn=Object.fromEntries(kinds.map(x=>[x,true]));
 const domOn=Object.fromEntries(doms.map(x=>[x,true]));
 const schemaOn=Object.fromEntries(schemas.map(x=>[x,true]));
-let sel=null,q="",zk=1;
+let sel=null,q="",zk=1,hits=new Set();
 const esc=s=>String(s).replace(/&/g,"&amp;").replace(/</g,"&lt;").replace(/>/g,"&gt;").replace(/"/g,"&quot;");
 // svg / simulation
 const svg=d3.select("#svg"),root=svg.append("g");
@@ -637,15 +755,21 @@ const node=root.append("g").selectAll("circle").data(G.nodes).join("circle")
   .on("click",(e,d)=>{e.stopPropagation();select(d);});
 const label=root.append("g").selectAll("text").data(G.nodes).join("text").text(d=>d.label).attr("dx",7).attr("dy",3);
 const W=Math.max(innerWidth-SIDEW,400),H=innerHeight;
+// graph.json built with a layout: start from those positions, settled, and only re-simulate on drag
+const PRE=!!G.layout;
+if(PRE)G.nodes.forEach(n=>{const p=G.layout[n.id];if(p){n.x=W/2+p[0];n.y=H/2+p[1];}});
 const sim=d3.forceSimulation(G.nodes).force("link",d3.forceLink(G.edges).id(d=>d.id).distance(d=>{
     const sk=d.source.kind,tk=d.target.kind;
     return sk==="policy"||tk==="policy"||sk==="trigger"||tk==="trigger"?28:48;}))
   .force("charge",d3.forceManyBody().strength(d=>TABLELIKE.has(d.kind)?-95:d.kind==="enum"?-75:-42))
   .force("x",d3.forceX(W/2).strength(d=>TABLELIKE.has(d.kind)?0.12:d.kind==="enum"?0.08:0.025))
   .force("y",d3.forceY(H/2).strength(d=>TABLELIKE.has(d.kind)?0.12:d.kind==="enum"?0.08:0.025));
-sim.on("tick",()=>{link.attr("x1",d=>d.source.x).attr("y1",d=>d.source.y).attr("x2",d=>d.target.x).attr("y2",d=>d.target.y);
-  node.attr("cx",d=>d.x).attr("cy",d=>d.y);label.attr("x",d=>d.x).attr("y",d=>d.y);});
-node.call(d3.drag().on("start",(e,d)=>{if(!e.active)sim.alphaTarget(.3).restart();d.fx=d.x;d.fy=d.y;})
+function ticked(){link.attr("x1",d=>d.source.x).attr("y1",d=>d.source.y).attr("x2",d=>d.target.x).attr("y2",d=>d.target.y);
+  node.attr("cx",d=>d.x).attr("cy",d=>d.y);label.attr("x",d=>d.x).attr("y",d=>d.y);}
+sim.on("tick",ticked);
+if(PRE){sim.stop();ticked();}
+node.call(PRE?d3.drag().on("drag",(e,d)=>{d.x=e.x;d.y=e.y;ticked();}):
+  d3.drag().on("start",(e,d)=>{if(!e.active)sim.alphaTarget(.3).restart();d.fx=d.x;d.fy=d.y;})
   .on("drag",(e,d)=>{d.fx=e.x;d.fy=e.y;}).on("end",(e,d)=>{if(!e.active)sim.alphaTarget(0);d.fx=null;d.fy=null;}));
 // zoom & pan; labels for noisy kinds (policy/trigger/function) only appear past the zoom threshold
 const ZTHRESH=1.3;
@@ -657,7 +781,7 @@ svg.call(zoom).on("dblclick.zoom",null);
 svg.on("click",()=>{if(sel){sel=null;refresh();sideDefault();}});
 // visibility model: filters hide, selection/search dim
 const isConn=d=>!!sel&&(d.id===sel.id||(adj.get(sel.id)||new Set()).has(d.id));
-const matches=d=>d.id.toLowerCase().includes(q)||d.label.toLowerCase().includes(q);
+const matches=d=>hits.has(d.id)||d.id.toLowerCase().includes(q)||d.label.toLowerCase().includes(q);
 const visible=n=>kindOn[n.kind]&&domOn[n.domain||"unclassified"]&&schemaOn[n.schema||"unknown"];
 function labelShow(d){if(!visible(d))return false;if(sel)return isConn(d);if(q)return matches(d);
   return TABLELIKE.has(d.kind)||d.kind==="enum"||zk>=ZTHRESH;}
@@ -676,7 +800,7 @@ function select(d){sel=d;refresh();detail(d);}
 function selectById(id){const n=byId[id];if(!n)return;select(n);
   svg.transition().duration(450).call(zoom.transform,
     d3.zoomIdentity.translate((innerWidth-SIDEW)/2-n.x*1.4,innerHeight/2-n.y*1.4).scale(1.4));}
-function fitVisibleTables(){
+function fitVisibleTables(ms=550){
   const ns=G.nodes.filter(n=>visible(n)&&TABLELIKE.has(n.kind)&&Number.isFinite(n.x)&&Number.isFinite(n.y));
   if(!ns.length)return;
   const xs=ns.map(n=>n.x),ys=ns.map(n=>n.y),minX=Math.min(...xs),maxX=Math.max(...xs),minY=Math.min(...ys),maxY=Math.max(...ys);
@@ -684,11 +808,14 @@ function fitVisibleTables(){
   const bw=Math.max(maxX-minX,40),bh=Math.max(maxY-minY,40);
   const scale=Math.max(.08,Math.min(4,.86*Math.min(vw/(bw+pad),vh/(bh+pad))));
   const tx=vw/2-scale*(minX+maxX)/2,ty=vh/2-scale*(minY+maxY)/2;
-  svg.transition().duration(550).call(zoom.transform,d3.zoomIdentity.translate(tx,ty).scale(scale));
+  svg.transition().duration(ms).call(zoom.transform,d3.zoomIdentity.translate(tx,ty).scale(scale));
 }
 // side panel
 function detail(d){
   let h="<h3>"+esc(d.label)+"</h3><p class=muted>"+esc(d.kind)+" · "+esc(d.schema)+" · "+esc(d.domain)+"</p>";
+  if(d.lazy){document.getElementById("side").innerHTML=h+"<p class=muted>loading details…</p>";
+    nodeDetail(d).then(()=>{if(sel===d)detail(d);},err=>{if(sel===d)document.getElementById("side").innerHTML=h+
+      "<p class=muted>"+esc(err.message)+"</p>";});return;}
   if(d.doc)h+="<pre>"+esc(d.doc)+"</pre>";
   if(d.props.columns)h+="<ul>"+d.props.columns.map(c=>"<li><code>"+esc(c.name)+"</code> : "+esc(c.type)+(c.pk?" 🔑":"")+"</li>").join("")+"</ul>";
   if(d.props.signature)h+="<p><code>"+esc(d.props.signature)+" → "+esc(d.props.returns)+"</code></p>";
@@ -705,6 +832,12 @@ function detail(d){
   const s=document.getElementById("side");s.innerHTML=h;s.scrollTop=0;
   s.querySelectorAll(".conn").forEach(el=>el.onclick=()=>selectById(el.dataset.id));
 }
+function sideSearch(ranked){
+  const s=document.getElementById("side");
+  s.innerHTML="<h3>Search</h3><p class=muted>"+ranked.length+" ranked match(es) in functions, tables, policies and enums</p>"+
+    ranked.slice(0,30).map(([id,sc])=>{const n2=byId[id];return "<div class=conn data-id=\\""+esc(id)+"\\"><span class=dot style=\\"background:"+
+      (KCOLOR[n2.kind]||"#888")+"\\"></span>"+esc(n2.label)+" <span class=muted>("+esc(n2.kind)+" · "+sc.toFixed(1)+")</span></div>";}).join("");
+  s.querySelectorAll(".conn").forEach(el=>el.onclick=()=>selectById(el.dataset.id));}
 function sideDefault(){document.getElementById("side").innerHTML=
   "<h3>DB graph</h3><p class=muted>Click a node to inspect it and highlight its connections. "+
   "Click the background to clear. Scroll to zoom, drag to pan. Use the chips to filter by kind, domain, and schema. "+
@@ -717,7 +850,8 @@ function mkChip(parent,name,count,color,get,set){
   parent.appendChild(el);return el;}
 const kindChips={},domChips={},schemaChips={};
 kinds.forEach(x=>kindChips[x]=mkChip(document.getElementById("kinds"),x,kindCount[x],KCOLOR[x]||"#888",()=>kindOn[x],v=>kindOn[x]=v));
-doms.forEach(x=>domChips[x]=mkChip(document.getElementById("doms"),x,domCount[x],null,()=>domOn[x],v=>domOn[x]=v));
+doms.forEach(x=>domChips[x]=mkChip(document.getElementById("doms"),x,domCount[x],null,()=>domOn[x],
+  v=>{domOn[x]=v;if(v)loadDomain(x).catch(()=>{});}));
 schemas.forEach(x=>schemaChips[x]=mkChip(document.getElementById("schemas"),x,schemaCount[x],null,()=>schemaOn[x],v=>schemaOn[x]=v));
 document.querySelectorAll(".mini").forEach(el=>el.onclick=()=>{
   const v=el.dataset.v==="1";
@@ -729,15 +863,33 @@ document.getElementById("publicApi").onclick=()=>{
   schemas.forEach(x=>{schemaOn[x]=["public","api","internal"].includes(x);schemaChips[x].classList.toggle("off",!schemaOn[x]);});
   refresh();fitVisibleTables();};
 // search + theme
-document.getElementById("q").addEventListener("input",e=>{q=e.target.value.toLowerCase();refresh();});
-document.getElementById("fit").onclick=fitVisibleTables;
+document.getElementById("q").addEventListener("input",function onInput(e){if(!withSearch(()=>onInput(e)))return;
+  q=e.target.value.trim().toLowerCase();
+  const ranked=q?searchRank(e.target.value):[];hits=new Set(ranked.map(r=>r[0]));refresh();
+  if(!sel){if(q)sideSearch(ranked);else sideDefault();}});
+document.getElementById("fit").onclick=()=>fitVisibleTables();
 const tbtn=document.getElementById("theme");
 tbtn.onclick=()=>{const light=document.documentElement.dataset.theme!=="light";
   document.documentElement.dataset.theme=light?"light":"";tbtn.textContent=light?"Dark":"Light";};
-refresh();sideDefault();setTimeout(fitVisibleTables,700);
+refresh();sideDefault();
+if(PRE)fitVisibleTables(0);else setTimeout(fitVisibleTables,700);  // without a layout, wait for d3 to settle
 </script></body></html>"""
 
 
-def render_html(g):
+def inline_payloads(template, g, compact=False, search=None, split=False):
+    """Fill a viewer template's __GRAPH__ and __SEARCH__: the graph (dict model, compact form, or with
+    `split` the skeleton) and the search index (`null` with `split`: it is a chunk then)."""
+    if split:
+        payload, index = json.dumps(skeleton(g), separators=(",", ":")), "null"
+    else:
+        payload = json.dumps(to_compact(g), separators=(",", ":")) if compact else json.dumps(g)
+        index = json.dumps(search if search is not None else build_search_index(g), separators=(",", ":"))
     # "<\\/" parses identically to "</" in a JS string literal but cannot close the <script> tag
-    return _HTML.replace("__GRAPH__", json.dumps(g).replace("</", "<\\/"))
+    return template.replace("__SEARCH__", index.replace("</", "<\\/")).replace("__GRAPH__", payload.replace("</", "<\\/"))
+
+
+def render_html(g, compact=False, search=None, split=False):
+    """`compact=True` inlines the compact columnar payload (expanded in the page) instead of the dict model.
+    `search` is the graph's prebuilt search index (built here when not given). `split=True` inlines only
+    the skeleton; the page then loads graph-chunks/ (dbgraph.chunks.chunk_files) as needed."""
+    return inline_payloads(_HTML, g, compact, search, split)
@@ -0,0 +1,180 @@
+"""Prebuilt BM25 full-text index over functions, tables/views, policies and enums
+(db-graph-out/search_index.json, also inlined into graph.html and used by `query_graph.py search`).
+
+Each node has two BM25F fields: its label (weighted x4, so a name match beats a mention) and a body
+of the `--` doc block, function signature and return type, table columns, the policy's table and
+predicate, and the enum values. Tokens are folded for French (NFKD without accents, lower case, a
+small FR/EN stop-word list, a trailing plural s/x dropped) and snake_case identifiers index both the
+whole name and each part, so `object_price` and `price` both find the object_price table. There is
+no FR/EN synonym map: `prix` finds the docs written with "prix", not the identifiers named `price`.
+
+The serialised form is compact: doc ids and per-field lengths as arrays, and per term one flat
+`[doc, label tf, body tf, doc, ...]` postings list. It also carries the stop words, so the page's
+tokenizer matches this one. `search()` scores with BM25 and treats the last query word as a prefix,
+as you type.
+"""
+import json
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+
+FORMAT = "dbgraph-search/1"
+SEARCH_KINDS = ("table", "view", "matview", "function", "policy", "enum")
+K1, B = 1.2, 0.75
+WEIGHTS = (4.0, 1.0)   # BM25F field weights: label, body
+STOP_WORDS = sorted({
+    "a", "au", "aux", "avec", "ce", "ces", "cette", "dans", "de", "des", "du", "elle", "en", "est", "et",
+    "il", "la", "le", "les", "leur", "ne", "ni", "on", "ou", "par", "pas", "pour", "qu", "que", "qui",
+    "sa", "se", "ses", "si", "son", "sont", "sur", "un", "une", "y",
+    "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on", "or",
+    "the", "this", "to", "with",
+})
+_STOP = frozenset(STOP_WORDS)
+_WORD = re.compile(r"[a-z0-9]+(?:_[a-z0-9]+)*")
+
+
+def fold(text):
+    """Lower case without accents: "Créée" -> "creee"."""
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def _stem(token):
+    if len(token) > 4 and token[-1] in "sx" and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def _word_terms(word):
+    """A snake_case identifier -> the whole name, then its parts; a plain word -> itself."""
+    parts = word.split("_")
+    terms = [_stem(p) for p in parts if p not in _STOP]
+    return [word] + terms if len(parts) > 1 else terms
+
+
+def tokenize(text):
+    """Index terms of `text`, in order, with repeats."""
+    return [t for word in _WORD.findall(fold(text or "")) for t in _word_terms(word)]
+
+
+def _body(n):
+    props = n.get("props") or {}
+    text = [n.get("doc"), props.get("signature"), props.get("returns"), props.get("table"),
+            props.get("predicate")]
+    text += [c.get("name") for c in props.get("columns") or []]
+    text += [str(v) for v in props.get("values") or []]
+    return [t for t in text if t]
+
+
+def build_index(docs):
+    """Index (id, kind, label, [body texts]) documents; build_search_index() is this over the graph."""
+    ids, kinds, label_lengths, body_lengths, postings = [], [], [], [], {}
+    for doc_id, kind, label_text, body_texts in docs:
+        label = tokenize(label_text)
+        body = [t for text in body_texts if text for t in tokenize(text)]
+        doc = len(ids)
+        ids.append(doc_id)
+        kinds.append(kind)
+        label_lengths.append(len(label))
+        body_lengths.append(len(body))
+        tf = {}
+        for field, terms in enumerate((label, body)):
+            for term in terms:
+                tf.setdefault(term, [0, 0])[field] += 1
+        for term, (in_label, in_body) in tf.items():
+            postings.setdefault(term, []).extend((doc, in_label, in_body))
+    return {"format": FORMAT, "k1": K1, "b": B, "weights": list(WEIGHTS), "stop_words": STOP_WORDS,
+            "ids": ids, "kinds": kinds, "lengths": [label_lengths, body_lengths],
+            "terms": dict(sorted(postings.items()))}
+
+
+def build_search_index(g):
+    return build_index((n["id"], n["kind"], n.get("label"), _body(n))
+                       for n in g["nodes"] if n["kind"] in SEARCH_KINDS)
+
+
+def dumps_search_index(index):
+    return json.dumps(index, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+class SearchIndex:
+    """A loaded index, with the sorted term list prefix lookups need."""
+
+    def __init__(self, data):
+        if data.get("format") != FORMAT:
+            raise ValueError("Unsupported search index format: %r" % data.get("format"))
+        self.data = data
+        self._terms = sorted(data["terms"])
+        self._avg = [(sum(ls) / len(ls)) or 1.0 if ls else 1.0 for ls in data["lengths"]]
+
+    def _expand(self, term, prefix):
+        """`term` itself (when indexed), plus every longer indexed term it prefixes when `prefix`."""
+        if not prefix:
+            return [term] if term in self.data["terms"] else []
+        i = bisect_left(self._terms, term)
+        out = []
+        while i < len(self._terms) and self._terms[i].startswith(term):
+            out.append(self._terms[i])
+            i += 1
+        return out
+
+    def search(self, text, limit=20, kinds=None):
+        """[(node id, score)] best first. While the last word is still being typed (no trailing
+        space) it also matches as a prefix: "tarif" finds "tarifaire", "object_pri" "object_price"."""
+        words = [_word_terms(w) for w in _WORD.findall(fold(text))]
+        words = [w for w in words if w]
+        if not words:
+            return []
+        prefix = words[-1][0] if not text[-1:].isspace() else None
+        data, n_docs = self.data, len(self.data["ids"])
+        k1, b, weights, lengths = data["k1"], data["b"], data["weights"], data["lengths"]
+        scores = {}
+        for term in dict.fromkeys(t for w in words for t in w):
+            best = {}   # a prefix counts once per doc (its best completion), completions at half weight
+            for t in self._expand(term, term == prefix):
+                postings = data["terms"][t]
+                df = len(postings) // 3
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) * (1.0 if t == term else 0.5)
+                for i in range(0, len(postings), 3):
+                    doc = postings[i]
+                    tf = sum(w * postings[i + 1 + f] / (1 - b + b * lengths[f][doc] / self._avg[f])
+                             for f, w in enumerate(weights) if postings[i + 1 + f])
+                    best[doc] = max(best.get(doc, 0.0), idf * tf * (k1 + 1) / (tf + k1))
+            for doc, score in best.items():
+                scores[doc] = scores.get(doc, 0.0) + score
+        wanted = set(kinds) if kinds else None
+        ranked = sorted(((-s, d) for d, s in scores.items()
+                         if wanted is None or data["kinds"][d] in wanted))
+        return [(data["ids"][d], round(-s, 4)) for s, d in ranked[:limit]]
+
+
+# The page-side twin of tokenize() + SearchIndex.search(), for the viewers that hold the index as
+# `let S = {...}` (or null until it is loaded); searchRank(text) -> [[node id, score]] best first,
+# same order and scores.
+SEARCH_JS = r"""let SSTOP,STERMS,SAVG;
+function sInit(){SSTOP=new Set(S.stop_words);STERMS=Object.keys(S.terms).sort();
+  SAVG=S.lengths.map(ls=>ls.length?(ls.reduce((a,b)=>a+b,0)/ls.length)||1:1);}
+const sFold=s=>s.normalize("NFKD").replace(/\p{M}/gu,"").toLowerCase();
+const sStem=t=>t.length>4&&/[sx]$/.test(t)&&!t.endsWith("ss")?t.slice(0,-1):t;
+function sWord(w){const p=w.split("_"),t=p.filter(x=>!SSTOP.has(x)).map(sStem);return p.length>1?[w].concat(t):t;}
+function sExpand(t,prefix){
+  if(!prefix)return S.terms[t]?[t]:[];
+  let lo=0,hi=STERMS.length;while(lo<hi){const m=(lo+hi)>>1;if(STERMS[m]<t)lo=m+1;else hi=m;}
+  const out=[];for(let i=lo;i<STERMS.length&&STERMS[i].startsWith(t);i++)out.push(STERMS[i]);return out;}
+// -> [[node id, score]] best first; the last word also matches as a prefix while it is being typed
+function searchRank(text){
+  if(!S)return [];
+  if(!STERMS)sInit();
+  const words=(sFold(text).match(/[a-z0-9]+(?:_[a-z0-9]+)*/g)||[]).map(sWord).filter(w=>w.length);
+  if(!words.length)return [];
+  const prefix=/\s$/.test(text)?null:words[words.length-1][0],N=S.ids.length,k1=S.k1,b=S.b,scores=new Map();
+  new Set(words.flat()).forEach(term=>{const best=new Map();
+    sExpand(term,term===prefix).forEach(t=>{const p=S.terms[t],df=p.length/3;
+      const idf=Math.log(1+(N-df+.5)/(df+.5))*(t===term?1:.5);
+      for(let i=0;i<p.length;i+=3){let tf=0;
+        S.weights.forEach((w,f)=>{if(p[i+1+f])tf+=w*p[i+1+f]/(1-b+b*S.lengths[f][p[i]]/SAVG[f]);});
+        const sc=idf*tf*(k1+1)/(tf+k1);if(sc>(best.get(p[i])||0))best.set(p[i],sc);}});
+    best.forEach((sc,d)=>scores.set(d,(scores.get(d)||0)+sc));});
+  return [...scores].sort((x,y)=>y[1]-x[1]||x[0]-y[0]).map(([d,sc])=>[S.ids[d],sc]);}
+"""
@@ -0,0 +1,117 @@
+"""SQLite export of the unified graph (`db_graph.py --sqlite` -> db-graph-out/graph.sqlite).
+
+Normalised tables, so a tool can answer "columns of X" or "policies on Y" with one indexed lookup
+instead of loading graph.json:
+
+    meta(key, value)                                   graph meta + export details, values as JSON
+    nodes(id, kind, label, schema, domain, doc, props) props as JSON text
+    edges(source, target, kind, props)
+    columns(table_id, position, name, type, nullable, pk)
+    policies(id, table_id, cmd, roles, predicate, partition_of)   roles as JSON text
+    functions(id, signature, returns, security_definer, volatility, dynamic_sql)
+    reference_rows(table_name, source, source_kind, "values")     values as JSON text
+    node_search(id, kind, label, doc, signature, predicate)
+
+`node_search` is an FTS5 table (`SELECT id FROM node_search WHERE node_search MATCH 'tarif*'`) when
+the sqlite3 build has FTS5, and otherwise a plain table to LIKE over; `meta.fts` says which. The
+file is built under a temp name and renamed into place.
+"""
+import json
+import os
+import sqlite3
+
+SCHEMA_VERSION = 1
+
+_DDL = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE nodes (id TEXT PRIMARY KEY, kind TEXT NOT NULL, label TEXT, schema TEXT, domain TEXT,
+                    doc TEXT, props TEXT);
+CREATE TABLE edges (source TEXT NOT NULL, target TEXT NOT NULL, kind TEXT NOT NULL, props TEXT);
+CREATE TABLE columns (table_id TEXT NOT NULL, position INTEGER NOT NULL, name TEXT NOT NULL, type TEXT,
+                      nullable INTEGER, pk INTEGER, PRIMARY KEY (table_id, position));
+CREATE TABLE policies (id TEXT PRIMARY KEY, table_id TEXT, cmd TEXT, roles TEXT, predicate TEXT,
+                       partition_of TEXT);
+CREATE TABLE functions (id TEXT PRIMARY KEY, signature TEXT, returns TEXT, security_definer INTEGER,
+                        volatility TEXT, dynamic_sql INTEGER);
+CREATE TABLE reference_rows (table_name TEXT NOT NULL, source TEXT, source_kind TEXT, "values" TEXT);
+CREATE INDEX nodes_kind ON nodes (kind);
+CREATE INDEX nodes_domain ON nodes (domain);
+CREATE INDEX nodes_schema_label ON nodes (schema, label);
+CREATE INDEX edges_source ON edges (source, kind);
+CREATE INDEX edges_target ON edges (target, kind);
+CREATE INDEX edges_kind ON edges (kind);
+CREATE INDEX columns_name ON columns (name);
+CREATE INDEX policies_table ON policies (table_id);
+CREATE INDEX reference_rows_table ON reference_rows (table_name);
+"""
+_SEARCH_COLUMNS = "id, kind, label, doc, signature, predicate"
+
+
+def _json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _create_search(con):
+    """FTS5 `node_search` when available -> "fts5"; otherwise an indexed plain table -> "none"."""
+    try:
+        con.execute("CREATE VIRTUAL TABLE node_search USING fts5(id UNINDEXED, kind UNINDEXED, label, doc, "
+                    "signature, predicate, tokenize = 'unicode61 remove_diacritics 2')")
+        return "fts5"
+    except sqlite3.OperationalError:
+        con.execute("CREATE TABLE node_search (%s)" % _SEARCH_COLUMNS)
+        con.execute("CREATE INDEX node_search_id ON node_search (id)")
+        return "none"
+
+
+def _populate(con, g, refs, fts):
+    nodes, columns, policies, functions, search = [], [], [], [], []
+    for n in g["nodes"]:
+        props = n.get("props") or {}
+        nodes.append((n["id"], n["kind"], n.get("label"), n.get("schema"), n.get("domain"), n.get("doc"),
+                      _json(props)))
+        for pos, c in enumerate(props.get("columns") or []):
+            columns.append((n["id"], pos, c.get("name"), c.get("type"), c.get("nullable"), c.get("pk")))
+        if n["kind"] == "policy":
+            policies.append((n["id"], props.get("table"), props.get("cmd"), _json(props.get("roles")),
+                             props.get("predicate"), props.get("partition_of")))
+        elif n["kind"] == "function":
+            functions.append((n["id"], props.get("signature"), props.get("returns"),
+                              props.get("security_definer"), props.get("volatility"), props.get("dynamic_sql")))
+        search.append((n["id"], n["kind"], n.get("label"), n.get("doc"), props.get("signature"),
+                       props.get("predicate")))
+    con.executemany("INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?, ?)", nodes)
+    con.executemany("INSERT INTO edges VALUES (?, ?, ?, ?)",
+                    [(e["source"], e["target"], e["kind"], _json(e.get("props") or {})) for e in g["edges"]])
+    con.executemany("INSERT INTO columns VALUES (?, ?, ?, ?, ?, ?)", columns)
+    con.executemany("INSERT INTO policies VALUES (?, ?, ?, ?, ?, ?)", policies)
+    con.executemany("INSERT INTO functions VALUES (?, ?, ?, ?, ?, ?)", functions)
+    con.executemany("INSERT INTO node_search VALUES (?, ?, ?, ?, ?, ?)", search)
+    con.executemany('INSERT INTO reference_rows VALUES (?, ?, ?, ?)',
+                    [(r.get("table"), r.get("source"), r.get("source_kind"), _json(r.get("values")))
+                     for r in (refs or {}).get("rows", [])])
+    meta = dict(g.get("meta") or {}, schema_version=SCHEMA_VERSION, fts=fts,
+                partitions=g.get("partitions") or {})
+    con.executemany("INSERT INTO meta VALUES (?, ?)", [(k, _json(v)) for k, v in sorted(meta.items())])
+
+
+def write_sqlite(g, refs, path):
+    """Write the graph (+ reference rows) to a fresh SQLite file at `path`; returns the FTS mode."""
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        con = sqlite3.connect(tmp)
+        try:
+            con.executescript("PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;")
+            with con:
+                con.executescript(_DDL)
+                fts = _create_search(con)
+                _populate(con, g, refs, fts)
+            con.execute("VACUUM")
+        finally:
+            con.close()
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return fts
@@ -0,0 +1,218 @@
+"""Streaming SQL statement splitter for the seed/migration scanners.
+
+`iter_statements(source)` yields one `Statement` per top-level `;`-terminated statement of a str or
+of a text file object read `chunk_size` characters at a time, so a multi-megabyte dump is never
+held in memory beyond the statement being assembled. It understands '...' literals (with '' and,
+for E'...', backslash escapes), "quoted" identifiers, $tag$...$tag$ strings, `--` line comments and
+nested /* */ block comments. Comments are blanked out of the statement text — newlines kept, so
+offsets map back to source lines — and a `;` inside any quoted form does not end a statement.
+
+Each dollar-quoted span is recorded on the statement (`dollar`), so a scanner can look at a
+function or DO body as statements of its own (`walk_statements`).
+"""
+import re
+
+from .corpus import LineIndex
+
+_START = re.compile(r"""--|/\*|;|(?<![\w$])[eE]'|'|"|\$(?:[A-Za-z_]\w*)?\$""")
+_BLOCK = re.compile(r"/\*|\*/")
+# kept back at each refill: a token split across chunks ("-" + "-", "$some_t" + "ag$") re-matches
+_TAIL = 64
+
+
+class Statement:
+    """One statement: `text` (comments blanked), the 1-based `line` and absolute `offset` of its
+    first character, and the (start, end) spans of its dollar-quoted contents within `text`."""
+
+    __slots__ = ("text", "line", "offset", "dollar", "_lines")
+
+    def __init__(self, text, line, offset, dollar):
+        self.text = text
+        self.line = line
+        self.offset = offset
+        self.dollar = dollar
+        self._lines = None
+
+    def line_for(self, pos):
+        """Source line of text[pos]."""
+        if self._lines is None:
+            self._lines = LineIndex(self.text)
+        return self.line + self._lines.line_for(pos) - 1
+
+    def without_dollar(self):
+        """`text` with every dollar-quoted content replaced by its newlines (so lines still map)."""
+        if not self.dollar:
+            return self.text
+        out, pos = [], 0
+        for start, end in self.dollar:
+            out.append(self.text[pos:start])
+            out.append("\n" * self.text.count("\n", start, end))
+            pos = end
+        out.append(self.text[pos:])
+        return "".join(out)
+
+    def __repr__(self):
+        return "Statement(line=%d, %r)" % (self.line, self.text[:40])
+
+
+class _Reader:
+    """The unconsumed window of the input; `more()` appends the next chunk (False at EOF)."""
+
+    def __init__(self, source, chunk_size):
+        self.streaming = not isinstance(source, str)
+        if self.streaming:
+            self.buf, self.eof, self._read = "", False, source.read
+        else:
+            self.buf, self.eof, self._read = source, True, None
+        self.chunk_size = chunk_size
+
+    def more(self):
+        if self.eof:
+            return False
+        chunk = self._read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf += chunk
+        return True
+
+    def find(self, needle, start):
+        """buf.find(needle, start), reading further chunks until it is found or the input ends."""
+        while True:
+            j = self.buf.find(needle, start)
+            if j != -1:
+                return j
+            seen = len(self.buf)
+            if not self.more():
+                return -1
+            start = max(start, seen - len(needle) + 1)
+
+
+def _quoted_end(reader, start, quote, backslash=False):
+    """Index just past the literal whose opening quote ends at `start`, or len(buf) if unterminated."""
+    i = start
+    while True:
+        j = reader.find(quote, i)
+        if j == -1:
+            return len(reader.buf)
+        if backslash:
+            k = j - 1
+            while k >= i and reader.buf[k] == "\\":
+                k -= 1
+            if (j - 1 - k) % 2:
+                i = j + 1
+                continue
+        if j + 1 >= len(reader.buf):
+            reader.more()
+        if reader.buf[j + 1:j + 2] == quote:
+            i = j + 2
+            continue
+        return j + 1
+
+
+def _block_end(reader, start):
+    """Index just past the (possibly nested) block comment whose `/*` ends at `start`."""
+    depth = 1
+    i = start
+    while True:
+        m = _BLOCK.search(reader.buf, i)
+        if m is None:
+            if reader.more():
+                continue
+            return len(reader.buf)
+        depth += 1 if m.group() == "/*" else -1
+        i = m.end()
+        if depth == 0:
+            return i
+
+
+def iter_statements(source, chunk_size=1 << 16, line=1, offset=0):
+    """Yield the Statements of `source` (str or text file object); `line`/`offset` are those of its
+    first character, for a source that is itself a slice of a larger file."""
+    reader = _Reader(source, chunk_size)
+    parts, length, dollar = [], 0, []
+    stmt_line, stmt_offset = line, offset
+    pos = 0
+
+    def emit(text):
+        lead = len(text) - len(text.lstrip())
+        if lead == len(text):
+            return None
+        shift = [(s - lead, e - lead) for s, e in dollar]
+        return Statement(text[lead:], stmt_line + text.count("\n", 0, lead), stmt_offset + lead, shift)
+
+    while True:
+        buf = reader.buf
+        m = _START.search(buf, pos)
+        if m is None:
+            if reader.eof:
+                parts.append(buf[pos:])
+                break
+            keep = len(buf) - _TAIL
+            if keep > pos:
+                parts.append(buf[pos:keep])
+                length += keep - pos
+                pos = keep
+            # only a file source gets here (or is trimmed at all): the window stays about one chunk
+            # plus the statement being assembled
+            reader.buf = buf[pos:]
+            pos = 0
+            reader.more()
+            continue
+        tok = m.group()
+        parts.append(buf[pos:m.start()])
+        length += m.start() - pos
+        if tok == ";":
+            parts.append(";")
+            text = "".join(parts)
+            st = emit(text)
+            if st is not None:
+                yield st
+            stmt_line += text.count("\n")
+            stmt_offset += len(text)
+            parts, length, dollar = [], 0, []
+            pos = m.end()
+            if reader.streaming and pos > reader.chunk_size:
+                reader.buf = reader.buf[pos:]
+                pos = 0
+            continue
+        if tok == "--":
+            end = reader.find("\n", m.end())
+            end = len(reader.buf) if end == -1 else end
+            blank = " " * (end - m.start())
+        elif tok == "/*":
+            end = _block_end(reader, m.end())
+            comment = reader.buf[m.start():end]
+            blank = re.sub(r"[^\n]", " ", comment)
+        elif tok in ("'", '"'):
+            end = _quoted_end(reader, m.end(), tok)
+            blank = None
+        elif tok[0] in "eE":
+            end = _quoted_end(reader, m.end(), "'", backslash=True)
+            blank = None
+        else:  # $tag$
+            close = reader.find(tok, m.end())
+            end = len(reader.buf) if close == -1 else close + len(tok)
+            inner_end = len(reader.buf) if close == -1 else close
+            dollar.append((length + len(tok), length + (inner_end - m.start())))
+            blank = None
+        piece = reader.buf[m.start():end] if blank is None else blank
+        parts.append(piece)
+        length += len(piece)
+        pos = end
+    st = emit("".join(parts))
+    if st is not None:
+        yield st
+
+
+def walk_statements(statements):
+    """Statements in source order, descending into dollar-quoted bodies: each statement with
+    dollar content is yielded with that content blanked, then the body's own statements."""
+    for st in statements:
+        if not st.dollar:
+            yield st
+            continue
+        yield Statement(st.without_dollar(), st.line, st.offset, [])
+        for start, end in st.dollar:
+            yield from walk_statements(iter_statements(st.text[start:end], line=st.line_for(start),
+                                                       offset=st.offset + start))
@@ -19,6 +19,8 @@ frontend archetypes.ts). Everything else comes from the live graph.
 """
 from collections import defaultdict
 
+from .index import graph_index
+
 # Next.js privileged server routes that wrap a SQL entry point (the rest of the DB surface is reached
 # by direct PostgREST rpc/ calls from supabase-js). Keyed by function label.
 _ROUTE_WRAPPERS = {
@@ -49,37 +51,32 @@ def _doc_first_line(doc):
     return None
 
 
-def _by(nodes, kind):
-    return [n for n in nodes if n["kind"] == kind]
-
-
-def _object_type_values(g):
-    for n in g["nodes"]:
-        if n["kind"] == "enum" and n["label"] == "object_type":
+def _object_type_values(ix):
+    for n in ix.of_kind("enum"):
+        if n["label"] == "object_type":
             return list(n["props"].get("values", []))
     return []
 
 
-def _fk_children_of(g, parent_id):
+def _fk_children_of(ix, parent_id):
     """Table ids with a direct FK to parent_id."""
-    return {e["source"] for e in g["edges"] if e["kind"] == "fk" and e["target"] == parent_id}
+    return set(ix.sources(parent_id, "fk"))
 
 
-def _applies_to(g):
+def _applies_to(ix):
     """object_type code -> sorted list of facet table ids that apply to it."""
     out = defaultdict(set)
-    for e in g["edges"]:
-        if e["kind"] == "applies_to":
-            out[e["props"]["object_type"]].add(e["target"])
+    for e in ix.edges("applies_to"):
+        out[e["props"]["object_type"]].add(e["target"])
     return {k: sorted(v) for k, v in out.items()}
 
 
-def _facet_tables(g):
+def _facet_tables(ix):
     """All type-specific facet table ids (union of applies_to targets)."""
-    return {e["target"] for e in g["edges"] if e["kind"] == "applies_to"}
+    return {e["target"] for e in ix.edges("applies_to")}
 
 
-def _object_attached(g):
+def _object_attached(ix):
     """Classify object-attached tables.
 
     Returns (object_keyed, place_keyed, facet_subtrees) where:
@@ -87,21 +84,24 @@ def _object_attached(g):
       place_keyed   = table ids with a direct FK to public.object_place (sub-place keyed)
       facet_subtrees= {facet_table_id: set(descendant table ids reached via FK chains not passing
                        back through public.object)} for each type-specific facet table.
+    Computed once per graph and shared by the three writers.
     """
-    object_keyed = _fk_children_of(g, "public.object")
-    place_keyed = _fk_children_of(g, "public.object_place")
-    facets = _facet_tables(g) & object_keyed
-    # FK adjacency child->parent restricted to public tables, excluding edges into public.object
-    children_of = defaultdict(set)
-    for e in g["edges"]:
-        if e["kind"] == "fk" and e["target"] != "public.object":
-            children_of[e["target"]].add(e["source"])
+    return ix.derived("object_attached", _compute_object_attached)
+
+
+def _compute_object_attached(ix):
+    object_keyed = _fk_children_of(ix, "public.object")
+    place_keyed = _fk_children_of(ix, "public.object_place")
+    facets = _facet_tables(ix) & object_keyed
     subtrees = {}
     for f in facets:
         seen, stack = set(), [f]
         while stack:
             cur = stack.pop()
-            for ch in children_of.get(cur, ()):
+            # FK chains are followed child-wards, never back through public.object
+            if cur == "public.object":
+                continue
+            for ch in ix.sources(cur, "fk"):
                 if ch not in seen and ch != f:
                     seen.add(ch)
                     stack.append(ch)
@@ -109,22 +109,21 @@ def _object_attached(g):
     return object_keyed, place_keyed, subtrees
 
 
-def _domain_of(g):
-    return {n["id"]: n.get("domain") for n in g["nodes"]}
+def _domain_of(ix):
+    return {node_id: n.get("domain") for node_id, n in ix.nodes.items()}
 
 
-def _label_of(g):
-    return {n["id"]: n.get("label") for n in g["nodes"]}
+def _label_of(ix):
+    return {node_id: n.get("label") for node_id, n in ix.nodes.items()}
 
 
-def _reads_writes(g):
+def _reads_writes(ix):
     reads = defaultdict(set)   # fid -> {table_id}
     writes = defaultdict(set)
-    for e in g["edges"]:
-        if e["kind"] == "reads":
-            reads[e["source"]].add(e["target"])
-        elif e["kind"] == "writes":
-            writes[e["source"]].add(e["target"])
+    for e in ix.edges("reads"):
+        reads[e["source"]].add(e["target"])
+    for e in ix.edges("writes"):
+        writes[e["source"]].add(e["target"])
     return reads, writes
 
 
@@ -142,12 +141,13 @@ def _types_for_table(table_id, applies_rev, common_set):
 # OBJECT_TYPES.md
 # ─────────────────────────────────────────────────────────────────────────────
 def write_object_types_md(g, meta):
-    values = _object_type_values(g)
-    applies = _applies_to(g)
-    object_keyed, place_keyed, subtrees = _object_attached(g)
+    ix = graph_index(g)
+    values = _object_type_values(ix)
+    applies = _applies_to(ix)
+    object_keyed, place_keyed, subtrees = _object_attached(ix)
     facets = set(subtrees)
-    label_of = _label_of(g)
-    dom = _domain_of(g)
+    label_of = _label_of(ix)
+    dom = _domain_of(ix)
     types_meta = meta.get("types", {})
     arch_meta = meta.get("_archetypes", {})
 
@@ -263,14 +263,15 @@ def _types_served(fid, reads, writes, applies_rev, common_set):
 
 
 def write_function_access_md(g, meta):
-    fns = sorted(_by(g["nodes"], "function"), key=lambda n: (n["schema"], n["label"]))
-    reads, writes = _reads_writes(g)
-    object_keyed, place_keyed, subtrees = _object_attached(g)
+    ix = graph_index(g)
+    fns = sorted(ix.of_kind("function"), key=lambda n: (n["schema"], n["label"]))
+    reads, writes = _reads_writes(ix)
+    object_keyed, place_keyed, subtrees = _object_attached(ix)
     facets = set(subtrees)
     facet_subtree_union = set().union(*subtrees.values()) if subtrees else set()
     common_set = {t for t in object_keyed if t not in facets and t not in facet_subtree_union} | place_keyed
     # reverse applies_to: facet table id -> [object types]; subtree tables inherit their facet's types
-    applies = _applies_to(g)
+    applies = _applies_to(ix)
     applies_rev = defaultdict(set)
     for code, fl in applies.items():
         for f in fl:
@@ -323,24 +324,23 @@ def write_function_access_md(g, meta):
 # ─────────────────────────────────────────────────────────────────────────────
 # SURFACE_COVERAGE.md
 # ─────────────────────────────────────────────────────────────────────────────
-def _consumer_functions(g):
+def _consumer_functions(ix):
     """Functions that look like read/consumer entry points (api/public getters + list/get/search)."""
     out = set()
-    for n in g["nodes"]:
-        if n["kind"] != "function":
-            continue
+    for n in ix.of_kind("function"):
         if n["schema"] in ("api", "internal", "public"):
             out.add(n["id"])
     return out
 
 
 def write_surface_coverage_md(g, meta):
-    object_keyed, place_keyed, subtrees = _object_attached(g)
-    label_of = _label_of(g)
-    dom = _domain_of(g)
+    ix = graph_index(g)
+    object_keyed, place_keyed, subtrees = _object_attached(ix)
+    label_of = _label_of(ix)
+    dom = _domain_of(ix)
     partitions = g.get("partitions", {})  # child id -> parent id
-    reads, _writes = _reads_writes(g)
-    consumers = _consumer_functions(g)
+    reads, _writes = _reads_writes(ix)
+    consumers = _consumer_functions(ix)
     # table -> set of consumer fids reading it
     readers = defaultdict(set)
     for fid, tables in reads.items():
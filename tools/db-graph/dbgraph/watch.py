@@ -0,0 +1,54 @@
+"""Polling file watcher for `db_graph.py --watch`.
+
+The pipeline is stdlib-only and runs on Windows as well as Linux, so instead of inotify this polls
+(mtime_ns, size) of every file matching the watched glob patterns — a few hundred stat() calls per
+interval. A burst of saves is coalesced: once something changes, the callback only fires after the
+tree has been quiet for `debounce` seconds, with every path that changed during the burst.
+"""
+import glob
+import os
+import time
+
+
+def snapshot(patterns, ignore=()):
+    """{path: (mtime_ns, size)} for every file matching any of the glob patterns, minus `ignore`."""
+    ignored = {os.path.normcase(os.path.abspath(p)) for p in ignore}
+    out = {}
+    for pattern in patterns:
+        for path in glob.glob(pattern):
+            if os.path.normcase(os.path.abspath(path)) in ignored:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if not os.path.isdir(path):
+                out[path] = (st.st_mtime_ns, st.st_size)
+    return out
+
+
+def changed_paths(before, after):
+    """Paths added, removed or modified between two snapshots, sorted."""
+    return sorted(p for p in set(before) | set(after) if before.get(p) != after.get(p))
+
+
+def watch(patterns, on_change, ignore=(), interval=0.5, debounce=0.3, should_stop=None,
+          sleep=time.sleep, clock=time.monotonic):
+    """Call on_change(sorted changed paths) after each debounced burst until should_stop() is true
+    (or forever). on_change runs synchronously; changes made while it runs are picked up after, so
+    files the callback itself writes must be in `ignore`."""
+    current = snapshot(patterns, ignore)
+    pending = set()
+    last_change = None
+    while not (should_stop and should_stop()):
+        sleep(interval)
+        latest = snapshot(patterns, ignore)
+        moved = changed_paths(current, latest)
+        current = latest
+        if moved:
+            pending.update(moved)
+            last_change = clock()
+            continue
+        if pending and clock() - last_change >= debounce:
+            batch, pending = sorted(pending), set()
+            on_change(batch)
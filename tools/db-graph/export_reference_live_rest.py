@@ -4,22 +4,29 @@ This is the practical companion to Supabase MCP for large reference dumps:
 use MCP to retrieve the project URL/publishable key and to audit counts, then
 let this script page through PostgREST without truncating the agent response.
 """
+import argparse
+import http.client
 import json
 import os
 import sys
+import threading
 import time
-import urllib.error
 import urllib.parse
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from dbgraph.reference_extract import live_reference_tables  # noqa: E402
+from dbgraph import load_graph  # noqa: E402
+from dbgraph.reference_extract import live_reference_tables, load_mcp_reference_values, reusable_tables  # noqa: E402
 
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 OUT = os.path.join(ROOT, "db-graph-out")
 PAGE_SIZE = 1000
+RETRY_STATUSES = (429, 503)
+MAX_RETRIES = 6
+BACKOFF = 0.5        # first retry delay (seconds) when the server sends no Retry-After; doubles
+MAX_BACKOFF = 30.0
 
 
 def _read_json(path):
@@ -45,6 +52,26 @@ def _load_mcp_audit():
     return payload
 
 
+def _load_mcp_fingerprints():
+    """db_reference_fingerprint.sql run via MCP -> (queried_at, {table: {"rows", "hash"}}), or None."""
+    path = os.environ.get("DB_GRAPH_MCP_FINGERPRINT_JSON") or os.path.join(OUT, "reference_live_fingerprints.json")
+    if not os.path.exists(path):
+        return None
+    payload = _decode_json_value(_read_json(path))
+    if isinstance(payload, list) and payload and isinstance(payload[0], dict):
+        payload = payload[0]
+    payload = _decode_json_value(payload.get("mcp_reference_fingerprints", payload))
+    return payload.get("queried_at"), _decode_json_value(payload.get("reference_fingerprints")) or {}
+
+
+def _previous_rows(previous, table, columns):
+    """A table's rows from the previous export, without the columns _enrich() added (it adds them
+    again from this run's rows, which may have changed)."""
+    keep = set(columns)
+    return [{k: v for k, v in row["values"].items() if k in keep}
+            for row in previous.get("rows", []) if row.get("table") == table]
+
+
 def _audit_counts(audit):
     out = {}
     if not audit:
@@ -64,39 +91,204 @@ def _order_columns(columns):
     return [col for col in preferred if col in columns]
 
 
-def _request_json(url, key, path, params=None, page=0):
-    query = urllib.parse.urlencode(params or {}, doseq=True)
-    full_url = "%s/rest/v1/%s%s" % (url.rstrip("/"), path, ("?" + query) if query else "")
-    start = page * PAGE_SIZE
-    end = start + PAGE_SIZE - 1
-    req = urllib.request.Request(full_url, headers={
-        "apikey": key,
-        "Authorization": "Bearer " + key,
-        "Accept": "application/json",
-        "Range-Unit": "items",
-        "Range": "%d-%d" % (start, end),
-    })
-    with urllib.request.urlopen(req, timeout=45) as response:
-        return json.loads(response.read().decode("utf-8"))
-
-
-def _fetch_table(url, key, table, columns):
-    name = table.split(".", 1)[1]
+class RestError(Exception):
+    """A PostgREST request that failed for good; the message is the response body when there is one."""
+
+
+class _Rest:
+    """GETs against PostgREST: one keep-alive connection per worker thread, and a backoff shared by
+    all of them, so a 429/503 (honouring Retry-After) pauses every worker, not just the one hit."""
+
+    def __init__(self, url, key, timeout=45):
+        parsed = urllib.parse.urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+        self.netloc = parsed.netloc
+        self.base = parsed.path.rstrip("/") + "/rest/v1/"
+        self.timeout = timeout
+        self.headers = {"apikey": key, "Authorization": "Bearer " + key, "Accept": "application/json",
+                        "Range-Unit": "items"}
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.resume_at = 0.0
+        self.connections = []
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = self.connection_class(self.netloc, timeout=self.timeout)
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+
+    def close(self):
+        for conn in self.connections:
+            conn.close()
+
+    def _reset(self):
+        conn = getattr(self.local, "conn", None)
+        self.local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def _wait(self):
+        while True:
+            with self.lock:
+                delay = self.resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def _back_off(self, attempt, retry_after):
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = min(BACKOFF * 2 ** attempt, MAX_BACKOFF)
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + delay)
+
+    def get(self, path, params, start, end, count=False):
+        """Rows start..end of `path` -> (rows, total); total is None unless `count` (Prefer:
+        count=exact) and the server reported it."""
+        query = urllib.parse.urlencode(params or {}, doseq=True)
+        target = self.base + path + ("?" + query if query else "")
+        headers = dict(self.headers, Range="%d-%d" % (start, end))
+        if count:
+            headers["Prefer"] = "count=exact"
+        for attempt in range(MAX_RETRIES + 1):
+            self._wait()
+            try:
+                conn = self._connection()
+                conn.request("GET", target, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                # a dropped keep-alive connection: reconnect, then count it as a retry
+                self._reset()
+                if attempt == MAX_RETRIES:
+                    raise
+                continue
+            if response.status in RETRY_STATUSES and attempt < MAX_RETRIES:
+                self._back_off(attempt, response.getheader("Retry-After"))
+                continue
+            if response.status == 416:   # past the end (rows deleted since the count)
+                return [], None
+            if response.status >= 400:
+                raise RestError(body.decode("utf-8", "replace") or "HTTP %d" % response.status)
+            total = (response.getheader("Content-Range") or "").rpartition("/")[2]
+            return json.loads(body.decode("utf-8")), int(total) if total.isdigit() else None
+
+
+def _table_params(columns):
     order = ",".join("%s.asc.nullslast" % col for col in _order_columns(columns))
     params = {"select": "*"}
     if order:
         params["order"] = order
+    return params
 
+
+def _keyset_column(target):
+    """The column to page `target` on with `<column>=gt.<last value>`: one that is unique on its own,
+    i.e. a single-column primary key, or `id` within a composite one (a generated id; ref_code's
+    key adds its partition column `domain`). None when there is no such column."""
+    key = target.get("key") or []
+    if "id" in key:
+        return "id"
+    return key[0] if len(key) == 1 else None
+
+
+def _keyset_rows(rest, name, key):
+    """A table's rows, paged by key: each page costs an index range scan, not a skip over all the
+    earlier rows, and rows inserted/deleted meanwhile cannot shift a page boundary. The rows stay in
+    key order as Postgres sorted them, not in the _order_columns order of an offset export: a
+    client-side re-sort would not follow the database collation. The reference page sorts rows by
+    their reference key (domain:code, slug, ...); only rows without one show in this order."""
     rows = []
-    page = 0
     while True:
-        batch = _request_json(url, key, name, params=params, page=page)
+        params = {"select": "*", "order": "%s.asc" % key}
+        if rows:
+            params[key] = "gt.%s" % rows[-1][key]
+        batch, _total = rest.get(name, params, 0, PAGE_SIZE - 1)
         rows.extend(batch)
         if len(batch) < PAGE_SIZE:
-            break
+            return rows
+
+
+def _rest_rows_after(rest, name, params, page):
+    """Pages `page`, `page` + 1, ... up to the first short one (when the total is unknown)."""
+    rows = []
+    while True:
+        batch, _total = rest.get(name, params, page * PAGE_SIZE, (page + 1) * PAGE_SIZE - 1)
+        rows.extend(batch)
+        if len(batch) < PAGE_SIZE:
+            return rows
         page += 1
-        time.sleep(0.1)
-    return rows
+
+
+def _fetch_tables(url, key, targets, concurrency=4, keyset=True):
+    """Every target's rows over `concurrency` keep-alive connections -> ({table: rows}, [error]).
+
+    With `keyset`, tables with a usable key (_keyset_column) are paged by key, one task per table,
+    and come back in key order.
+    The others are offset-paged: the first page asks for count=exact; once the totals are in, every
+    remaining page of every table is fetched in parallel, then the pages are put back in order.
+    """
+    rest = _Rest(url, key)
+    plans, keyed = {}, {}
+    for target in targets:
+        name = target["table"].split(".", 1)[1]
+        column = _keyset_column(target) if keyset else None
+        if column:
+            keyed[target["table"]] = (name, column)
+        else:
+            plans[target["table"]] = (name, _table_params(target["columns"]))
+    table_rows, failed = {}, {}
+
+    def first(table):
+        name, params = plans[table]
+        return rest.get(name, params, 0, PAGE_SIZE - 1, count=True)
+
+    def page(table, number):
+        name, params = plans[table]
+        if number is None:   # total unknown: the rest of the table, one page after the other
+            return _rest_rows_after(rest, name, params, 1)
+        return rest.get(name, params, number * PAGE_SIZE, (number + 1) * PAGE_SIZE - 1)[0]
+
+    def settle(futures):
+        out = {}
+        for job, future in futures.items():
+            try:
+                out[job] = future.result()
+            except Exception as exc:   # one table's failure is recorded, the others are still exported
+                failed.setdefault(job[0], str(exc) or type(exc).__name__)
+        return out
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            by_key = {(table,): pool.submit(_keyset_rows, rest, *keyed[table]) for table in keyed}
+            firsts = settle({(table,): pool.submit(first, table) for table in plans})
+            jobs = []
+            for (table,), (rows, total) in firsts.items():
+                table_rows[table] = [rows]
+                if total is not None:
+                    jobs.extend((table, n) for n in range(1, -(-total // PAGE_SIZE)))
+                elif len(rows) == PAGE_SIZE:
+                    jobs.append((table, None))
+            pages = settle({job: pool.submit(page, *job) for job in jobs})
+            for (table,), rows in settle(by_key).items():
+                table_rows[table] = [rows]
+    finally:
+        rest.close()
+    for table, number in sorted(pages, key=lambda job: (job[0], job[1] or 0)):
+        table_rows[table].append(pages[(table, number)])
+    errors = []
+    for target in targets:
+        table = target["table"]
+        if table in failed:
+            errors.append({"table": table, "message": failed[table]})
+            table_rows[table] = []
+        else:
+            table_rows[table] = [row for batch in table_rows[table] for row in batch]
+    return table_rows, errors
 
 
 def _lookup(rows, key_col="id", value_col="code"):
@@ -181,33 +373,43 @@ def _enrich(table_rows):
             row.setdefault("descendant_name", descendant.get("name"))
 
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export public reference rows through the Supabase REST API.")
+    parser.add_argument("--refresh", action="store_true",
+                        help="keep the rows of db-graph-out/reference_live.json for tables whose fingerprint "
+                             "(db_reference_fingerprint.sql via MCP) did not change; re-pull the others")
+    parser.add_argument("--concurrency", type=int, default=4, metavar="N",
+                        help="page requests in flight at once, each worker on its own keep-alive "
+                             "connection (default 4)")
+    parser.add_argument("--paging", choices=("keyset", "offset"), default="keyset",
+                        help="`keyset` (default): page by primary key (`id=gt.<last>`), falling back to "
+                             "offset Range paging for tables without a usable key; `offset`: Range for all")
+    args = parser.parse_args(argv)
     url = os.environ.get("SUPABASE_URL")
     key = os.environ.get("SUPABASE_PUBLISHABLE_KEY") or os.environ.get("SUPABASE_KEY")
     if not url or not key:
         sys.exit("Set SUPABASE_URL and SUPABASE_PUBLISHABLE_KEY from Supabase MCP first.")
 
-    graph = _read_json(os.path.join(OUT, "graph.json"))
+    graph = load_graph(os.path.join(OUT, "graph.json"))
     extra = _read_json(os.path.join(OUT, "catalog_extra.json"))
     targets = live_reference_tables(graph, extra)
 
     audit = _load_mcp_audit()
     mcp_counts = _audit_counts(audit)
-    table_rows = {}
-    errors = []
+    fingerprints_queried_at, fingerprints = _load_mcp_fingerprints() or (None, None)
+    live_path = os.path.join(OUT, "reference_live.json")
+    if args.refresh and fingerprints is None:
+        sys.exit("--refresh needs db-graph-out/reference_live_fingerprints.json (db_reference_fingerprint.sql via MCP).")
+    previous = load_mcp_reference_values(live_path) if args.refresh and os.path.exists(live_path) else {}
+    if previous and previous["live"].get("fingerprints_queried_at") == fingerprints_queried_at:
+        # the same fingerprints as last time would keep every table whatever changed since
+        sys.exit("reference_live_fingerprints.json is the one the last export used; re-run db_reference_fingerprint.sql first.")
+    reusable = reusable_tables(previous.get("live"), fingerprints) if args.refresh else set()
+    table_rows, errors = _fetch_tables(url, key, [t for t in targets if t["table"] not in reusable],
+                                       concurrency=args.concurrency, keyset=args.paging == "keyset")
     for target in targets:
-        table = target["table"]
-        try:
-            table_rows[table] = _fetch_table(url, key, table, target["columns"])
-        except (urllib.error.HTTPError, urllib.error.URLError, TimeoutError, ValueError) as exc:
-            message = str(exc)
-            if isinstance(exc, urllib.error.HTTPError):
-                try:
-                    message = exc.read().decode("utf-8", "replace")
-                except Exception:
-                    pass
-            errors.append({"table": table, "message": message})
-            table_rows[table] = []
+        if target["table"] in reusable:
+            table_rows[target["table"]] = _previous_rows(previous, target["table"], target["columns"])
 
     _enrich(table_rows)
 
@@ -244,16 +446,19 @@ def main():
         "tables": trusted_tables,
         "mcp_audit_queried_at": (audit or {}).get("queried_at"),
         "count_mismatches": count_mismatches,
+        "fingerprints": {table: fingerprints[table] for table in trusted_tables if table in (fingerprints or {})},
+        "fingerprints_queried_at": fingerprints_queried_at,
+        "reused": sorted(reusable & set(trusted_tables)),
         "errors": errors,
         "truncated": [],
     }
     out = {"rows": rows, "derived_sources": [], "live": live}
     os.makedirs(OUT, exist_ok=True)
-    with open(os.path.join(OUT, "reference_live.json"), "w", encoding="utf-8") as f:
+    with open(live_path, "w", encoding="utf-8") as f:
         json.dump(out, f, ensure_ascii=False, indent=1, sort_keys=True)
 
-    print("exported %d live reference rows from %d tables (%d errors)" % (
-        len(rows), len(table_rows), len(errors)))
+    print("exported %d live reference rows from %d tables (%d kept unchanged, %d errors)" % (
+        len(rows), len(table_rows), len(live["reused"]), len(errors)))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,195 @@
+"""CLI over dbgraph.query: answer neighbourhood / FK path / write-impact / policy / search / filter
+questions from db-graph-out/graph.json without grepping it.
+
+    python tools/db-graph/query_graph.py impact object_price
+    python tools/db-graph/query_graph.py path object_place object_price
+    python tools/db-graph/query_graph.py neighbours api.get_object_card --hops 2 --edge reads --edge writes
+    python tools/db-graph/query_graph.py policies object_place --hops 1
+    python tools/db-graph/query_graph.py search "horaire ouverture" --kind function
+    python tools/db-graph/query_graph.py find --kind table --domain pricing --text price
+    python tools/db-graph/query_graph.py repl              # one query per stdin line, graph loaded once
+    python tools/db-graph/query_graph.py serve --port 8765 # GET /?q=impact+object_price -> JSON
+
+`--json` prints the raw result instead of the text listing (repl: per line, serve: always).
+"""
+import argparse
+import json
+import os
+import shlex
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from dbgraph.query import GraphQuery  # noqa: E402
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+GRAPH = os.path.join(ROOT, "db-graph-out", "graph.json")
+
+
+class _UsageError(Exception):
+    pass
+
+
+class _Parser(argparse.ArgumentParser):
+    """argparse that raises instead of exiting, so a bad line in the REPL/server does not end it."""
+
+    def error(self, message):
+        raise _UsageError("%s: %s" % (self.prog, message))
+
+
+def _query_parser():
+    parser = _Parser(prog="query", add_help=False)
+    sub = parser.add_subparsers(dest="command", required=True, parser_class=_Parser)
+    p = sub.add_parser("neighbours", aliases=["neighbors"], add_help=False)
+    p.add_argument("name")
+    p.add_argument("--hops", type=int, default=1)
+    p.add_argument("--edge", action="append", help="edge kind to follow (repeatable; default all)")
+    p.add_argument("--direction", choices=("out", "in", "both"), default="both")
+    p = sub.add_parser("path", add_help=False)
+    p.add_argument("source")
+    p.add_argument("target")
+    p = sub.add_parser("impact", add_help=False)
+    p.add_argument("name")
+    p.add_argument("--depth", type=int)
+    p = sub.add_parser("policies", add_help=False)
+    p.add_argument("name")
+    p.add_argument("--hops", type=int, default=0, help="also tables this many FK hops away")
+    p = sub.add_parser("search", add_help=False)
+    p.add_argument("text", nargs="+")
+    p.add_argument("--kind", action="append", help="restrict to this node kind (repeatable)")
+    p.add_argument("--limit", type=int, default=20)
+    p = sub.add_parser("find", add_help=False)
+    p.add_argument("--kind")
+    p.add_argument("--domain")
+    p.add_argument("--schema")
+    p.add_argument("--text")
+    return parser
+
+
+def run_query(query, argv):
+    """Run one query command -> (JSON-able result, text listing). Raises KeyError for unknown or
+    ambiguous names and _UsageError for a malformed command."""
+    args = _query_parser().parse_args(argv)
+    nodes = query.index.nodes
+    if args.command in ("neighbours", "neighbors"):
+        found = query.neighbourhood(args.name, args.hops, args.edge, args.direction)
+        result = {"nodes": [{"id": i, "kind": nodes[i]["kind"], "hops": d} for i, d in found.items()],
+                  "edges": query.subgraph(found, args.edge)}
+        text = ["%d  %-8s %s" % (n["hops"], n["kind"], n["id"]) for n in result["nodes"]]
+    elif args.command == "path":
+        path = query.fk_path(args.source, args.target)
+        result = {"source": query.resolve(args.source), "target": query.resolve(args.target), "edges": path}
+        if path is None:
+            text = ["no FK path"]
+        else:
+            text = ["%s -> %s  (%s)" % (e["source"], e["target"],
+                                        ", ".join("%s=%s" % tuple(c) for c in e["props"].get("columns", [])))
+                    for e in path]
+    elif args.command == "impact":
+        result = query.impact(args.name, args.depth)
+        text = ["%d  %s" % (r["depth"], "  ->  ".join(r["chain"])) for r in result]
+    elif args.command == "policies":
+        tables = [i for i in query.neighbourhood(args.name, args.hops, ["fk"])
+                  if nodes[i]["kind"] in ("table", "view", "matview")]
+        policies = query.gating_policies(tables)
+        result = [{"id": p, "tables": sorted(query.index.targets(p, "gates"))} for p in policies]
+        text = ["%s  (%s)" % (r["id"], ", ".join(r["tables"])) for r in result]
+    elif args.command == "search":
+        result = [{"id": i, "kind": nodes[i]["kind"], "score": score}
+                  for i, score in query.search(" ".join(args.text) + " ", args.limit, args.kind)]
+        text = ["%7.2f  %-8s %s" % (r["score"], r["kind"], r["id"]) for r in result]
+    else:
+        result = [{"id": n["id"], "kind": n["kind"], "domain": n.get("domain")}
+                  for n in query.find(args.kind, args.domain, args.schema, args.text)]
+        text = ["%-8s %-14s %s" % (r["kind"], r["domain"] or "-", r["id"]) for r in result]
+    return result, "\n".join(text) if text else "(none)"
+
+
+def _answer(query, line, as_json):
+    """One query line -> printable text; errors become a message, not an exit."""
+    try:
+        argv = shlex.split(line)
+        t0 = time.perf_counter()
+        result, text = run_query(query, argv)
+        elapsed = (time.perf_counter() - t0) * 1e3
+    except (KeyError, ValueError, _UsageError) as exc:
+        message = exc.args[0] if isinstance(exc, KeyError) and exc.args else str(exc)
+        return json.dumps({"error": message}, ensure_ascii=False) if as_json else "error: %s" % message
+    if as_json:
+        return json.dumps(result, ensure_ascii=False)
+    return "%s\n(%.1f ms)" % (text, elapsed)
+
+
+def _repl(query, as_json, stdin=sys.stdin, stdout=sys.stdout):
+    interactive = stdin.isatty()
+    while True:
+        if interactive:
+            stdout.write("query> ")
+            stdout.flush()
+        line = stdin.readline()
+        if not line:
+            return
+        line = line.strip()
+        if line in ("quit", "exit"):
+            return
+        if line:
+            stdout.write(_answer(query, line, as_json) + "\n")
+            stdout.flush()
+
+
+def _serve(query, port):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlsplit
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            q = parse_qs(urlsplit(self.path).query).get("q", [""])[0]
+            body = _answer(query, q, as_json=True).encode("utf-8")
+            self.send_response(400 if body.startswith(b'{"error"') else 200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    print("query_graph: serving on http://127.0.0.1:%d/?q=<query> (Ctrl+C to stop)" % server.server_address[1])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0],
+                                     usage="query_graph.py [--graph PATH] [--json] "
+                                           "{neighbours,path,impact,policies,search,find,repl,serve} ...")
+    parser.add_argument("--graph", default=GRAPH, help="graph.json to query (either format)")
+    parser.add_argument("--json", action="store_true", help="print the raw JSON result")
+    parser.add_argument("--port", type=int, default=8765, help="serve: port on 127.0.0.1")
+    parser.add_argument("command", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    if not args.command:
+        parser.error("a query, `repl` or `serve` is required")
+    if not os.path.exists(args.graph):
+        sys.exit("Missing %s — run db_graph.py first." % args.graph)
+    query = GraphQuery.load(args.graph)
+    if args.command[0] == "repl":
+        return _repl(query, args.json)
+    if args.command[0] == "serve":
+        return _serve(query, args.port)
+    try:
+        result, text = run_query(query, args.command)
+    except (KeyError, _UsageError) as exc:
+        sys.exit("query_graph: %s" % (exc.args[0] if exc.args else exc))
+    print(json.dumps(result, ensure_ascii=False, indent=1) if args.json else text)
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+from bench_pipeline import BASE, run_scale, synthetic_catalog
+
+def test_synthetic_catalog_scales_and_is_deterministic():
+    tbls, extra, sql_files = synthetic_catalog(0.1)
+    assert len(extra["functions"]) == round(BASE["functions"] * 0.1)
+    assert len(extra["policies"]) == round(BASE["policies"] * 0.1)
+    assert synthetic_catalog(0.1) == (tbls, extra, sql_files)
+    big, _, _ = synthetic_catalog(0.2)
+    assert len(big["tables"]) > len(tbls["tables"])
+
+def test_run_scale_times_every_stage():
+    run = run_scale(0.05, repeat=1, memory=True)
+    assert {"load_tbls_schema", "infer_rpc_table_edges", "attach_sql_docs", "build_graph",
+            "write_function_access_md", "render_api_db_reference_html"} <= set(run["stages"])
+    assert all(st["seconds"] >= 0 and st["peak_bytes"] > 0 for st in run["stages"].values())
+    assert run["counts"]["reference_rows"] > 0
@@ -44,3 +44,12 @@ def test_build_has_no_dangling_edges_and_resolves_executes():
     ex = [e for e in g["edges"] if e["kind"] == "executes"]
     if ex:
         assert "assert_object_type_change_consistent" in ex[0]["target"]
+
+def test_build_parallel_inference_matches_serial_byte_for_byte():
+    extra = _fix("catalog_extra.sample.json")
+    fns = extra["functions"]
+    # enough functions for several shards, with a repeated signature straddling shard boundaries
+    extra["functions"] = fns + [dict(f, name="%s_%d" % (f["name"], i)) for i in range(6) for f in fns] + fns
+    serial = build_graph(_fix("schema_tbls.sample.json"), json.loads(json.dumps(extra)), sql_paths=[])
+    parallel = build_graph(_fix("schema_tbls.sample.json"), json.loads(json.dumps(extra)), sql_paths=[], workers=3)
+    assert json.dumps(parallel, ensure_ascii=False, indent=1) == json.dumps(serial, ensure_ascii=False, indent=1)
@@ -0,0 +1,68 @@
+import json, os
+from dbgraph.build import build_graph
+from dbgraph.cache import BuildCache
+from dbgraph.reference_extract import extract_reference_values
+
+HERE = os.path.dirname(__file__)
+
+def _fix(name):
+    with open(os.path.join(HERE, "fixtures", name), encoding="utf-8") as f:
+        return json.load(f)
+
+def test_memo_persists_across_instances_and_returns_fresh_copies(tmp_path):
+    calls = []
+    def compute():
+        calls.append(1)
+        return {"rows": [1, 2]}
+    first = BuildCache(str(tmp_path))
+    assert first.memo("stage", "k", compute) == {"rows": [1, 2]}
+    first.save()
+    second = BuildCache(str(tmp_path))
+    got = second.memo("stage", "k", compute)
+    got["rows"].append(3)
+    assert second.memo("stage", "k", compute) == {"rows": [1, 2]}
+    assert len(calls) == 1 and second.hits == 2
+
+def test_salt_change_invalidates_entries_and_outputs(tmp_path):
+    out = tmp_path / "a.md"
+    out.write_text("x", encoding="utf-8")
+    cache = BuildCache(str(tmp_path / "c"), salt="v1")
+    cache.memo("stage", "k", lambda: 1)
+    assert not cache.output_fresh("a.md", str(out), "d1")
+    cache.save()
+    again = BuildCache(str(tmp_path / "c"), salt="v1")
+    assert again.output_fresh("a.md", str(out), "d1")
+    assert not again.output_fresh("a.md", str(out), "d2")
+    edited = BuildCache(str(tmp_path / "c"), salt="v2")
+    assert not edited.output_fresh("a.md", str(out), "d1")
+    edited.memo("stage", "k", lambda: 1)
+    assert edited.misses == 1
+
+def test_save_prunes_entries_not_used_by_the_build(tmp_path):
+    cache = BuildCache(str(tmp_path))
+    cache.memo("stage", "old", lambda: 1)
+    cache.save()
+    cache.memo("stage", "new", lambda: 2)
+    cache.save()
+    assert sorted(os.listdir(tmp_path / "stage")) == ["new.json"]
+
+def test_track_input_reports_changes_since_last_build(tmp_path):
+    cache = BuildCache(str(tmp_path))
+    assert cache.track_input("a.sql", "1")
+    cache.save()
+    assert not cache.track_input("a.sql", "1")
+    assert cache.track_input("b.sql", "2")
+    assert cache.changed_inputs() == ["b.sql"]
+
+def test_cached_build_and_reference_extract_match_uncached(tmp_path):
+    sql = tmp_path / "seed.sql"
+    sql.write_text("-- doc\nCREATE FUNCTION api.f() RETURNS void AS $$$$;\n"
+                   "INSERT INTO ref_code (domain, code) VALUES ('d', 'c');\n", encoding="utf-8")
+    tbls, extra = _fix("schema_tbls.sample.json"), _fix("catalog_extra.sample.json")
+    plain = build_graph(tbls, extra, [str(sql)])
+    for _ in range(2):
+        cache = BuildCache(str(tmp_path / "cache"))
+        assert build_graph(tbls, extra, [str(sql)], cache=cache) == plain
+        assert extract_reference_values([str(sql)], cache=cache) == extract_reference_values([str(sql)])
+        cache.save()
+    assert cache.misses == 0
@@ -0,0 +1,54 @@
+import json
+import os
+import db_graph
+from dbgraph.build import build_graph
+from dbgraph.chunks import SEARCH_CHUNK, chunk_files, chunk_names, skeleton
+from dbgraph.render import render_html
+from dbgraph.search import build_search_index
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def _fix(name):
+    with open(os.path.join(HERE, "fixtures", name), encoding="utf-8") as f:
+        return json.load(f)
+
+def _g():
+    return build_graph(_fix("schema_tbls.sample.json"), _fix("catalog_extra.sample.json"), sql_paths=[])
+
+def _chunk_data(text):
+    name, data = text[len("dbgraphChunk("):-len(");\n")].split(",", 1)
+    return json.loads(name), json.loads(data)
+
+def test_skeleton_and_chunks_partition_the_graph():
+    g = _g()
+    sk = skeleton(g)
+    assert [r[0] for r in sk["nodes"]] == [n["id"] for n in g["nodes"]]
+    assert len(sk["edges"]) == len(g["edges"]) and sk["top"]["meta"] == g["meta"]
+    files = chunk_files(g, build_search_index(g))
+    assert set(files) == set(chunk_names(g).values()) | {SEARCH_CHUNK}
+    details = {}
+    for name, text in files.items():
+        assert _chunk_data(text)[0] == name
+        if name != SEARCH_CHUNK:
+            details.update(_chunk_data(text)[1]["nodes"])
+    assert details == {n["id"]: {"doc": n["doc"], "props": n["props"]} for n in g["nodes"]}
+
+def test_chunk_names_are_unique_slugs():
+    g = {"nodes": [{"id": "a", "domain": "Object Core"}, {"id": "b", "domain": "object core"},
+                   {"id": "c", "domain": None}, {"id": "d", "domain": "_search"}], "edges": []}
+    names = chunk_names(g)
+    assert names == {"Object Core": "object_core.js", "_search": "search.js", "object core": "object_core_2.js",
+                     "unclassified": "unclassified.js"}
+
+def test_split_page_inlines_no_details_and_the_chunks_are_written(tmp_path):
+    g = _g()
+    predicates = [n["props"]["predicate"] for n in g["nodes"] if n["kind"] == "policy"]
+    html = render_html(g, split=True)
+    assert "let S = null;" in html and '"format":"dbgraph-skeleton/1"' in html
+    assert predicates and not any(json.dumps(p)[1:-1] in html for p in predicates)
+    directory = tmp_path / "graph-chunks"
+    directory.mkdir()
+    (directory / "gone.js").write_text("old", encoding="utf-8")
+    assert db_graph._write_chunk_files(chunk_files(g, build_search_index(g)), str(directory)) is True
+    assert sorted(os.listdir(directory)) == sorted(chunk_files(g, build_search_index(g)))
+    assert db_graph._write_chunk_files(chunk_files(g, build_search_index(g)), str(directory)) is False
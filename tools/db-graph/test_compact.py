@@ -0,0 +1,54 @@
+import json, os
+from dbgraph import load_graph
+from dbgraph.build import build_graph
+from dbgraph.compact import dumps_graph, from_compact, to_compact
+from dbgraph.render import render_html
+
+HERE = os.path.dirname(__file__)
+
+def _g():
+    def _fix(n):
+        with open(os.path.join(HERE, "fixtures", n), encoding="utf-8") as f:
+            return json.load(f)
+    return build_graph(_fix("schema_tbls.sample.json"), _fix("catalog_extra.sample.json"), sql_paths=[])
+
+def test_compact_round_trips_losslessly_including_key_order():
+    g = _g()
+    back = from_compact(json.loads(dumps_graph(g, compact=True)))
+    assert back == g
+    assert json.dumps(back) == json.dumps(g)
+
+def test_compact_carries_dangling_edges_and_odd_nodes_verbatim():
+    g = {"meta": {}, "nodes": [{"id": "a", "kind": "table", "label": "a", "schema": "public", "domain": None,
+                                "doc": None, "props": {"columns": [{"name": "id", "type": "uuid"}]}},
+                               {"id": "b", "kind": "enum", "extra": 1}],
+         "edges": [{"source": "a", "target": "zzz", "kind": "fk", "props": {}},
+                   {"source": "a", "target": "b", "kind": "typed_by", "props": {"column": "a.x"}, "note": "x"}]}
+    c = to_compact(g)
+    assert c["ids"] == ["zzz"]
+    assert from_compact(json.loads(json.dumps(c))) == g
+
+def test_compact_keeps_falsy_edge_props_that_are_not_an_empty_dict():
+    g = {"meta": {}, "nodes": [{"id": "a", "kind": "table", "label": "a", "schema": "public", "domain": None,
+                                "doc": None, "props": {}}],
+         "edges": [{"source": "a", "target": "a", "kind": k, "props": p}
+                   for k, p in (("fk", {}), ("reads", None), ("writes", []), ("gates", ""))]}
+    c = to_compact(g)
+    assert [len(row) for row in c["edges"]] == [3, 4, 4, 4]
+    assert from_compact(json.loads(json.dumps(c))) == g
+
+def test_load_graph_reads_both_formats_and_lazy_nodes(tmp_path):
+    g = _g()
+    plain, compact = tmp_path / "plain.json", tmp_path / "compact.json"
+    plain.write_text(dumps_graph(g), encoding="utf-8")
+    compact.write_text(dumps_graph(g, compact=True), encoding="utf-8")
+    assert len(compact.read_text(encoding="utf-8")) < len(plain.read_text(encoding="utf-8"))
+    assert load_graph(str(plain)) == load_graph(str(compact)) == g
+    lazy = load_graph(str(compact), lazy=True)
+    obj = next(n for n in lazy["nodes"] if n["id"] == "public.object")
+    assert obj["props"]["columns"][0]["name"] == "id"
+    assert obj.expand() == next(n for n in g["nodes"] if n["id"] == "public.object")
+
+def test_render_html_can_inline_the_compact_payload():
+    html = render_html(_g(), compact=True)
+    assert "dbgraph-compact/1" in html and "expandGraph" in html
@@ -0,0 +1,54 @@
+import json, os
+from dbgraph.build import build_graph
+from dbgraph.cache import file_digest
+from dbgraph.corpus import LineIndex, SqlCorpus
+from dbgraph.reference_extract import extract_reference_values
+
+HERE = os.path.dirname(__file__)
+
+def _fix(name):
+    with open(os.path.join(HERE, "fixtures", name), encoding="utf-8") as f:
+        return json.load(f)
+
+def test_line_index_matches_counting_newlines():
+    text = "a\n\nbc\nd\n"
+    lines = LineIndex(text)
+    for offset in range(len(text) + 1):
+        assert lines.line_for(offset) == text.count("\n", 0, offset) + 1
+
+def test_corpus_reads_each_file_once(tmp_path):
+    sql = tmp_path / "seed.sql"
+    sql.write_bytes("-- é\r\nINSERT INTO ref_code (domain, code) VALUES ('d', 'c');\r\n".encode("utf-8"))
+    corpus = SqlCorpus()
+    first = corpus.get(str(sql))
+    assert corpus.get(str(sql)) is first and corpus.reads == 1
+    assert first.text == "-- é\nINSERT INTO ref_code (domain, code) VALUES ('d', 'c');\n"
+    assert first.digest == file_digest(str(sql))
+
+def test_shared_corpus_feeds_docs_and_reference_extract_from_one_read(tmp_path):
+    sql = tmp_path / "seed.sql"
+    sql.write_text("-- doc\nCREATE FUNCTION api.f() RETURNS void AS $$$$;\n"
+                   "INSERT INTO ref_code (domain, code) VALUES ('d', 'c');\n", encoding="utf-8")
+    corpus = SqlCorpus()
+    g = build_graph(_fix("schema_tbls.sample.json"), _fix("catalog_extra.sample.json"), [str(sql)], corpus=corpus)
+    refs = extract_reference_values([str(sql)], corpus=corpus)
+    assert corpus.reads == 1
+    assert g == build_graph(_fix("schema_tbls.sample.json"), _fix("catalog_extra.sample.json"), [str(sql)])
+    assert refs == extract_reference_values([str(sql)])
+    assert refs["rows"][0]["source"].endswith("seed.sql:3")
+
+def test_reference_extract_streams_files_the_corpus_does_not_hold(tmp_path, monkeypatch):
+    import dbgraph.reference_extract as ref
+    sql = tmp_path / "seed.sql"
+    sql.write_bytes(("-- seeds\r\n" + "INSERT INTO ref_code (domain, code) VALUES ('d', 'c');\r\n" * 3).encode("utf-8"))
+    held = SqlCorpus()
+    held.get(str(sql))
+    expected = extract_reference_values([str(sql)], corpus=held)
+    sources = []
+    real = ref.iter_statements
+    monkeypatch.setattr(ref, "iter_statements", lambda source: sources.append(source) or real(source))
+    corpus = SqlCorpus()
+    assert extract_reference_values([str(sql)], corpus=corpus) == expected
+    # read from an open file a chunk at a time, not loaded whole (nor kept) through the corpus
+    assert corpus.reads == 0 and str(sql) not in corpus and hasattr(sources[0], "read")
+    assert [r["source"].rsplit(":", 1)[1] for r in expected["rows"]] == ["2", "3", "4"]
@@ -0,0 +1,67 @@
+import json, os
+import db_graph
+from dbgraph.build import build_graph
+from dbgraph.compact import dumps_graph
+from dbgraph.search import build_search_index
+
+HERE = os.path.dirname(__file__)
+
+def _fix(name):
+    with open(os.path.join(HERE, "fixtures", name), encoding="utf-8") as f:
+        return json.load(f)
+
+def _state():
+    g = build_graph(_fix("schema_tbls.sample.json"), _fix("catalog_extra.sample.json"), sql_paths=[])
+    return {"g": g, "graph_text": dumps_graph(g), "compact": False, "type_meta": db_graph._load_object_type_meta(),
+            "refs": {"rows": [], "derived_sources": []}, "live_note": "test", "search": build_search_index(g),
+            "viewer": "d3", "split": False}
+
+def _outputs(root):
+    return {name: (root / name).read_bytes() for name in sorted(os.listdir(root))}
+
+def test_parallel_writers_match_serial_byte_for_byte(tmp_path):
+    state = _state()
+    serial, parallel = tmp_path / "serial", tmp_path / "parallel"
+    serial.mkdir()
+    parallel.mkdir()
+    names = list(db_graph._RENDERERS)
+    assert db_graph._emit_all(state, [(n, str(serial / n)) for n in names], workers=1) == [(n, True) for n in names]
+    assert db_graph._emit_all(state, [(n, str(parallel / n)) for n in names], workers=3) == [(n, True) for n in names]
+    assert _outputs(serial) == _outputs(parallel)
+    assert set(_outputs(serial)) == set(names)  # no temp files left behind
+
+def test_write_replaces_existing_file_atomically(tmp_path):
+    target = tmp_path / "FUNCTIONS.md"
+    target.write_text("old", encoding="utf-8")
+    db_graph._write(str(target), "new")
+    assert target.read_text(encoding="utf-8") == "new"
+    assert os.listdir(tmp_path) == ["FUNCTIONS.md"]
+
+def test_unchanged_artifacts_are_not_rewritten(tmp_path):
+    state = _state()
+    jobs = [(n, str(tmp_path / n)) for n in db_graph._RENDERERS]
+    db_graph._emit_all(state, jobs, workers=1)
+    os.utime(tmp_path / "FUNCTIONS.md", (1, 1))
+    state["live_note"] = "changed note"
+    written = db_graph._emit_all(state, jobs, workers=1)
+    assert [n for n, changed in written if changed] == ["api-db-reference.html"]
+    assert os.stat(tmp_path / "FUNCTIONS.md").st_mtime == 1
+    assert db_graph._write(str(tmp_path / "TYPES.md"), "different") is True
+
+def test_split_reference_page_is_written_beside_the_static_docs_page(tmp_path, monkeypatch):
+    out, docs = tmp_path / "db-graph-out", tmp_path / "docs"
+    out.mkdir()
+    for name in ("schema_tbls", "catalog_extra"):
+        (out / (name + ".json")).write_text(json.dumps(_fix(name + ".sample.json")), encoding="utf-8")
+    for attr, value in (("ROOT", tmp_path), ("OUT", out), ("DOCS", docs), ("PROFILE", out / "graph.profile.json"),
+                        ("SQLITE", out / "graph.sqlite")):
+        monkeypatch.setattr(db_graph, attr, str(value))
+    monkeypatch.delenv("TBLS_DSN", raising=False)
+    monkeypatch.delenv("DB_GRAPH_MCP_REFERENCE_JSON", raising=False)
+    db_graph.main([])
+    static = (docs / "api-db-reference.html").read_bytes()
+    assert "api-db-reference" in db_graph.main(["--split-reference"])
+    # the published page stays the self-contained one; the split page and its data sit in db-graph-out
+    assert (docs / "api-db-reference.html").read_bytes() == static and os.listdir(docs) == ["api-db-reference.html"]
+    assert (out / "api-db-reference" / "search.js").exists()
+    assert 'REF_DIR="api-db-reference"' in (out / "api-db-reference.html").read_text(encoding="utf-8")
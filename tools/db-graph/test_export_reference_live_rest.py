@@ -0,0 +1,152 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+
+import export_reference_live_rest as ex
+
+
+class _PostgREST(BaseHTTPRequestHandler):
+    """PostgREST's Range semantics: `Range: a-b` rows, Content-Range `a-b/total` (total only with
+    Prefer: count=exact), 416 past the end; `order=` and `<col>=gt.<value>`; plus scripted 429/503
+    answers and a hook run after each answer (to change a table mid-export)."""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        srv = self.server
+        url = urlsplit(self.path)
+        table = url.path.rsplit("/", 1)[1]
+        query = dict(parse_qsl(url.query))
+        span = self.headers.get("Range")
+        with srv.lock:
+            srv.log.append((self.client_address[1], table, span, self.headers.get("Prefer")))
+            srv.queries.append((table, query))
+            scripted = srv.script.pop((table, span), None)
+        if scripted:
+            return self._send(scripted[0], b"{}", scripted[1])
+        if table not in srv.tables:
+            return self._send(401, b'{"message":"permission denied"}')
+        rows = srv.tables[table]
+        if "order" in query:
+            cols = [item.split(".")[0] for item in query["order"].split(",")]
+            rows = sorted(rows, key=lambda row: [row[col] for col in cols])
+        for col, value in query.items():
+            if value.startswith("gt."):
+                rows = [row for row in rows if str(row[col]) > value[3:]]
+        start, end = map(int, span.split("-"))
+        if start and start >= len(rows):
+            return self._send(416, b"{}")
+        page = rows[start:end + 1]
+        total = str(len(rows)) if "count=exact" in (self.headers.get("Prefer") or "") else "*"
+        shown = "%d-%d" % (start, start + len(page) - 1) if page else "*"
+        self._send(206 if len(page) < len(rows) else 200, json.dumps(page).encode(),
+                   {"Content-Range": "%s/%s" % (shown, total)})
+        srv.after(table)
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def postgrest():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _PostgREST)
+    srv.lock, srv.log, srv.queries, srv.script, srv.tables = threading.Lock(), [], [], {}, {}
+    srv.after = lambda table: None
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield srv
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def _targets(*names, key=()):
+    return [{"table": "public." + name, "columns": ["id", "code"], "key": list(key)} for name in names]
+
+
+def test_fetch_tables_pages_concurrently_over_keep_alive_connections(postgrest, monkeypatch):
+    monkeypatch.setattr(ex, "PAGE_SIZE", 100)
+    monkeypatch.setattr(ex, "BACKOFF", 0.01)
+    postgrest.tables = {"ref_a": [{"id": i, "code": "a%03d" % i} for i in range(450)],
+                        "ref_b": [], "ref_c": [{"id": i, "code": "c%03d" % i} for i in range(100)]}
+    postgrest.script = {("ref_a", "200-299"): (429, {"Retry-After": "0"}), ("ref_a", "300-399"): (503, {})}
+    url = "http://127.0.0.1:%d" % postgrest.server_address[1]
+
+    table_rows, errors = ex._fetch_tables(url, "key", _targets("ref_a", "ref_b", "ref_c", "ref_denied"), concurrency=3)
+
+    assert table_rows["public.ref_a"] == postgrest.tables["ref_a"]
+    assert table_rows["public.ref_b"] == [] and table_rows["public.ref_c"] == postgrest.tables["ref_c"]
+    assert table_rows["public.ref_denied"] == []
+    assert errors == [{"table": "public.ref_denied", "message": '{"message":"permission denied"}'}]
+    log = postgrest.log
+    # page ranges come from the first page's count: no request past the end, and only it asks for the count
+    assert sorted(span for _, table, span, _ in log if table == "ref_a") == [
+        "0-99", "100-199", "200-299", "200-299", "300-399", "300-399", "400-499"]
+    assert [span for _, table, span, _ in log if table == "ref_c"] == ["0-99"]
+    assert {span for _, _, span, prefer in log if prefer == "count=exact"} == {"0-99"}
+    # keep-alive: 4 tables and 11 requests over at most 3 connections
+    assert len({port for port, _, _, _ in log}) <= 3 < len(log)
+
+
+def test_keyset_paging_is_stable_while_the_table_changes(postgrest, monkeypatch):
+    monkeypatch.setattr(ex, "PAGE_SIZE", 100)
+    rows = [{"id": "k%03d" % i, "code": "c%03d" % (249 - i)} for i in range(250)]
+    postgrest.tables = {"ref_keyed": list(rows), "ref_offset": list(rows)}
+    inserted = set()
+
+    def insert_once(table):   # a row sorting first lands after the first page
+        if table not in inserted:
+            inserted.add(table)
+            postgrest.tables[table].append({"id": "a000", "code": "a000"})
+    postgrest.after = insert_once
+    url = "http://127.0.0.1:%d" % postgrest.server_address[1]
+
+    keyed, errors = ex._fetch_tables(url, "key", _targets("ref_keyed", key=["id"]), concurrency=2)
+    assert errors == []
+    # 3 pages, each the first 100 rows after the last key seen; the row inserted before the cursor
+    # neither shifts a page nor comes twice
+    assert [span for _, _, span, _ in postgrest.log] == ["0-99"] * 3
+    assert [query.get("id") for _, query in postgrest.queries] == [None, "gt.k099", "gt.k199"]
+    # in key order, as the server sorted them (no client-side re-sort)
+    assert keyed["public.ref_keyed"] == rows
+
+    offset, _ = ex._fetch_tables(url, "key", _targets("ref_offset"), concurrency=2)
+    ids = [row["id"] for row in offset["public.ref_offset"]]
+    # the insert shifted the later Range pages: a row at the page boundary comes twice
+    assert len(ids) == 251 and len(set(ids)) == 250 and "a000" not in ids
+
+
+def test_keyset_column_needs_a_column_unique_on_its_own():
+    assert ex._keyset_column({"key": ["id", "domain"]}) == "id"
+    assert ex._keyset_column({"key": ["insee_code"]}) == "insee_code"
+    assert ex._keyset_column({"key": ["metric_id", "object_type"]}) is None
+    assert ex._keyset_column({"key": []}) is None
+
+
+def test_a_failing_keyset_table_is_recorded_and_the_others_still_export(postgrest, monkeypatch):
+    postgrest.tables = {"ref_a": [{"id": "k1", "code": "a"}], "ref_b": [{"id": "k1", "code": "b"}]}
+    real = ex._keyset_rows
+
+    def keyset_rows(rest, name, key):
+        if name == "ref_b":
+            raise TypeError("'<' not supported between instances of 'int' and 'str'")
+        return real(rest, name, key)
+    monkeypatch.setattr(ex, "_keyset_rows", keyset_rows)
+    url = "http://127.0.0.1:%d" % postgrest.server_address[1]
+
+    table_rows, errors = ex._fetch_tables(url, "key", _targets("ref_a", "ref_b", key=["id"]))
+
+    assert table_rows == {"public.ref_a": [{"id": "k1", "code": "a"}], "public.ref_b": []}
+    assert errors == [{"table": "public.ref_b", "message": "'<' not supported between instances of 'int' and 'str'"}]
@@ -0,0 +1,34 @@
+import json, os
+from dbgraph.build import build_graph
+from dbgraph.index import GraphIndex, IndexedGraph, graph_index
+
+HERE = os.path.dirname(__file__)
+
+def _g():
+    def _fix(n):
+        with open(os.path.join(HERE, "fixtures", n), encoding="utf-8") as f:
+            return json.load(f)
+    return build_graph(_fix("schema_tbls.sample.json"), _fix("catalog_extra.sample.json"), sql_paths=[])
+
+def test_build_graph_returns_indexed_graph_that_serialises_like_a_dict():
+    g = _g()
+    assert isinstance(g, IndexedGraph) and g.index is graph_index(g)
+    assert json.dumps(g) == json.dumps(dict(g))
+
+def test_index_adjacency_matches_edge_scan():
+    g = _g()
+    ix = graph_index(g)
+    fk_children = {e["source"] for e in g["edges"] if e["kind"] == "fk" and e["target"] == "public.object"}
+    assert set(ix.sources("public.object", "fk")) == fk_children
+    assert ix.nodes["public.object"]["label"] == "object"
+    assert ix.of_kind("policy") == [n for n in g["nodes"] if n["kind"] == "policy"]
+    assert ix.out_edges("missing", "fk") == [] and ix.edges("no_such_kind") == []
+
+def test_graph_index_rebuilds_after_edges_change():
+    g = _g()
+    before = graph_index(g)
+    g["edges"].append({"source": "public.object_fma", "target": "public.object", "kind": "reads", "props": {}})
+    after = graph_index(g)
+    assert after is not before and after.sources("public.object", "reads") == ["public.object_fma"]
+    plain = dict(g)
+    assert isinstance(graph_index(plain), GraphIndex)
@@ -33,3 +33,22 @@ def test_dedup_keeps_highest_confidence():
     edges, flags = infer_rpc_table_edges(fns, TABLES)
     writes = [e for e in edges if e["kind"] == "writes" and e["target"] == "public.object_price"]
     assert len(writes) == 1
+
+def test_comments_and_string_literals_do_not_produce_edges():
+    body = ("-- legacy: INSERT INTO object_price\n"
+            "/* SELECT * FROM object_fma */\n"
+            "RAISE NOTICE 'delete from object'; v := $q$ UPDATE object_price SET x = 1 $q$;\n"
+            "SELECT 1 FROM object_fma")
+    edges, flags = infer_rpc_table_edges([_fn("c", body)], TABLES)
+    assert [(e["kind"], e["target"]) for e in edges] == [("reads", "public.object_fma")]
+
+def test_dynamic_format_in_comment_is_not_flagged():
+    edges, flags = infer_rpc_table_edges([_fn("d", "-- EXECUTE format('x')\nSELECT 1")], TABLES)
+    assert flags[("api", "d")] is False
+
+def test_bare_name_resolution_prefers_public_then_unique_schema():
+    tables = {"public.object", "crm.note", "audit.log", "staging.log"}
+    fns = [_fn("b", "SELECT 1 FROM note; SELECT 2 FROM log; SELECT 3 FROM api.object")]
+    edges, _ = infer_rpc_table_edges(fns, tables)
+    got = {e["target"]: e["props"]["inference"]["confidence"] for e in edges}
+    assert got == {"crm.note": "medium", "audit.log": "low", "public.object": "high"}
@@ -0,0 +1,77 @@
+import json
+import math
+import pytest
+from dbgraph.canvas import render_canvas_html
+from dbgraph.compact import from_compact, to_compact
+from dbgraph.layout import compute_layout, force_layout
+from dbgraph.render import render_html
+
+def _node(id_, kind, domain="core", **props):
+    return {"id": id_, "kind": kind, "label": id_.split(".")[-1], "schema": "public", "domain": domain,
+            "doc": None, "props": props}
+
+def _g():
+    nodes = [_node("public.object", "table"), _node("public.object_price", "table", "pricing"),
+             _node("public.price_kind", "enum", "pricing"), _node("api.get_prices()", "function", "pricing"),
+             _node("policy:public.object_price:read", "policy", "pricing", table="public.object_price"),
+             _node("policy:public.object_price:write", "policy", "pricing", table="public.object_price"),
+             _node("trigger:public.object:trg", "trigger", table="public.object")]
+    edges = [{"source": "public.object_price", "target": "public.object", "kind": "fk", "props": {}},
+             {"source": "public.object_price", "target": "public.price_kind", "kind": "typed_by", "props": {}},
+             {"source": "api.get_prices()", "target": "public.object_price", "kind": "reads", "props": {}},
+             {"source": "policy:public.object_price:read", "target": "public.object_price", "kind": "gates",
+              "props": {}}]
+    return {"meta": {}, "nodes": nodes, "edges": edges, "partitions": {}}
+
+def test_layout_is_deterministic_and_rings_satellites_around_their_table():
+    g = _g()
+    layout = compute_layout(g)
+    assert layout == compute_layout(json.loads(json.dumps(g)))
+    assert set(layout) == {n["id"] for n in g["nodes"]}
+    ox, oy = layout["public.object_price"]
+    radii = [math.hypot(x - ox, y - oy) for i, (x, y) in layout.items() if i.startswith("policy:")]
+    assert len(radii) == 2 and abs(radii[0] - radii[1]) < 1.5 and radii[0] > 0
+    # linked anchors do not collapse onto each other
+    assert layout["public.object"] != layout["public.object_price"]
+
+def test_layout_keeps_known_positions_and_places_new_nodes_near_their_neighbours():
+    g = _g()
+    first = compute_layout(g)
+    assert compute_layout(g, previous=first) == first
+    g["nodes"].append(_node("public.object_tag", "table"))
+    g["edges"].append({"source": "public.object_tag", "target": "public.object", "kind": "fk", "props": {}})
+    second = compute_layout(g, previous=first)
+    assert {i: p for i, p in second.items() if i in first} == first
+    tx, ty = second["public.object_tag"]
+    ox, oy = first["public.object"]
+    assert 0 < math.hypot(tx - ox, ty - oy) < 4 * 40
+
+def test_numpy_and_python_forces_agree_on_a_small_graph():
+    pytest.importorskip("numpy")
+    ids = ["a", "b", "c", "d"]
+    edges = [("a", "b"), ("b", "c"), ("c", "d")]
+    one = force_layout(ids, edges, iterations=1, use_numpy=False)
+    other = force_layout(ids, edges, iterations=1, use_numpy=True)
+    assert all(math.isclose(one[i][k], other[i][k], abs_tol=1e-6) for i in ids for k in (0, 1))
+
+def test_numpy_and_python_give_the_same_layout():
+    pytest.importorskip("numpy")
+    g = {"nodes": [_node("public.t%03d" % i, "table", "d%d" % (i % 3)) for i in range(300)], "edges": []}
+    g["edges"] = [{"source": "public.t%03d" % i, "target": "public.t%03d" % (i * 7 % 300), "kind": "fk",
+                   "props": {}} for i in range(300) if i * 7 % 300 != i]
+    assert compute_layout(g, use_numpy=True) == compute_layout(g, use_numpy=False)
+    # coincident starts (every new node's neighbour centroid is the same point) split the same way
+    start = {"public.t%03d" % i: [0.0, 0.0] for i in range(12)}
+    one = force_layout(list(start), [], start=start, use_numpy=False)
+    assert one == force_layout(list(start), [], start=start, use_numpy=True)
+    assert len({tuple(p) for p in one.values()}) == 12
+
+def test_layout_travels_in_graph_json_and_both_viewers_start_from_it():
+    g = _g()
+    g["layout"] = compute_layout(g)
+    assert from_compact(json.loads(json.dumps(to_compact(g))))["layout"] == g["layout"]
+    canvas = render_canvas_html(g)
+    assert '"layout": ' + json.dumps(g["layout"]) in canvas and "const L = G.layout" in canvas
+    assert "function searchRank" in canvas and "function expandGraph" in canvas
+    assert "d3js.org" not in canvas and "__GRAPH__" not in canvas
+    assert "if(PRE)fitVisibleTables(0)" in render_html(g)
@@ -0,0 +1,38 @@
+import json, os
+from dbgraph.build import build_graph
+from dbgraph.profile import Profiler, stage
+
+HERE = os.path.dirname(__file__)
+
+def _fix(name):
+    with open(os.path.join(HERE, "fixtures", name), encoding="utf-8") as f:
+        return json.load(f)
+
+def test_nested_stages_record_time_and_memory(tmp_path):
+    prof = Profiler()
+    try:
+        with prof.stage("outer"):
+            with prof.stage("inner"):
+                blob = bytearray(2_000_000)
+            del blob
+        with stage(None, "ignored"):
+            pass
+        path = tmp_path / "profile.json"
+        prof.write(str(path), nodes=1)
+    finally:
+        prof.close()
+    report = json.loads(path.read_text(encoding="utf-8"))
+    by_name = {s["name"]: s for s in report["stages"]}
+    assert list(by_name) == ["outer", "outer/inner"]
+    assert by_name["outer/inner"]["peak_bytes"] >= 2_000_000
+    assert by_name["outer"]["peak_bytes"] >= by_name["outer/inner"]["peak_bytes"]
+    assert by_name["outer"]["wall_s"] >= by_name["outer/inner"]["wall_s"] >= 0
+    assert report["meta"] == {"nodes": 1} and report["total"]["peak_bytes"] >= 2_000_000
+
+def test_build_graph_reports_its_sub_steps_and_output_is_unchanged():
+    prof = Profiler(memory=False)
+    g = build_graph(_fix("schema_tbls.sample.json"), _fix("catalog_extra.sample.json"), sql_paths=[], profiler=prof)
+    names = [s["name"] for s in prof.stages]
+    assert {"load_tbls_schema", "infer_rpc_table_edges", "attach_sql_docs", "graph_index"} <= set(names)
+    assert all("peak_bytes" not in s for s in prof.stages)
+    assert g == build_graph(_fix("schema_tbls.sample.json"), _fix("catalog_extra.sample.json"), sql_paths=[])
@@ -0,0 +1,87 @@
+import io, json
+import pytest
+import query_graph
+from dbgraph.query import GraphQuery
+
+def _node(id_, kind, label, schema="public", domain="object-core"):
+    return {"id": id_, "kind": kind, "label": label, "schema": schema, "domain": domain, "doc": None, "props": {}}
+
+def _edge(source, target, kind, **props):
+    return {"source": source, "target": target, "kind": kind, "props": props}
+
+def _g():
+    nodes = [_node("public.object", "table", "object"), _node("public.object_place", "table", "object_place"),
+             _node("public.object_price", "table", "object_price", domain="pricing"),
+             _node("public.org_link", "table", "org_link"),
+             _node("api.save_price(p jsonb)", "function", "save_price", "api"),
+             _node("public.touch_object()", "function", "touch_object"),
+             _node("api.attach_org()", "function", "attach_org", "api"),
+             _node("trigger:public.object_price:trg_touch", "trigger", "trg_touch"),
+             _node("trigger:public.object:trg_attach", "trigger", "trg_attach"),
+             _node("policy:public.object_price:read", "policy", "read")]
+    edges = [_edge("public.object_place", "public.object", "fk", columns=[["object_id", "id"]]),
+             _edge("public.object_price", "public.object", "fk", columns=[["object_id", "id"]]),
+             _edge("api.save_price(p jsonb)", "public.object_price", "writes"),
+             _edge("trigger:public.object_price:trg_touch", "public.object_price", "trigger_on"),
+             _edge("trigger:public.object_price:trg_touch", "public.touch_object()", "executes"),
+             _edge("public.touch_object()", "public.object", "writes"),
+             _edge("trigger:public.object:trg_attach", "public.object", "trigger_on"),
+             _edge("trigger:public.object:trg_attach", "api.attach_org()", "executes"),
+             _edge("api.attach_org()", "public.org_link", "writes"),
+             _edge("policy:public.object_price:read", "public.object_price", "gates")]
+    return {"meta": {}, "nodes": nodes, "edges": edges, "partitions": {}}
+
+def test_resolve_accepts_ids_schema_names_and_bare_table_names():
+    q = GraphQuery(_g())
+    assert q.resolve("api.save_price") == "api.save_price(p jsonb)"
+    assert q.resolve("object_price") == "public.object_price"
+    assert q.resolve("public.object") == "public.object"
+    with pytest.raises(KeyError):
+        q.resolve("missing")
+
+def test_fk_path_walks_fks_in_either_direction():
+    path = GraphQuery(_g()).fk_path("object_place", "object_price")
+    assert [(e["source"], e["target"]) for e in path] == [("public.object_place", "public.object"),
+                                                          ("public.object_price", "public.object")]
+    assert GraphQuery(_g()).fk_path("object_place", "org_link") is None
+
+def test_impact_follows_writes_through_triggers_nearest_first():
+    rows = GraphQuery(_g()).impact("org_link")
+    assert [(r["id"], r["depth"]) for r in rows] == [("api.attach_org()", 1), ("public.touch_object()", 2),
+                                                     ("api.save_price(p jsonb)", 3)]
+    assert rows[-1]["chain"] == ["api.save_price(p jsonb)", "public.object_price",
+                                 "trigger:public.object_price:trg_touch", "public.touch_object()", "public.object",
+                                 "trigger:public.object:trg_attach", "api.attach_org()", "public.org_link"]
+    assert len(GraphQuery(_g()).impact("org_link", max_depth=1)) == 1
+
+def test_neighbourhood_and_find_filters():
+    q = GraphQuery(_g())
+    assert q.neighbourhood("object_place", hops=2, edge_kinds=["fk"]) == {
+        "public.object_place": 0, "public.object": 1, "public.object_price": 2}
+    assert q.neighbourhood("object", edge_kinds=["writes"], direction="in") == {
+        "public.object": 0, "public.touch_object()": 1}
+    assert [n["id"] for n in q.find(kind="table", domain="pricing")] == ["public.object_price"]
+    assert [n["id"] for n in q.find(text="ATTACH")] == ["api.attach_org()", "trigger:public.object:trg_attach"]
+
+def test_cli_policies_and_repl_answer_from_one_loaded_graph(tmp_path):
+    path = tmp_path / "graph.json"
+    path.write_text(json.dumps(_g()), encoding="utf-8")
+    result = query_graph.main(["--graph", str(path), "policies", "object_place", "--hops", "2"])
+    assert result == [{"id": "policy:public.object_price:read", "tables": ["public.object_price"]}]
+    out = io.StringIO()
+    query_graph._repl(GraphQuery.load(str(path)), True,
+                      stdin=io.StringIO("impact object --depth 1\nimpact nowhere\nfrobnicate\nquit\n"), stdout=out)
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert lines[0] == [{"id": "public.touch_object()", "depth": 1,
+                         "chain": ["public.touch_object()", "public.object"]}]
+    assert "nowhere" in lines[1]["error"] and "invalid choice" in lines[2]["error"]
+
+def test_cli_search_uses_the_search_index_written_next_to_the_graph(tmp_path):
+    from dbgraph.search import build_search_index, dumps_search_index
+    g = _g()
+    (tmp_path / "graph.json").write_text(json.dumps(g), encoding="utf-8")
+    index = build_search_index(g)
+    index["terms"] = {"attach": index["terms"]["attach"]}   # marks the prebuilt file as the one used
+    (tmp_path / "search_index.json").write_text(dumps_search_index(index), encoding="utf-8")
+    result = query_graph.main(["--graph", str(tmp_path / "graph.json"), "search", "attach", "org"])
+    assert [r["id"] for r in result] == ["api.attach_org()"]
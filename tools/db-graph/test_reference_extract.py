@@ -1,7 +1,84 @@
+import hashlib
 import json
+import re
+import threading
+import time
+from datetime import date
 
-from dbgraph.reference_extract import (extract_reference_values, live_reference_tables,
-                                       load_mcp_reference_values, merge_reference_extracts)
+from dbgraph.reference_extract import (extract_live_reference_values, extract_reference_values, live_reference_tables,
+                                       load_mcp_reference_values, merge_reference_extracts,
+                                       write_live_reference_values)
+
+
+class _FakePostgres:
+    """Just enough of a DB-API driver for the live extractor: snapshots, savepoints, DECLARE/FETCH."""
+
+    def __init__(self, tables, failing=(), followers_fail=False, unhashable=()):
+        self.tables, self.failing, self.followers_fail = tables, set(failing), followers_fail
+        self.unhashable = set(unhashable)
+        self.connections, self.lock = [], threading.Lock()
+
+    def connect(self):
+        with self.lock:
+            if self.followers_fail and self.connections:
+                raise OSError("too many connections")
+            conn = _FakeConnection(self)
+            self.connections.append(conn)
+            return conn
+
+
+class _FakeConnection:
+    def __init__(self, db):
+        self.db, self.log, self.snapshot, self.read, self.closed = db, [], None, [], False
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def rollback(self):
+        self.log.append("ROLLBACK")
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn, self.result, self.open = conn, [], None
+
+    def execute(self, sql):
+        conn = self.conn
+        conn.log.append(sql)
+        if sql == "SELECT pg_export_snapshot()":
+            conn.snapshot, self.result = "00000003-1B", [("00000003-1B",)]
+        elif sql.startswith("SET TRANSACTION SNAPSHOT"):
+            conn.snapshot = sql.split("'")[1]
+        elif sql.startswith("SELECT count(*), md5("):
+            table = self._table(sql)
+            if table in conn.db.unhashable:
+                raise RuntimeError("permission denied for column secret of table %s" % table)
+            rows = sorted(repr(row) for row in conn.db.tables[table])
+            self.result = [(len(rows), hashlib.md5("".join(rows).encode()).hexdigest())]
+        elif sql.startswith("DECLARE ref_rows"):
+            table = self._table(sql)
+            conn.read.append(table)
+            self.open = list(conn.db.tables[table][:int(sql.rsplit(" ", 1)[1])])
+        elif sql.startswith("FETCH FORWARD"):
+            time.sleep(0.005)
+            n = int(sql.split()[2])
+            self.result, self.open = self.open[:n], self.open[n:]
+
+    def _table(self, sql):
+        assert self.conn.snapshot, "read outside the shared snapshot"
+        table = ".".join(re.search(r'FROM "(\w+)"\."(\w+)"', sql).groups())
+        if table in self.conn.db.failing:
+            raise RuntimeError("permission denied for table %s" % table)
+        return table
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
 
 
 def test_extract_reference_values_from_insert_and_cte(tmp_path):
@@ -110,3 +187,130 @@ def test_load_mcp_reference_values_accepts_execute_sql_row(tmp_path):
     assert refs["live"]["tables"] == ["public.ref_code"]
     assert refs["rows"][0]["source"] == "mcp:public.ref_code"
     assert refs["rows"][0]["source_kind"] == "mcp_execute_sql"
+
+
+def test_cte_values_only_attach_to_an_insert_in_the_same_statement(tmp_path):
+    sql = tmp_path / "seeds.sql"
+    sql.write_text(
+        """
+        WITH v(code, name) AS (VALUES ('a', 'A'))
+        UPDATE ref_code rc SET name = v.name FROM v WHERE rc.code = v.code;
+
+        INSERT INTO ref_code (domain, code, name)
+        SELECT 'd', code, name FROM staging;
+
+        DO $$ BEGIN
+          -- INSERT INTO ref_tag (slug) VALUES ('commented');
+          INSERT INTO ref_tag (slug) VALUES ('in_body');
+        END $$;
+        """,
+        encoding="utf-8",
+    )
+
+    result = extract_reference_values([str(sql)])
+
+    assert [(r["table"], r["values"]) for r in result["rows"]] == [("public.ref_tag", {"slug": "in_body"})]
+    assert result["rows"][0]["source"].endswith("seeds.sql:10")
+    assert [d["table"] for d in result["derived_sources"]] == ["public.ref_code"]
+
+
+def _ref_graph(names):
+    return {"nodes": [{"id": "public." + name, "kind": "table", "schema": "public", "label": name,
+                       "props": {"columns": [{"name": "code"}, {"name": "name"}]}} for name in names]}
+
+
+def test_live_extract_reads_tables_concurrently_on_one_snapshot():
+    names = ["ref_a", "ref_b", "ref_big", "ref_c", "ref_denied", "ref_d"]
+    tables = {"public." + n: [("%s%d" % (n, i), "x") for i in range(3)] for n in names}
+    tables["public.ref_big"] = [("c%04d" % i, None) for i in range(2500)]
+
+    def run(connections):
+        db = _FakePostgres(tables, failing=["public.ref_denied"])
+        refs = extract_live_reference_values(None, _ref_graph(names), max_rows_per_table=2200,
+                                             connections=connections, connect=db.connect)
+        return refs, db
+
+    serial, _ = run(1)
+    refs, db = run(3)
+    assert refs["rows"] == serial["rows"] and refs["live"]["errors"] == serial["live"]["errors"]
+    assert [r["values"]["code"] for r in refs["rows"][:3]] == ["ref_a0", "ref_a1", "ref_a2"]
+    assert refs["live"]["tables"] == ["public.ref_a", "public.ref_b", "public.ref_big", "public.ref_c", "public.ref_d"]
+    assert refs["live"]["errors"] == [{"table": "public.ref_denied", "message": "permission denied for table public.ref_denied"}]
+    assert refs["live"]["truncated"] == [{"table": "public.ref_big", "limit": 2200}]
+    assert sum(1 for r in refs["rows"] if r["table"] == "public.ref_big") == 2200
+    # one exported snapshot, adopted by the other connections; rows come through FETCH, 1000 at a time
+    assert refs["live"]["connections"] == len(db.connections) == 3
+    assert {c.snapshot for c in db.connections} == {"00000003-1B"}
+    assert all(c.closed for c in db.connections)
+    assert sorted(t for c in db.connections for t in c.read) == sorted(set(tables) - {"public.ref_denied"})
+    big = next(c for c in db.connections if "public.ref_big" in c.read)
+    assert big.log.count("FETCH FORWARD 1000 FROM ref_rows") == 3
+    # the failing table only rolls back its savepoint: the transaction (snapshot) lives to the end
+    failed = next(c for c in db.connections if "ROLLBACK TO SAVEPOINT ref_table" in c.log)
+    assert failed.log.index("ROLLBACK") == len(failed.log) - 1
+
+
+def test_live_extract_falls_back_to_one_connection():
+    tables = {"public.ref_a": [("a", "A")], "public.ref_b": [("b", "B")]}
+    db = _FakePostgres(tables, followers_fail=True)
+    refs = extract_live_reference_values(None, _ref_graph(["ref_a", "ref_b"]), connections=4, connect=db.connect)
+    assert refs["live"]["tables"] == ["public.ref_a", "public.ref_b"] and refs["live"]["connections"] == 1
+    assert [r["values"] for r in refs["rows"]] == [{"code": "a", "name": "A"}, {"code": "b", "name": "B"}]
+
+
+def test_write_live_reference_values_streams_the_same_rows(tmp_path):
+    names = ["ref_a", "ref_big", "ref_denied"]
+    tables = {"public.ref_a": [("a", date(2026, 1, 1))], "public.ref_big": [("c%04d" % i, i) for i in range(2300)],
+              "public.ref_denied": []}
+    graph = _ref_graph(names)
+    expected = extract_live_reference_values(None, graph, max_rows_per_table=2200, connections=2,
+                                             connect=_FakePostgres(tables, failing=["public.ref_denied"]).connect)
+    for name in ("reference_live.json", "reference_live.ndjson"):
+        path = str(tmp_path / name)
+        live = write_live_reference_values(None, graph, path, max_rows_per_table=2200, connections=2,
+                                           connect=_FakePostgres(tables, failing=["public.ref_denied"]).connect)
+        assert live == expected["live"]
+        loaded = load_mcp_reference_values(path)
+        assert loaded["rows"] == expected["rows"] and loaded["live"] == expected["live"]
+        assert loaded["rows"][0]["values"] == {"code": "a", "name": "2026-01-01"}
+    with open(path, encoding="utf-8") as f:
+        assert sum(1 for _ in f) == 1 + 2201
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["reference_live.json", "reference_live.ndjson"]
+
+
+def test_live_refresh_rereads_only_tables_whose_fingerprint_changed(tmp_path):
+    names = ["ref_a", "ref_b", "ref_c", "ref_denied"]
+    tables = {"public." + n: [("%s%d" % (n, i), "x") for i in range(3)] for n in names}
+    graph = _ref_graph(names)
+    path = str(tmp_path / "reference_live.ndjson")
+    # a plain extract does not fingerprint: one scan per table
+    db = _FakePostgres(tables, failing=["public.ref_denied"])
+    first = write_live_reference_values(None, graph, path, connections=2, connect=db.connect)
+    assert first["reused"] == [] and first["fingerprints"] == {}
+    assert not any(sql.startswith("SELECT count(*)") for c in db.connections for sql in c.log)
+    second = write_live_reference_values(None, graph, path, connections=2,
+                                         connect=_FakePostgres(tables, failing=["public.ref_denied"]).connect,
+                                         previous=load_mcp_reference_values(path))
+    assert second["reused"] == [] and set(second["fingerprints"]) == set(second["tables"])
+
+    tables["public.ref_b"] = tables["public.ref_b"][:2] + [("ref_b9", "changed")]
+    db = _FakePostgres(tables)
+    live = write_live_reference_values(None, graph, path, connections=2, connect=db.connect,
+                                       previous=load_mcp_reference_values(path))
+    assert sorted(t for c in db.connections for t in c.read) == ["public.ref_b", "public.ref_denied"]
+    assert live["reused"] == ["public.ref_a", "public.ref_c"]
+    full = extract_live_reference_values(None, graph, connections=1, connect=_FakePostgres(tables).connect)
+    assert load_mcp_reference_values(path)["rows"] == full["rows"]
+    assert live["fingerprints"]["public.ref_b"] != second["fingerprints"]["public.ref_b"]
+
+
+def test_live_refresh_reads_a_table_whose_fingerprint_fails():
+    tables = {"public.ref_a": [("a", "A")], "public.ref_b": [("b", "B")]}
+    db = _FakePostgres(tables, unhashable=["public.ref_b"])
+    refs = extract_live_reference_values(None, _ref_graph(["ref_a", "ref_b"]), connections=1, connect=db.connect,
+                                         previous={"rows": [], "live": {}})
+    assert refs["live"]["tables"] == ["public.ref_a", "public.ref_b"] and refs["live"]["errors"] == []
+    assert [r["values"]["code"] for r in refs["rows"]] == ["a", "b"]
+    # no fingerprint recorded, so the next refresh reads it again
+    assert list(refs["live"]["fingerprints"]) == ["public.ref_a"]
+    assert "ROLLBACK TO SAVEPOINT ref_fingerprint" in db.connections[0].log
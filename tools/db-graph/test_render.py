@@ -1,7 +1,7 @@
 import json, os
 from dbgraph.build import build_graph
-from dbgraph.render import (render_api_db_reference_html, render_html, write_functions_md,
-                            write_index_md, write_policies_md, write_types_md)
+from dbgraph.render import (render_api_db_reference_html, render_api_db_reference_split, render_html,
+                            write_functions_md, write_index_md, write_policies_md, write_types_md)
 
 HERE = os.path.dirname(__file__)
 
@@ -89,3 +89,28 @@ def test_render_api_db_reference_html_handles_live_connection_error():
 
     assert "Lecture live demandée mais échouée" in html
     assert "timeout" in html
+
+def _chunk(text):
+    return json.loads(text[text.index(",") + 1:-len(");\n")])
+
+def test_render_api_db_reference_split_defers_sections_and_indexes_every_item():
+    graph = _g()
+    refs = {"rows": [{"table": "public.ref_code", "values": {"domain": "payment_method", "code": "cash%d" % i,
+                                                             "name": "Especes %d" % i},
+                      "source": "seed.sql:%d" % i, "source_kind": "insert_values"} for i in range(250)],
+            "derived_sources": [], "live": {"status": "not_queried", "tables": []}, "seed": {"rows": 250}}
+    html, files = render_api_db_reference_split(graph, refs)
+    static = render_api_db_reference_html(graph, refs)
+    assert render_api_db_reference_split(graph, refs) == (html, files)
+    assert len(html) < len(static) and "payment_method:cash7" not in html and 'class="rpc"' not in html
+    assert {"rpcs.js", "tables.js", "rls.js", "refs-payment_method.js", "search.js"} <= set(files)
+    rpcs = _chunk(files["rpcs.js"])
+    assert rpcs["selector"] == "details.rpc" and rpcs["html"] in static
+    rows = _chunk(files["refs-payment_method.js"])["rows"]
+    k = rows.index(["payment_method:cash7", "Especes 7", "", "seed.sql:7"])
+    search = _chunk(files["search.js"])
+    ids = search["index"]["ids"]
+    assert len(ids) == len(set(ids)) == len(search["labels"])
+    assert len(rows) == 250 and search["labels"][ids.index("refs-payment_method.js:%d" % k)] == "payment_method:cash7 — Especes 7"
+    assert "tables.js:0" in ids
+    assert sum(1 for i in ids if i.startswith("rpcs.js:")) == rpcs["html"].count('class="rpc"')
@@ -0,0 +1,39 @@
+import json
+from dbgraph.render import render_html
+from dbgraph.search import SearchIndex, build_search_index, dumps_search_index, tokenize
+
+def _node(id_, kind, label, doc=None, **props):
+    return {"id": id_, "kind": kind, "label": label, "schema": "public", "domain": "pricing", "doc": doc,
+            "props": props}
+
+def _g():
+    nodes = [_node("public.object_price", "table", "object_price", "Tarifs d'un objet",
+                   columns=[{"name": "amount", "type": "numeric", "nullable": True, "pk": False}]),
+             _node("policy:public.object_price_period:read", "policy", "read_object_price_period",
+                   table="public.object_price_period",
+                   predicate="EXISTS (SELECT 1 FROM object_price op WHERE op.id = object_price_period.price_id)"),
+             _node("api.get_prices(p_id uuid)", "function", "get_prices", "Renvoie les prix et périodes tarifaires",
+                   signature="get_prices(p_id uuid)", returns="jsonb"),
+             _node("trigger:public.object_price:trg", "trigger", "trg_touch_price")]
+    return {"meta": {}, "nodes": nodes, "edges": [], "partitions": {}}
+
+def test_tokenize_folds_accents_splits_snake_case_and_drops_stop_words():
+    assert tokenize("Périodes des tarifs") == ["periode", "tarif"]
+    assert tokenize("object_price_period.price_id") == ["object_price_period", "object", "price", "period",
+                                                         "price_id", "price", "id"]
+
+def test_search_ranks_name_matches_first_and_completes_the_last_word():
+    index = SearchIndex(json.loads(dumps_search_index(build_search_index(_g()))))
+    assert [i for i, _ in index.search("object_price ")][:1] == ["public.object_price"]
+    assert [i for i, _ in index.search("tarifaire ")] == ["api.get_prices(p_id uuid)"]
+    assert [i for i, _ in index.search("période tari")] == ["api.get_prices(p_id uuid)", "public.object_price"]
+    assert index.search("price", kinds=["policy"])[0][0] == "policy:public.object_price_period:read"
+    assert all(not i.startswith("trigger:") for i, _ in index.search("touch"))
+    # folding, not translation: "prix" matches the French doc only
+    assert [i for i, _ in index.search("prix ")] == ["api.get_prices(p_id uuid)"]
+
+def test_graph_html_inlines_the_search_index():
+    g = _g()
+    html = render_html(g)
+    assert "let S = " + json.dumps(build_search_index(g), separators=(",", ":")) in html
+    assert "__SEARCH__" not in html and "function searchRank" in html
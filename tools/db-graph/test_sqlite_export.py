@@ -0,0 +1,50 @@
+import json, os, sqlite3
+from dbgraph.build import build_graph
+from dbgraph.sqlite_export import write_sqlite
+
+HERE = os.path.dirname(__file__)
+
+def _fix(name):
+    with open(os.path.join(HERE, "fixtures", name), encoding="utf-8") as f:
+        return json.load(f)
+
+def _g():
+    return build_graph(_fix("schema_tbls.sample.json"), _fix("catalog_extra.sample.json"), sql_paths=[])
+
+def test_sqlite_export_round_trips_nodes_edges_columns_and_policies(tmp_path):
+    g = _g()
+    refs = {"rows": [{"table": "public.ref_code", "values": {"code": "a"}, "source": "seed.sql:3",
+                      "source_kind": "insert_values"}]}
+    path = str(tmp_path / "graph.sqlite")
+    fts = write_sqlite(g, refs, path)
+    con = sqlite3.connect(path)
+    ids = [r[0] for r in con.execute("SELECT id FROM nodes ORDER BY rowid")]
+    assert ids == [n["id"] for n in g["nodes"]]
+    assert con.execute("SELECT count(*) FROM edges").fetchone()[0] == len(g["edges"])
+    table = next(n for n in g["nodes"] if n["kind"] == "table" and n["props"]["columns"])
+    cols = con.execute("SELECT name, type, nullable, pk FROM columns WHERE table_id = ? ORDER BY position",
+                       (table["id"],)).fetchall()
+    assert cols == [(c["name"], c["type"], int(c["nullable"]), int(c["pk"])) for c in table["props"]["columns"]]
+    policy = next(n for n in g["nodes"] if n["kind"] == "policy")
+    assert con.execute("SELECT table_id, predicate FROM policies WHERE id = ?", (policy["id"],)).fetchone() == (
+        policy["props"]["table"], policy["props"]["predicate"])
+    assert json.loads(con.execute('SELECT "values" FROM reference_rows').fetchone()[0]) == {"code": "a"}
+    assert json.loads(con.execute("SELECT value FROM meta WHERE key = 'fts'").fetchone()[0]) == fts
+    plan = " ".join(str(r) for r in con.execute(
+        "EXPLAIN QUERY PLAN SELECT source FROM edges WHERE target = 'public.object' AND kind = 'fk'"))
+    assert "edges_target" in plan
+    con.close()
+    assert os.listdir(tmp_path) == ["graph.sqlite"]
+
+def test_sqlite_search_matches_docs_without_accents(tmp_path):
+    g = _g()
+    fn = next(n for n in g["nodes"] if n["kind"] == "function")
+    fn["doc"] = "Crée la fiche tarifaire"
+    path = str(tmp_path / "graph.sqlite")
+    if write_sqlite(g, {}, path) == "fts5":
+        sql = "SELECT id FROM node_search WHERE node_search MATCH 'cree tarif*'"
+    else:
+        sql = "SELECT id FROM node_search WHERE doc LIKE '%tarif%'"
+    con = sqlite3.connect(path)
+    assert [r[0] for r in con.execute(sql)] == [fn["id"]]
+    con.close()
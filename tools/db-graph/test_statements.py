@@ -0,0 +1,29 @@
+import io
+from dbgraph.statements import iter_statements, walk_statements
+
+SQL = ("select 1; -- a;b\n"
+       "select 'x;''y', E'a\\';b', \"q;\" /* c; /* nested; */ ; */ from t;\n"
+       "create function f() returns void as $fn$ begin\n  insert into a values (1);\nend $fn$ language plpgsql;\n"
+       "  tail")
+
+def test_split_respects_quotes_comments_and_dollar_bodies():
+    sts = list(iter_statements(SQL))
+    assert [s.line for s in sts] == [1, 2, 3, 6]
+    assert sts[1].text.startswith("select 'x;''y', E'a\\';b', \"q;\"") and "nested" not in sts[1].text
+    assert sts[1].text.endswith("from t;")
+    assert sts[3].text == "tail"
+    for s in sts:
+        assert SQL[s.offset:s.offset + len(s.text)].count("\n") == s.text.count("\n")
+
+def test_walk_descends_into_dollar_bodies_with_source_lines():
+    inner = [s for s in walk_statements(iter_statements(SQL)) if "insert" in s.text]
+    assert len(inner) == 1
+    st = inner[0]
+    assert st.line_for(st.text.index("insert")) == 4
+    assert SQL[st.offset:].startswith("begin")
+
+def test_streaming_in_small_chunks_matches_whole_text():
+    whole = [(s.text, s.line, s.offset, s.dollar) for s in iter_statements(SQL)]
+    for size in (1, 3, 17):
+        assert [(s.text, s.line, s.offset, s.dollar)
+                for s in iter_statements(io.StringIO(SQL), chunk_size=size)] == whole
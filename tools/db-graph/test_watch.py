@@ -0,0 +1,61 @@
+import copy, json, os
+from dbgraph.build import build_graph
+from dbgraph.cache import BuildCache
+from dbgraph.watch import changed_paths, snapshot, watch
+
+HERE = os.path.dirname(__file__)
+
+def _fix(name):
+    with open(os.path.join(HERE, "fixtures", name), encoding="utf-8") as f:
+        return json.load(f)
+
+def test_snapshot_skips_ignored_paths_and_changed_paths_sees_add_edit_remove(tmp_path):
+    (tmp_path / "a.sql").write_text("a", encoding="utf-8")
+    (tmp_path / "b.sql").write_text("b", encoding="utf-8")
+    (tmp_path / "graph.json").write_text("{}", encoding="utf-8")
+    pattern = [str(tmp_path / "*.sql"), str(tmp_path / "*.json")]
+    before = snapshot(pattern, ignore=[str(tmp_path / "graph.json")])
+    assert sorted(os.path.basename(p) for p in before) == ["a.sql", "b.sql"]
+    (tmp_path / "a.sql").write_text("a changed", encoding="utf-8")
+    (tmp_path / "b.sql").unlink()
+    (tmp_path / "c.sql").write_text("c", encoding="utf-8")
+    (tmp_path / "graph.json").write_text("{\"x\": 1}", encoding="utf-8")
+    after = snapshot(pattern, ignore=[str(tmp_path / "graph.json")])
+    assert [os.path.basename(p) for p in changed_paths(before, after)] == ["a.sql", "b.sql", "c.sql"]
+
+def test_watch_coalesces_a_burst_of_saves_into_one_callback(tmp_path):
+    sql = tmp_path / "f.sql"
+    sql.write_text("v0", encoding="utf-8")
+    now = [0.0]
+    batches = []
+    # one tick per sleep: saves land on ticks 1 and 2, then the tree is quiet
+    script = {1: "v1 save", 2: "v2 second save", 9: "v3 later edit"}
+    ticks = [0]
+
+    def sleep(seconds):
+        ticks[0] += 1
+        now[0] += seconds
+        if ticks[0] in script:
+            sql.write_text(script[ticks[0]], encoding="utf-8")
+
+    watch([str(tmp_path / "*.sql")], batches.append, interval=0.1, debounce=0.25,
+          should_stop=lambda: ticks[0] >= 14, sleep=sleep, clock=lambda: now[0])
+    assert batches == [[str(sql)], [str(sql)]]
+
+def test_warm_rebuild_leaves_inputs_untouched_and_only_rescans_the_edited_file(tmp_path):
+    from dbgraph.corpus import SqlCorpus
+    tbls, extra = _fix("schema_tbls.sample.json"), _fix("catalog_extra.sample.json")
+    frozen = copy.deepcopy((tbls, extra))
+    a, b = tmp_path / "a.sql", tmp_path / "b.sql"
+    a.write_text("-- v1\nCREATE FUNCTION api.f() RETURNS void AS $$$$;\n", encoding="utf-8")
+    b.write_text("-- other\nCREATE FUNCTION api.g() RETURNS void AS $$$$;\n", encoding="utf-8")
+    paths = [str(a), str(b)]
+    cache, corpus = BuildCache(), SqlCorpus()
+    build_graph(tbls, extra, paths, cache=cache, corpus=corpus)
+    cache.save()
+    a.write_text("-- v2, a longer doc\nCREATE FUNCTION api.f() RETURNS void AS $$$$;\n", encoding="utf-8")
+    assert corpus.refresh() == [str(a)]
+    g = build_graph(tbls, extra, paths, cache=cache, corpus=corpus)
+    assert (tbls, extra) == frozen
+    assert cache.misses == 1 and corpus.reads == 3
+    assert g == build_graph(_fix("schema_tbls.sample.json"), _fix("catalog_extra.sample.json"), paths)